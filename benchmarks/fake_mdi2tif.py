@@ -0,0 +1,66 @@
+"""_summary_
+    A stand-in for MDI2TIF.EXE used to benchmark the conversion pipeline on hosts that cannot run the windows binary.
+    It accepts the same arguments as the binary (-source <mdi> -dest <tiff> -log <log>).
+    When a reference tiff with the same name exists in sample_images/tiff it is copied,
+    otherwise a deterministic image with the size declared in the mdi file (capped to MDI2IMG_FAKE_MAX_PIXELS) is written.
+"""
+
+import os
+import sys
+import shutil
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from PIL import Image  # noqa: E402
+
+REFERENCE_FOLDER = os.path.join(REPOSITORY_ROOT, "sample_images", "tiff")
+DEFAULT_MAX_PIXELS = 4_000_000
+
+
+def _get_argument(name: str) -> str:
+    """ Get the value following an argument of the command line """
+    if name not in sys.argv:
+        return ""
+    index = sys.argv.index(name) + 1
+    if index >= len(sys.argv):
+        return ""
+    return sys.argv[index]
+
+
+def _read_dimensions(source: str) -> tuple:
+    """ Read the size of the first page of an mdi file """
+    # Imported here so that the stand-in does not need the logger when a reference exists
+    from mdi2img.constants import Constants
+    from mdi2img.mdi_decoder import MDIDecoder
+    decoder = MDIDecoder(Constants("MDI2TIF.EXE"))
+    pages = decoder.read_pages(source)
+    if not pages:
+        return (64, 64)
+    return (pages[0].width, pages[0].height)
+
+
+def main() -> int:
+    """ Convert the source given on the command line """
+    source = _get_argument("-source")
+    destination = _get_argument("-dest")
+    if source == "" or destination == "" or os.path.isfile(source) is False:
+        print(f"Usage: {sys.argv[0]} -source <mdi> -dest <tiff> [-log <log>]", file=sys.stderr)
+        return 1
+    name = os.path.splitext(os.path.basename(source))[0]
+    reference = os.path.join(REFERENCE_FOLDER, f"{name}.tif")
+    if os.path.isfile(reference) is True:
+        shutil.copyfile(reference, destination)
+        return 0
+    width, height = _read_dimensions(source)
+    max_pixels = int(os.environ.get("MDI2IMG_FAKE_MAX_PIXELS", DEFAULT_MAX_PIXELS))
+    while width * height > max_pixels:
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+    seed = sum(name.encode("utf-8")) % 256
+    Image.new("RGB", (width, height), (seed, 255 - seed, 128)).save(destination, format="tiff")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
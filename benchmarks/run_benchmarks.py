@@ -0,0 +1,242 @@
+"""_summary_
+    Benchmark suite measuring the latency and throughput of the conversion stages on the bundled sample_images corpus.
+
+    Stages:
+        * to_desired_format:  ChangeImageFormat.to_desired_format for every writable format (the reference tiffs are the inputs)
+        * load_images:        ViewImage._load_images on the jpeg corpus (skipped when no display is available)
+        * convert_all:        MDIToTiff.convert_all on the mdi corpus, using the fake_mdi2tif.py stand-in for the binary
+
+    The results are written as json so they can be compared between releases:
+        python benchmarks/run_benchmarks.py --output=bench_output.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+from typing import List, Callable
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from PIL import Image  # noqa: E402
+
+from mdi2img import constants as CONST  # noqa: E402
+from mdi2img.mdi2tiff import MDIToTiff  # noqa: E402
+from mdi2img.change_image_format import ChangeImageFormat, AVAILABLE_FORMATS  # noqa: E402
+
+SAMPLE_FOLDER = os.path.join(REPOSITORY_ROOT, "sample_images")
+FAKE_BINARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_mdi2tif.py")
+
+
+def _list_files(folder: str, extensions: tuple) -> List[str]:
+    """ List the files of a folder of the corpus """
+    path = os.path.join(SAMPLE_FOLDER, folder)
+    return sorted(
+        os.path.join(path, name)
+        for name in os.listdir(path)
+        if name.lower().endswith(extensions)
+    )
+
+
+def _summarise(stage: str, variant: str, durations: List[float], processed_bytes: int, errors: int = 0) -> dict:
+    """ Build the result record of a stage """
+    total = sum(durations)
+    ordered = sorted(durations)
+    result = {
+        "stage": stage,
+        "variant": variant,
+        "status": "ok",
+        "items": len(durations),
+        "errors": errors,
+        "total_seconds": round(total, 6),
+        "mean_seconds": 0.0,
+        "p50_seconds": 0.0,
+        "p95_seconds": 0.0,
+        "items_per_second": 0.0,
+        "megabytes_per_second": 0.0
+    }
+    if len(durations) > 0:
+        result["mean_seconds"] = round(statistics.fmean(durations), 6)
+        result["p50_seconds"] = round(ordered[len(ordered) // 2], 6)
+        result["p95_seconds"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6)
+    if total > 0:
+        result["items_per_second"] = round(len(durations) / total, 3)
+        result["megabytes_per_second"] = round(processed_bytes / total / 1_000_000, 3)
+    return result
+
+
+def _skipped(stage: str, variant: str, reason: str) -> dict:
+    """ Build the record of a stage that could not run """
+    return {"stage": stage, "variant": variant, "status": "skipped", "reason": reason}
+
+
+def _time_calls(calls: List[Callable[[], int]], success: int) -> tuple:
+    """ Time a list of calls and count the ones that failed """
+    durations = []
+    errors = 0
+    for call in calls:
+        start = time.perf_counter()
+        status = call()
+        durations.append(time.perf_counter() - start)
+        if status != success:
+            errors += 1
+    return durations, errors
+
+
+def bench_to_desired_format(const: CONST.Constants, workspace: str, repeat: int, formats: List[str]) -> List[dict]:
+    """ Measure ChangeImageFormat.to_desired_format for each writable format """
+    Image.init()
+    cifi = ChangeImageFormat(const)
+    inputs = _list_files("tiff", (".tif", ".tiff"))
+    input_bytes = sum(os.path.getsize(path) for path in inputs)
+    results = []
+    for img_format in formats:
+        if img_format.upper() not in Image.SAVE:
+            results.append(_skipped("to_desired_format", img_format, "format not writable by Pillow"))
+            continue
+        output_folder = os.path.join(workspace, "formats", img_format)
+        os.makedirs(output_folder, exist_ok=True)
+        calls = []
+        for _ in range(repeat):
+            for path in inputs:
+                name = os.path.splitext(os.path.basename(path))[0]
+                destination = os.path.join(output_folder, f"{name}.{img_format}")
+                calls.append(
+                    lambda path=path, destination=destination, img_format=img_format:
+                    cifi.to_desired_format(path, destination, img_format)
+                )
+        durations, errors = _time_calls(calls, cifi.success)
+        results.append(
+            _summarise("to_desired_format", img_format, durations, input_bytes * repeat, errors)
+        )
+        shutil.rmtree(output_folder, ignore_errors=True)
+    return results
+
+
+def bench_load_images(repeat: int) -> List[dict]:
+    """ Measure ViewImage._load_images on the jpeg corpus """
+    try:
+        import tkinter as tk
+        from mdi2img.view_image import ViewImage
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        return [_skipped("load_images", "jpg", f"no display available: {e}")]
+    inputs = _list_files("jpg", (".jpg", ".jpeg"))
+    input_bytes = sum(os.path.getsize(path) for path in inputs)
+    durations = []
+    try:
+        for _ in range(repeat):
+            viewer = ViewImage(parent_window=root)
+            start = time.perf_counter()
+            viewer._load_images(inputs, 480, 400)
+            durations.append(time.perf_counter() - start)
+    finally:
+        root.destroy()
+    result = _summarise("load_images", "jpg", durations, input_bytes * repeat)
+    result["images_per_call"] = len(inputs)
+    return [result]
+
+
+def _create_fake_binary(workspace: str) -> str:
+    """ Create an executable wrapper around the fake converter """
+    wrapper = os.path.join(workspace, "fake_mdi2tif")
+    with open(wrapper, "w", encoding="utf-8") as file:
+        file.write(f"#!{sys.executable}\n")
+        file.write("import runpy, sys\n")
+        file.write(f"sys.argv[0] = {FAKE_BINARY!r}\n")
+        file.write(f"runpy.run_path({FAKE_BINARY!r}, run_name='__main__')\n")
+    os.chmod(wrapper, 0o755)
+    return wrapper
+
+
+def bench_convert_all(const: CONST.Constants, workspace: str, repeat: int, jobs_list: List[int]) -> List[dict]:
+    """ Measure MDIToTiff.convert_all with the fake converter """
+    if os.name != "posix":
+        return [_skipped("convert_all", "fake", "the fake converter requires a posix host")]
+    const.binary_path = _create_fake_binary(workspace)
+    input_folder = os.path.join(SAMPLE_FOLDER, "mdi")
+    inputs = _list_files("mdi", (".mdi",))
+    input_bytes = sum(os.path.getsize(path) for path in inputs)
+    results = []
+    for jobs in jobs_list:
+        durations = []
+        errors = 0
+        spawn_time = 0.0
+        run_time = 0.0
+        for iteration in range(repeat):
+            output_folder = os.path.join(workspace, "convert_all", f"{jobs}_{iteration}")
+            converter = MDIToTiff(const, backend="exe")
+            start = time.perf_counter()
+            converter.convert_all(input_folder, output_folder, "tiff", jobs=jobs)
+            durations.append(time.perf_counter() - start)
+            errors += converter.total_files_fails
+            spawn_time += converter.launcher.total_spawn_time
+            run_time += converter.launcher.total_run_time
+            shutil.rmtree(output_folder, ignore_errors=True)
+        result = _summarise("convert_all", f"fake_jobs_{jobs}", durations, input_bytes * repeat, errors)
+        result["files_per_call"] = len(inputs)
+        result["files_per_second"] = 0.0
+        if sum(durations) > 0:
+            result["files_per_second"] = round(len(inputs) * repeat / sum(durations), 3)
+        result["binary_spawn_seconds"] = round(spawn_time, 6)
+        result["binary_run_seconds"] = round(run_time, 6)
+        results.append(result)
+    return results
+
+
+def main() -> int:
+    """ Run the benchmark suite """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="", help="write the json results to this file instead of stdout")
+    parser.add_argument("--repeat", type=int, default=1, help="number of passes over the corpus")
+    parser.add_argument("--stages", default="to_desired_format,load_images,convert_all", help="comma separated list of stages")
+    parser.add_argument("--formats", default="", help="comma separated list of formats (default: every available format)")
+    parser.add_argument("--jobs", default="", help="comma separated list of worker counts for convert_all (default: 1 and the number of cpus)")
+    args = parser.parse_args()
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip() != ""]
+    workspace = tempfile.mkdtemp(prefix="mdi2img_bench_")
+    os.environ["TEMP"] = workspace
+    try:
+        const = CONST.Constants("MDI2TIF.EXE")
+        formats = AVAILABLE_FORMATS
+        if args.formats != "":
+            formats = [item.strip().lower() for item in args.formats.split(",")]
+        jobs_list = sorted({1, const.jobs})
+        if args.jobs != "":
+            jobs_list = [int(item) for item in args.jobs.split(",")]
+        results = []
+        if "to_desired_format" in stages:
+            results.extend(bench_to_desired_format(const, workspace, args.repeat, formats))
+        if "load_images" in stages:
+            results.extend(bench_load_images(args.repeat))
+        if "convert_all" in stages:
+            results.extend(bench_convert_all(const, workspace, args.repeat, jobs_list))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+    report = {
+        "mdi2img_version": CONST.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": args.repeat,
+        "results": results
+    }
+    content = json.dumps(report, indent=4)
+    if args.output == "":
+        print(content)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(content + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,9 @@ import tkinter as tk
 from window_asset_tkinter import WindowAsset
 from .view_image import ViewImage
 from .mdi2tiff import MDIToTiff
+from .session import ConverterSession
+
+__all__ = ["MDIToIMG", "MDIToTiff", "ViewImage", "ConverterSession"]
 
 
 class MDIToIMG:
@@ -0,0 +1,54 @@
+"""_summary_
+    This is the file in charge of publishing files atomically.
+    A file is first written to a hidden temporary sibling and renamed over its final name once it is complete,
+    so an interrupted conversion never leaves a truncated file behind that a later run would mistake for a finished one.
+"""
+
+import os
+import uuid
+
+PART_SUFFIX = ".part"
+
+
+def get_temporary_sibling(path: str) -> str:
+    """_summary_
+    Get a unique temporary name in the same folder as a file (the rename is only atomic within a filesystem).
+    The extension is kept at the end of the name for the programs that rely on it.
+
+    Args:
+        path (str): _description_: The final path of the file.
+
+    Returns:
+        str: _description_: The path to write the file to before publishing it.
+    """
+    folder, name = os.path.split(path)
+    stem, extension = os.path.splitext(name)
+    token = uuid.uuid4().hex[:12]
+    return os.path.join(folder, f".{stem}.{token}{PART_SUFFIX}{extension}")
+
+
+def publish_file(temporary_path: str, path: str) -> None:
+    """_summary_
+    Move a complete temporary file to its final name, replacing any previous version.
+
+    Args:
+        temporary_path (str): _description_: The path the file was written to.
+        path (str): _description_: The final path of the file.
+
+    Raises:
+        OSError: _description_: The file could not be renamed.
+    """
+    os.replace(temporary_path, path)
+
+
+def discard_file(temporary_path: str) -> None:
+    """_summary_
+    Remove a temporary file that will not be published, if it exists.
+
+    Args:
+        temporary_path (str): _description_: The path the file was written to.
+    """
+    try:
+        os.remove(temporary_path)
+    except OSError:
+        pass
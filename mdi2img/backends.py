@@ -0,0 +1,315 @@
+"""_summary_
+    This is the file in charge of the engines that turn an mdi file into images.
+    In-process backends return the decoded pages, the external backend runs the windows binary which writes a tiff file.
+    A converter tries its in-process backends first and falls back to the binary, so a new engine only has to implement decode.
+"""
+
+import abc
+import time
+import asyncio
+import hashlib
+from typing import Dict, List, Union
+
+from PIL import Image
+
+from .constants import Constants, ERROR, SUCCESS
+from .launcher import Launcher, LaunchResult
+from .mdi_decoder import MDIDecoder
+from .wine import WineBridge
+
+# The backends tried, in this order, by the 'auto' backend
+AUTO_BACKENDS = ("native", "exe")
+
+DEFAULT_FAKE_SIZE = (64, 64)
+DEFAULT_FAKE_PAGES = 1
+
+
+class ConversionBackend(abc.ABC):
+    """_summary_
+    The base class of the conversion engines.
+    """
+
+    name = ""
+    # False for the backends that write the tiff file themselves instead of returning the pages
+    in_process = True
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+        """
+        self.const: Constants = constants
+        self.success = success
+        self.error = error
+
+    def is_available(self) -> bool:
+        """_summary_
+        Check if the backend can be used on this computer.
+
+        Returns:
+            bool: _description_: True if the backend can convert files.
+        """
+        return True
+
+    @abc.abstractmethod
+    def decode(self, input_file: str) -> Union[List[Image.Image], None]:
+        """_summary_
+        Decode the pages of an mdi file.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+
+        Returns:
+            Union[List[Image.Image], None]: _description_: The pages, None if this backend cannot decode the file.
+        """
+
+
+class NativeBackend(ConversionBackend):
+    """_summary_
+    The backend decoding the pages with Pillow, only for the files that do not use the proprietary MODI compression.
+    """
+
+    name = "native"
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR, decoder: Union[MDIDecoder, None] = None) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+            decoder (Union[MDIDecoder, None], optional): _description_: The decoder to use, None creates one. Defaults to None.
+        """
+        super().__init__(constants, success, error)
+        self.decoder = decoder
+        if self.decoder is None:
+            self.decoder = MDIDecoder(self.const, self.success, self.error)
+
+    def decode(self, input_file: str) -> Union[List[Image.Image], None]:
+        """_summary_
+        Decode the pages of an mdi file with the native decoder.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+
+        Returns:
+            Union[List[Image.Image], None]: _description_: The pages, None if a page requires the binary.
+        """
+        return self.decoder.decode(input_file)
+
+
+class FakeBackend(ConversionBackend):
+    """_summary_
+    The backend used to exercise the batch machinery without the binary.
+    Every file gives the same images on every run (their pixels are derived from the content of the file) after a configurable delay.
+    """
+
+    name = "fake"
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR, latency: float = 0, size: tuple = DEFAULT_FAKE_SIZE, pages: int = DEFAULT_FAKE_PAGES) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+            latency (float, optional): _description_: The number of seconds spent on each file. Defaults to 0.
+            size (tuple, optional): _description_: The width and height of the pages. Defaults to DEFAULT_FAKE_SIZE.
+            pages (int, optional): _description_: The number of pages of each file. Defaults to DEFAULT_FAKE_PAGES.
+        """
+        super().__init__(constants, success, error)
+        self.latency = max(0.0, latency)
+        self.size = size
+        self.pages = max(1, pages)
+
+    def decode(self, input_file: str) -> Union[List[Image.Image], None]:
+        """_summary_
+        Produce the pages of a file.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+
+        Raises:
+            OSError: _description_: The file could not be read.
+
+        Returns:
+            Union[List[Image.Image], None]: _description_: The pages.
+        """
+        with open(input_file, "rb") as file:
+            digest = hashlib.sha256(file.read()).digest()
+        if self.latency > 0:
+            time.sleep(self.latency)
+        width, height = self.size
+        images = []
+        for index in range(self.pages):
+            seed = hashlib.sha256(digest + index.to_bytes(4, "little")).digest()
+            pixels = (seed * (width * height // len(seed) + 1))[:width * height]
+            images.append(Image.frombytes("L", (width, height), pixels))
+        return images
+
+
+class ExeBackend(ConversionBackend):
+    """_summary_
+    The backend running the windows binary (through the launcher prefix when there is one).
+    """
+
+    name = "exe"
+    in_process = False
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR, launcher: str = "", wineserver: str = "") -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+            launcher (str, optional): _description_: The command placed before the binary (for instance 'wine'). Defaults to "".
+            wineserver (str, optional): _description_: The wineserver kept alive during a batch. Defaults to "".
+        """
+        super().__init__(constants, success, error)
+        self.bin_path: Union[str, None] = self.const.binary_path
+        self.launcher = Launcher(
+            constants=self.const,
+            success=self.success,
+            error=self.error
+        )
+        self.wine = WineBridge(
+            constants=self.const,
+            launcher=launcher,
+            wineserver=wineserver
+        )
+
+    def is_available(self) -> bool:
+        """_summary_
+        Check if the binary was found.
+
+        Returns:
+            bool: _description_: True if the binary can be started.
+        """
+        return self.bin_path is not None
+
+    def decode(self, input_file: str) -> Union[List[Image.Image], None]:
+        """_summary_
+        The binary writes the tiff file itself, the pages are never decoded in process.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+
+        Returns:
+            Union[List[Image.Image], None]: _description_: Always None.
+        """
+        return None
+
+    def get_command(self, input_file: str, destination: str, log_file: str) -> List[str]:
+        """_summary_
+        Build the argument list used to call the conversion binary (through the launcher prefix when there is one).
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            destination (str): _description_: The path where the binary will write the tiff file.
+            log_file (str): _description_: The path where the binary will write its log.
+
+        Returns:
+            List[str]: _description_: The command, one argument per item.
+        """
+        return self.wine.wrap([
+            self.bin_path,
+            "-source", self.wine.to_binary_path(input_file),
+            "-dest", self.wine.to_binary_path(destination),
+            "-log", self.wine.to_binary_path(log_file)
+        ])
+
+    def run(self, input_file: str, destination: str, log_file: str, timeout: Union[float, None] = None) -> LaunchResult:
+        """_summary_
+        Run the binary on a file.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            destination (str): _description_: The path where the binary will write the tiff file.
+            log_file (str): _description_: The path where the binary will write its log.
+            timeout (Union[float, None], optional): _description_: The number of seconds the binary is allowed to run for, None waits forever. Defaults to None.
+
+        Returns:
+            LaunchResult: _description_: The exit code, outputs and timings of the binary.
+        """
+        return self.launcher.run(
+            self.get_command(input_file, destination, log_file),
+            timeout
+        )
+
+    async def run_async(self, input_file: str, destination: str, log_file: str, timeout: Union[float, None] = None) -> LaunchResult:
+        """_summary_
+        The asynchronous version of run, the binary is awaited as a subprocess.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            destination (str): _description_: The path where the binary will write the tiff file.
+            log_file (str): _description_: The path where the binary will write its log.
+            timeout (Union[float, None], optional): _description_: The number of seconds the binary is allowed to run for, None waits forever. Defaults to None.
+
+        Returns:
+            LaunchResult: _description_: The exit code, outputs and timings of the binary.
+        """
+        spawn_start = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.get_command(input_file, destination, log_file),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **self.launcher.get_popen_options(timeout is not None)
+            )
+        except OSError as e:
+            self.const.perror(f"Failed to start '{self.bin_path}': '{e}'")
+            return LaunchResult(self.error, stderr=str(e), spawned=False)
+        run_start = time.perf_counter()
+        timed_out = False
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            timed_out = True
+            self.launcher.kill_process_tree(process.pid)
+            stdout, stderr = await process.communicate()
+        result = LaunchResult(
+            exit_code=self.error if timed_out is True else process.returncode,
+            stdout=stdout.decode("utf-8", errors="replace"),
+            stderr=stderr.decode("utf-8", errors="replace"),
+            spawn_time=run_start - spawn_start,
+            run_time=time.perf_counter() - run_start,
+            timed_out=timed_out
+        )
+        self.launcher.register_timings(
+            result.spawn_time,
+            result.run_time,
+            timed_out
+        )
+        return result
+
+
+def select_backends(name: str, backends: Dict[str, ConversionBackend]) -> List[ConversionBackend]:
+    """_summary_
+    Get the backends tried, in order, for each file.
+    'auto' keeps the backends of AUTO_BACKENDS that are available (the binary is kept last in any case so that its absence is reported).
+
+    Args:
+        name (str): _description_: The name of the selected backend (see CONST.AVAILABLE_BACKENDS).
+        backends (Dict[str, ConversionBackend]): _description_: The backends of the converter, by name.
+
+    Returns:
+        List[ConversionBackend]: _description_: The backends to try.
+    """
+    if name != "auto":
+        return [backends[name]]
+    selected = [
+        backends[backend] for backend in AUTO_BACKENDS
+        if backend in backends and backends[backend].is_available() is True
+    ]
+    if backends["exe"] not in selected:
+        selected.append(backends["exe"])
+    return selected
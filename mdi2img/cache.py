@@ -0,0 +1,221 @@
+"""_summary_
+    This is the file in charge of keeping the results of previous conversions so that the binary is not run twice on the same document.
+    The entries are addressed by the sha256 of the mdi file, they are published with an atomic rename and evicted from the least recently used,
+    so several processes can share the same cache folder.
+"""
+
+import os
+import uuid
+import shutil
+import threading
+from io import BytesIO
+from typing import Union, List, Tuple
+
+from .constants import Constants
+
+CACHE_FOLDER_NAME = "mdi2img_cache"
+INTERMEDIATE_FORMAT = "tiff"
+TEMPORARY_SUFFIX = ".part"
+
+
+class ConversionCache:
+    """_summary_
+    The class in charge of storing and retrieving converted images by the hash of their source document.
+    """
+
+    def __init__(self, constants: Constants, max_size: int, cache_outputs: bool = False) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            max_size (int): _description_: The maximum number of bytes the cache can hold.
+            cache_outputs (bool, optional): _description_: Also store the final outputs and not only the intermediate tiff. Defaults to False.
+        """
+        self.const: Constants = constants
+        self.max_size = max_size
+        self.cache_outputs = cache_outputs
+        self.folder = os.path.join(
+            self.const.temporary_folder,
+            CACHE_FOLDER_NAME
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_entry_path(self, key: str, img_format: str) -> str:
+        """_summary_
+        Get the location of a cache entry.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            img_format (str): _description_: The format of the stored image.
+
+        Returns:
+            str: _description_: The path of the entry.
+        """
+        return os.path.join(self.folder, key[:2], f"{key}.{img_format.lower()}")
+
+    def _list_entries(self) -> List[Tuple[float, int, str]]:
+        """_summary_
+        List the entries of the cache.
+
+        Returns:
+            List[Tuple[float, int, str]]: _description_: The (last use, size, path) of every entry.
+        """
+        entries = []
+        try:
+            with os.scandir(self.folder) as buckets:
+                for bucket in buckets:
+                    if bucket.is_dir() is False:
+                        continue
+                    with os.scandir(bucket.path) as files:
+                        for file in files:
+                            if file.name.endswith(TEMPORARY_SUFFIX) is True:
+                                continue
+                            try:
+                                stat = file.stat()
+                            except OSError:
+                                continue
+                            entries.append(
+                                (stat.st_mtime, stat.st_size, file.path)
+                            )
+        except OSError:
+            return entries
+        return entries
+
+    def _evict(self, incoming_size: int) -> None:
+        """_summary_
+        Remove the least recently used entries until the new entry fits in the quota.
+        The folder is scanned before every entry is added, since the other processes sharing the cache add entries as well
+        (the folder only holds as many entries as the quota allows, so the scan stays cheap).
+
+        Args:
+            incoming_size (int): _description_: The size of the entry about to be added.
+        """
+        with self._lock:
+            entries = self._list_entries()
+            total = sum(entry[1] for entry in entries)
+            entries.sort()
+            for _, size, path in entries:
+                if total + incoming_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.const.pdebug(f"Failed to evict '{path}': '{e}'")
+                    continue
+                total -= size
+
+    def _get(self, key: str, img_format: str, count_miss: bool = True) -> Union[BytesIO, None]:
+        """_summary_
+        Read an entry of the cache and mark it as recently used.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            img_format (str): _description_: The format of the stored image.
+            count_miss (bool, optional): _description_: Count a missing entry as a miss, False when another entry is looked up next. Defaults to True.
+
+        Returns:
+            Union[BytesIO, None]: _description_: The content of the entry, None if it is not in the cache.
+        """
+        path = self._get_entry_path(key, img_format)
+        try:
+            with open(path, "rb") as file:
+                content = BytesIO(file.read())
+            os.utime(path)
+        except OSError:
+            if count_miss is True:
+                with self._lock:
+                    self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        self.const.pdebug(f"Cache hit for '{key}' ({img_format}).")
+        return content
+
+    def _put(self, key: str, img_format: str, source: str) -> None:
+        """_summary_
+        Copy a file into the cache.
+        The copy is written next to its final location and renamed into place so readers never see a partial entry.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            img_format (str): _description_: The format of the stored image.
+            source (str): _description_: The path to the file to store.
+        """
+        if self.max_size <= 0:
+            return
+        try:
+            size = os.path.getsize(source)
+        except OSError:
+            return
+        if size > self.max_size:
+            return
+        path = self._get_entry_path(key, img_format)
+        temporary_path = f"{path}.{uuid.uuid4().hex}{TEMPORARY_SUFFIX}"
+        self._evict(size)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source, temporary_path)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            self.const.pwarning(f"Failed to store '{source}' in the cache: '{e}'")
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+    def get_intermediate(self, key: str) -> Union[BytesIO, None]:
+        """_summary_
+        Get the tiff created by the binary for a document.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+
+        Returns:
+            Union[BytesIO, None]: _description_: The content of the tiff, None if it is not in the cache.
+        """
+        return self._get(key, INTERMEDIATE_FORMAT)
+
+    def put_intermediate(self, key: str, source: str) -> None:
+        """_summary_
+        Store the tiff created by the binary for a document.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            source (str): _description_: The path to the tiff.
+        """
+        self._put(key, INTERMEDIATE_FORMAT, source)
+
+    def get_output(self, key: str, img_format: str, count_miss: bool = True) -> Union[BytesIO, None]:
+        """_summary_
+        Get a final output of a document.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            img_format (str): _description_: The format of the output.
+            count_miss (bool, optional): _description_: Count a missing output as a miss, False when the intermediate is looked up next. Defaults to True.
+
+        Returns:
+            Union[BytesIO, None]: _description_: The content of the output, None if outputs are not cached or if it is not in the cache.
+        """
+        if self.cache_outputs is False:
+            return None
+        return self._get(key, f"out.{img_format}", count_miss)
+
+    def put_output(self, key: str, img_format: str, source: str) -> None:
+        """_summary_
+        Store a final output of a document.
+
+        Args:
+            key (str): _description_: The hash of the source document.
+            img_format (str): _description_: The format of the output.
+            source (str): _description_: The path to the output.
+        """
+        if self.cache_outputs is False:
+            return
+        self._put(key, f"out.{img_format}", source)
@@ -2,12 +2,16 @@
     This is the file that is in charge of changing the default output format of the converter to one that is desired by the user.
 """
 
+import os
+from io import BytesIO
 from typing import Union, List
 
 from PIL import Image
 
 from display_tty import Disp
 from .constants import Constants, ERROR, SUCCESS
+from .retry import classify_exception, record_failure
+from .atomic_file import get_temporary_sibling, publish_file, discard_file
 
 AVAILABLE_FORMATS_HELP = {
     "png": "Portable Network Graphics is a lossless format that supports transparency. APNG (Animated PNG) is an extension supporting simple animations.",
@@ -151,12 +155,49 @@ class ChangeImageFormat:
         dest = ".".join(dest)
         return dest
 
-    def to_desired_format(self, image: str = "", output_name: str = "", img_format: str = "png") -> int:
+    def read_intermediate(self, image: str, failures: Union[List[str], None] = None) -> Union[BytesIO, None]:
+        """_summary_
+        Load an intermediate image in memory and remove it from the disk.
+
+        Args:
+            image (str): _description_: The path to the intermediate image.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failure (see retry.py), if any. Defaults to None.
+
+        Returns:
+            Union[BytesIO, None]: _description_: The content of the image, None if it could not be read.
+        """
+        try:
+            with open(image, "rb") as file:
+                content = BytesIO(file.read())
+        except OSError as e:
+            self.const.perror(f"Failed to read '{image}':\nError: '{e}'")
+            record_failure(failures, classify_exception(e))
+            return None
+        self.remove_intermediate(image)
+        return content
+
+    def remove_intermediate(self, image: str) -> None:
+        """_summary_
+        Remove an intermediate image once it is no longer needed.
+
+        Args:
+            image (str): _description_: The path to the intermediate image.
+        """
+        try:
+            os.remove(image)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            self.const.pwarning(f"Failed to remove '{image}': '{e}'")
+
+    def to_desired_format(self, image: Union[str, BytesIO] = "", output_name: str = "", img_format: str = "png", failures: Union[List[str], None] = None) -> int:
         """_summary_
         Convert an image to tiff format
+        The image is written to a temporary sibling and renamed into place once complete.
 
         Args:
-            image (str, optional): _description_: The image to convert. Defaults to "".
+            image (Union[str, BytesIO], optional): _description_: The image to convert, either a path or the content of the image. Defaults to "".
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failure (see retry.py), if any. Defaults to None.
 
         Returns:
             int: _description_: The status of the convertion (success:int  or error:int)
@@ -165,15 +206,64 @@ class ChangeImageFormat:
             self.const.pcritical("No image provided!")
             return self.error
         if output_name == "":
+            if isinstance(image, str) is False:
+                self.const.pcritical("No destination name provided!")
+                return self.error
             self.const.pwarning(
                 "Not destination name was provided, generating one."
             )
             output_name = self._get_new_name(image, img_format)
             self.const.pinfo(f"The destination name is '{output_name}'\n")
+        temporary_name = get_temporary_sibling(output_name)
+        try:
+            with Image.open(image) as img:
+                img.save(temporary_name, format=img_format)
+            publish_file(temporary_name, output_name)
+            return self.success
+        except Exception as e:
+            discard_file(temporary_name)
+            self.const.perror(f"Failed to convert image:\nError: '{e}'")
+            record_failure(failures, classify_exception(e))
+            return self.error
+
+    def images_to_desired_format(self, images: List[Image.Image], output_name: str, img_format: str = "tiff", failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Save images that are already in memory to the desired format.
+        When the format supports it, every image is saved as a page of the same file, otherwise only the first one is saved.
+        The file is written to a temporary sibling and renamed into place once complete.
+
+        Args:
+            images (List[Image.Image]): _description_: The images (pages) to save.
+            output_name (str): _description_: The path of the file to create.
+            img_format (str, optional): _description_: The format of the file to create. Defaults to "tiff".
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failure (see retry.py), if any. Defaults to None.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
+        if len(images) == 0:
+            self.const.pcritical("No image provided!")
+            return self.error
+        Image.init()
+        temporary_name = get_temporary_sibling(output_name)
         try:
-            img = Image.open(image)
-            img.save(output_name, format=img_format)
+            if len(images) > 1 and img_format.upper() in Image.SAVE_ALL:
+                images[0].save(
+                    temporary_name,
+                    format=img_format,
+                    save_all=True,
+                    append_images=images[1:]
+                )
+            else:
+                if len(images) > 1:
+                    msg = f"The format '{img_format}' does not support "
+                    msg += "multiple pages, only the first page was saved."
+                    self.const.pwarning(msg)
+                images[0].save(temporary_name, format=img_format)
+            publish_file(temporary_name, output_name)
             return self.success
         except Exception as e:
+            discard_file(temporary_name)
             self.const.perror(f"Failed to convert image:\nError: '{e}'")
+            record_failure(failures, classify_exception(e))
             return self.error
@@ -0,0 +1,233 @@
+"""_summary_
+    This is the file in charge of sharing an input tree between processes that do not know about each other.
+    Before converting a file, a process creates a claim marker next to it with an exclusive create, which only one process can win
+    (including on NFS, where exclusive creates are atomic). The claims of a process are renewed while it runs, a claim that was not
+    renewed for longer than the lease belongs to a process that died and can be taken over.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from typing import Dict, Union
+
+from .constants import Constants
+
+CLAIM_SUFFIX = ".mdi2img-claim"
+# The number of seconds after which a claim that was not renewed is considered abandoned
+DEFAULT_LEASE = 300.0
+# The claims are renewed this many times per lease
+RENEWALS_PER_LEASE = 3
+
+
+class WorkClaims:
+    """_summary_
+    The class in charge of the claims of the files converted by this process.
+    """
+
+    def __init__(self, constants: Constants, lease: float = DEFAULT_LEASE) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            lease (float, optional): _description_: The number of seconds after which a claim that was not renewed expires (it has to be longer than the clock drift between the computers). Defaults to DEFAULT_LEASE.
+        """
+        self.const: Constants = constants
+        self.lease = lease
+        if self.lease <= 0:
+            self.lease = DEFAULT_LEASE
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._held: Dict[str, str] = {}
+        self._stop_event = threading.Event()
+        self._renewer: Union[threading.Thread, None] = None
+        self.total_taken_over = 0
+
+    def get_claim_path(self, input_file: str) -> str:
+        """_summary_
+        Get the path of the claim marker of a file.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+
+        Returns:
+            str: _description_: The path of the hidden marker placed next to the file.
+        """
+        folder, name = os.path.split(input_file)
+        return os.path.join(folder, f".{name}{CLAIM_SUFFIX}")
+
+    def _is_stale(self, claim_path: str) -> bool:
+        """_summary_
+        Check if a claim was abandoned.
+
+        Args:
+            claim_path (str): _description_: The path of the claim marker.
+
+        Returns:
+            bool: _description_: True if the claim was not renewed during the lease.
+        """
+        try:
+            return time.time() - os.stat(claim_path).st_mtime > self.lease
+        except OSError:
+            return False
+
+    def _read_owner(self, claim_path: str) -> Union[str, None]:
+        """_summary_
+        Read the owner recorded in a claim marker.
+
+        Args:
+            claim_path (str): _description_: The path of the claim marker.
+
+        Returns:
+            Union[str, None]: _description_: The owner, None if the marker cannot be read.
+        """
+        try:
+            with open(claim_path, "r", encoding="utf-8") as file:
+                return json.load(file).get("owner")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _break_stale_claim(self, claim_path: str) -> None:
+        """_summary_
+        Remove an abandoned claim.
+        The marker is first renamed to a name of its own, so when several processes find the same stale claim only one of them removes it.
+
+        Args:
+            claim_path (str): _description_: The path of the claim marker.
+        """
+        stale_path = f"{claim_path}.{uuid.uuid4().hex[:12]}.stale"
+        try:
+            os.rename(claim_path, stale_path)
+        except OSError:
+            return
+        if self._is_stale(stale_path) is False:
+            # The owner renewed the claim after it was checked, it is put back unless someone claimed the file meanwhile
+            try:
+                os.link(stale_path, claim_path)
+            except OSError:
+                pass
+        else:
+            self.const.pwarning(f"Taking over the abandoned claim '{claim_path}'.")
+            with self._lock:
+                self.total_taken_over += 1
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    def claim(self, input_file: str) -> bool:
+        """_summary_
+        Try to claim a file.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+
+        Returns:
+            bool: _description_: True if this process now owns the file, False if another process is converting it.
+        """
+        claim_path = self.get_claim_path(input_file)
+        for _ in range(2):
+            try:
+                descriptor = os.open(
+                    claim_path,
+                    os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                    0o644
+                )
+            except FileExistsError:
+                if self._is_stale(claim_path) is False:
+                    return False
+                self._break_stale_claim(claim_path)
+                continue
+            except OSError as e:
+                self.const.perror(f"Failed to claim '{input_file}': '{e}'")
+                return False
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(
+                    {"owner": self.owner, "claimed_at": time.time(), "lease": self.lease},
+                    file
+                )
+            with self._lock:
+                self._held[input_file] = claim_path
+            return True
+        return False
+
+    def release(self, input_file: str) -> None:
+        """_summary_
+        Give up the claim of a file, once it was converted or when it will not be converted.
+        A claim that another process took over (this one stalled for longer than the lease) is left to its new owner.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+        """
+        with self._lock:
+            claim_path = self._held.pop(input_file, None)
+        if claim_path is None:
+            return
+        # The claim may have been taken over while this process was stalled, it is moved aside so that its owner can be checked
+        released_path = f"{claim_path}.{uuid.uuid4().hex[:12]}.released"
+        try:
+            os.rename(claim_path, released_path)
+        except OSError as e:
+            self.const.pdebug(f"Failed to remove the claim '{claim_path}': '{e}'")
+            return
+        if self._read_owner(released_path) != self.owner:
+            self.const.pwarning(
+                f"The claim '{claim_path}' was taken over by another process, leaving it in place."
+            )
+            try:
+                os.link(released_path, claim_path)
+            except OSError:
+                pass
+        try:
+            os.remove(released_path)
+        except OSError as e:
+            self.const.pdebug(f"Failed to remove the claim '{released_path}': '{e}'")
+
+    def renew(self) -> None:
+        """_summary_
+        Renew the claims held by this process.
+        """
+        with self._lock:
+            claim_paths = list(self._held.values())
+        for claim_path in claim_paths:
+            try:
+                os.utime(claim_path, None)
+            except OSError as e:
+                self.const.pwarning(f"Failed to renew the claim '{claim_path}': '{e}'")
+
+    def _renew_until_stopped(self) -> None:
+        """_summary_
+        The loop of the thread renewing the claims.
+        """
+        interval = self.lease / RENEWALS_PER_LEASE
+        while self._stop_event.wait(interval) is False:
+            self.renew()
+
+    def start(self) -> None:
+        """_summary_
+        Start renewing the claims in the background.
+        """
+        if self._renewer is not None:
+            return
+        self._stop_event.clear()
+        self._renewer = threading.Thread(
+            target=self._renew_until_stopped,
+            name="mdi2img-claims",
+            daemon=True
+        )
+        self._renewer.start()
+
+    def stop(self) -> None:
+        """_summary_
+        Stop renewing the claims and give up the ones still held.
+        """
+        if self._renewer is not None:
+            self._stop_event.set()
+            self._renewer.join()
+            self._renewer = None
+        with self._lock:
+            input_files = list(self._held)
+        for input_file in input_files:
+            self.release(input_file)
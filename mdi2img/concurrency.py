@@ -0,0 +1,186 @@
+"""_summary_
+    This is the file in charge of finding the number of conversions to run at the same time while a folder is converted.
+    The best level depends on the host: the binary under Wine, the image encoders and network shares saturate at different levels.
+    The controller measures the number of input bytes converted per second at the current level (the files are handed out largest
+    first, so a count of files would favour the levels measured at the end of the batch) and climbs towards the level
+    with the highest throughput, one worker at a time, the usage of the cpus and of the disks is measured alongside.
+"""
+
+import os
+import time
+from typing import Callable, Dict, Union
+
+from .constants import Constants
+
+# The number of seconds a level is measured for before it is changed
+DEFAULT_INTERVAL = 5.0
+# The minimum number of files finished at a level before it is changed
+MIN_SAMPLES = 4
+# The relative change of throughput below which two levels are considered equal
+TOLERANCE = 0.05
+# The highest level tried, as a multiple of the number of available cpus (the binary and the shares mostly wait)
+MAX_JOBS_FACTOR = 4
+# The share of the cpus above which adding workers only adds contention
+CPU_SATURATION = 0.95
+
+
+def read_io_bytes() -> Union[int, None]:
+    """_summary_
+    Get the number of bytes read and written by this process so far.
+
+    Returns:
+        Union[int, None]: _description_: The number of bytes, None if the system does not provide it.
+    """
+    try:
+        with open("/proc/self/io", "r", encoding="utf-8") as file:
+            counters = dict(line.split(":", 1) for line in file if ":" in line)
+        return int(counters["read_bytes"]) + int(counters["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def read_cpu_time() -> float:
+    """_summary_
+    Get the cpu time used by this process and the processes it waited for (the binary) so far.
+
+    Returns:
+        float: _description_: The number of cpu seconds.
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class ConcurrencyController:
+    """_summary_
+    The class in charge of raising and lowering the number of conversions running at the same time to find the throughput peak.
+    It is only used from the thread that dispatches the files.
+    """
+
+    def __init__(self, constants: Constants, max_jobs: int = 0, min_jobs: int = 1, initial_jobs: int = 0, interval: float = DEFAULT_INTERVAL, clock: Callable[[], float] = time.monotonic) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            max_jobs (int, optional): _description_: The highest level tried, 0 uses MAX_JOBS_FACTOR times the number of available cpus (it never exceeds the number of conversions the memory limit can hold). Defaults to 0.
+            min_jobs (int, optional): _description_: The lowest level tried. Defaults to 1.
+            initial_jobs (int, optional): _description_: The first level measured, 0 uses the number of available cpus. Defaults to 0.
+            interval (float, optional): _description_: The number of seconds a level is measured for before it is changed. Defaults to DEFAULT_INTERVAL.
+            clock (Callable[[], float], optional): _description_: The clock used to measure the throughput. Defaults to time.monotonic.
+        """
+        self.const: Constants = constants
+        # The memory limit only caps max_jobs, the cpus give the scale of the levels tried
+        self.cpus = max(1, self.const.cpu_jobs)
+        self.min_jobs = max(1, min_jobs)
+        self.max_jobs = max_jobs
+        if self.max_jobs < 1:
+            self.max_jobs = self.cpus * MAX_JOBS_FACTOR
+        if self.const.memory_jobs_limit is not None:
+            # The hill climb only sees the throughput, going over what the memory limit holds would get the container killed
+            self.max_jobs = min(self.max_jobs, self.const.memory_jobs_limit)
+        self.max_jobs = max(self.min_jobs, self.max_jobs)
+        self.jobs = initial_jobs
+        if self.jobs < 1:
+            self.jobs = self.cpus
+        self.jobs = min(max(self.jobs, self.min_jobs), self.max_jobs)
+        self.interval = interval
+        self.clock = clock
+        self.direction = 1
+        self.throughputs: Dict[int, float] = {}
+        self.total_adjustments = 0
+        self._previous_throughput: Union[float, None] = None
+        self._start_window()
+
+    def _start_window(self) -> None:
+        """_summary_
+        Start measuring the current level.
+        """
+        self._window_start = self.clock()
+        self._window_completed = 0
+        self._window_bytes = 0
+        self._window_cpu = read_cpu_time()
+        self._window_io = read_io_bytes()
+
+    def record_completion(self, size: int = 0) -> bool:
+        """_summary_
+        Count a finished file, the level is changed once it was measured for long enough.
+
+        Args:
+            size (int, optional): _description_: The size of the input file in bytes (an empty or unreachable file still counts for one byte). Defaults to 0.
+
+        Returns:
+            bool: _description_: True if the level changed.
+        """
+        self._window_completed += 1
+        self._window_bytes += max(1, size)
+        elapsed = self.clock() - self._window_start
+        if elapsed < self.interval or self._window_completed < max(MIN_SAMPLES, self.jobs):
+            return False
+        return self._adjust(elapsed)
+
+    def _adjust(self, elapsed: float) -> bool:
+        """_summary_
+        Compare the throughput of the current level with the previous one and move towards the better of the two.
+
+        Args:
+            elapsed (float): _description_: The number of seconds the current level was measured for.
+
+        Returns:
+            bool: _description_: True if the level changed.
+        """
+        throughput = self._window_bytes / elapsed
+        cpu_usage = (read_cpu_time() - self._window_cpu) / (elapsed * self.cpus)
+        io_bytes = read_io_bytes()
+        msg = f"Concurrency: {self.jobs} workers converted {self._window_completed / elapsed:.2f} files/s, "
+        msg += f"{throughput / (1024 * 1024):.2f} MiB/s (cpu {cpu_usage:.0%}"
+        if io_bytes is not None and self._window_io is not None:
+            msg += f", disk {(io_bytes - self._window_io) / elapsed / (1024 * 1024):.1f} MiB/s"
+        self.const.pdebug(f"{msg}).")
+        self.throughputs[self.jobs] = throughput
+        previous = self._previous_throughput
+        self._previous_throughput = throughput
+        if previous is not None:
+            if throughput < previous * (1 - TOLERANCE):
+                # The last step made things worse, go back the other way
+                self.direction = -self.direction
+            elif throughput <= previous * (1 + TOLERANCE) and self.direction > 0:
+                # More workers bring nothing, the fewer the better
+                self.direction = -1
+        if self.direction > 0 and cpu_usage >= CPU_SATURATION:
+            self.direction = -1
+        target = self.jobs + self.direction
+        if target < self.min_jobs or target > self.max_jobs:
+            self.direction = -self.direction
+            target = self.jobs + self.direction
+        target = min(max(target, self.min_jobs), self.max_jobs)
+        changed = target != self.jobs
+        if changed is True:
+            self.const.pdebug(f"Concurrency: moving to {target} workers.")
+            self.jobs = target
+            self.total_adjustments += 1
+        self._start_window()
+        return changed
+
+    def get_best_jobs(self) -> int:
+        """_summary_
+        Get the level with the highest measured throughput.
+
+        Returns:
+            int: _description_: The number of workers, the current level if none was measured.
+        """
+        if len(self.throughputs) == 0:
+            return self.jobs
+        return max(self.throughputs, key=lambda jobs: (self.throughputs[jobs], -jobs))
+
+    def log_summary(self) -> None:
+        """_summary_
+        Display the level that was chosen so that it can be pinned with --jobs for the next runs.
+        """
+        best = self.get_best_jobs()
+        if best not in self.throughputs:
+            self.const.pinfo(
+                f"Adaptive concurrency: not enough files to measure a level, {best} workers were used (use --jobs=<n> to pin a level)."
+            )
+            return
+        self.const.pinfo(
+            f"Adaptive concurrency: the best level was {best} workers ({self.throughputs[best] / (1024 * 1024):.2f} MiB/s), use --jobs={best} to pin it."
+        )
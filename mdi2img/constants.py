@@ -6,7 +6,8 @@
 ##
 
 import os
-from typing import Union
+import math
+from typing import List, Union
 from random import randint
 from display_tty import Disp, TOML_CONF
 from . import logo as LOG
@@ -14,8 +15,34 @@ from . import logo as LOG
 SUCCESS = 0
 ERROR = 1
 ERR = ERROR
+# The status of a conversion that was stopped because it ran for too long (same value as the timeout command)
+TIMEOUT = 124
 TMP_IMG_FOLDER = "%TEMP%/mdi_to_img_temp"
 
+# auto: decode natively when possible, use the binary otherwise
+# fake: deterministic images without the binary, to exercise the batch machinery
+AVAILABLE_BACKENDS = ("auto", "exe", "native", "fake")
+# The samples use the MODI compression (34720) that the native decoder cannot read, so the binary stays the default
+DEFAULT_BACKEND = "exe"
+
+# size: the largest files first (among the next files of the walk) so that a huge file does not start last and keep a single worker busy
+# pages: the files with the largest decoded pages first (read from the page headers), the size is used for the others
+# directory: the order of the walk, the files of a folder are converted together
+AVAILABLE_SCHEDULES = ("size", "pages", "directory")
+DEFAULT_SCHEDULE = "size"
+
+# The number of workers that makes a folder conversion measure its throughput and pick the number of workers itself
+AUTO_JOBS = "auto"
+
+# The folder where the cgroup hierarchies are mounted (the container limits are read from it)
+CGROUP_ROOT = "/sys/fs/cgroup"
+# The file listing the cgroups of this process
+PROC_CGROUP = "/proc/self/cgroup"
+# The memory a conversion is expected to use (binary, decoded pages and format change), used to size the default number of workers
+MEMORY_PER_JOB = 256 * 1024 * 1024
+# cgroup v1 reports an unlimited memory as a value close to the largest 64 bit integer
+UNLIMITED_MEMORY = 1 << 60
+
 SELECTED_LIST = LOG.__logo_ascii_art__
 SPLASH_NAME = list(SELECTED_LIST)[randint(0, len(SELECTED_LIST) - 1)]
 SPLASH = SELECTED_LIST[SPLASH_NAME]
@@ -37,6 +64,12 @@ class Constants:
         self.in_directory = f"{os.getcwd()}/in"
         self.out_directory = f"{os.getcwd()}/out"
         self.out_format = output_format
+        self.cpu_count = self._get_available_cpus()
+        self.cpu_quota = self._get_cgroup_cpu_quota()
+        self.memory_limit = self._get_cgroup_memory_limit()
+        self.memory_jobs_limit = self._get_memory_jobs_limit()
+        self.cpu_jobs = self._get_cpu_jobs()
+        self.jobs = self._get_default_jobs()
         self.dttyi = Disp(
             toml_content=TOML_CONF,
             save_to_file=False,
@@ -64,6 +97,166 @@ class Constants:
             return env["TMP"]
         return os.getcwd()
 
+    def _get_available_cpus(self) -> int:
+        """_summary_
+        Get the number of cpus this process is allowed to run on (taskset, cpusets), the cpus of the computer otherwise.
+
+        Returns:
+            int: _description_: The number of cpus (at least 1).
+        """
+        if hasattr(os, "sched_getaffinity") is True:
+            try:
+                return max(1, len(os.sched_getaffinity(0)))
+            except OSError:
+                pass
+        cpu_count = os.cpu_count()
+        if cpu_count is None or cpu_count < 1:
+            return 1
+        return cpu_count
+
+    def _read_cgroup_file(self, path: str) -> Union[str, None]:
+        """_summary_
+        Read a cgroup control file.
+
+        Args:
+            path (str): _description_: The path to the file.
+
+        Returns:
+            Union[str, None]: _description_: The content of the file without the surrounding spaces, None if it cannot be read.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return file.read().strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _get_cgroup_folders(self, controller: str) -> List[str]:
+        """_summary_
+        Get the cgroup folders of this process for a controller, from its own group up to the root (a limit set on a parent applies as well).
+
+        Args:
+            controller (str): _description_: The cgroup v1 controller ('cpu' or 'memory'), cgroup v2 has a single hierarchy.
+
+        Returns:
+            List[str]: _description_: The folders, the cgroup v2 ones first.
+        """
+        content = self._read_cgroup_file(PROC_CGROUP)
+        if content is None:
+            return []
+        folders = []
+        for line in content.splitlines():
+            parts = line.split(":", 2)
+            if len(parts) != 3:
+                continue
+            _, controllers, group = parts
+            if controllers == "":
+                base = CGROUP_ROOT
+            elif controller in controllers.split(","):
+                base = os.path.join(CGROUP_ROOT, controllers)
+                if os.path.isdir(base) is False:
+                    base = os.path.join(CGROUP_ROOT, controller)
+            else:
+                continue
+            # Inside a container the group is often reported relative to a root that is not mounted, the mount root is checked in any case
+            group = group.strip("/")
+            while True:
+                folder = os.path.join(base, group) if group != "" else base
+                if os.path.isdir(folder) is True and folder not in folders:
+                    folders.append(folder)
+                if group == "":
+                    break
+                group = os.path.dirname(group)
+        return folders
+
+    def _get_cgroup_cpu_quota(self) -> Union[float, None]:
+        """_summary_
+        Get the cpu quota of the container (cgroup v2 cpu.max, cgroup v1 cpu.cfs_quota_us).
+
+        Returns:
+            Union[float, None]: _description_: The number of cpus the quota allows, None if there is no quota.
+        """
+        quotas = []
+        for folder in self._get_cgroup_folders("cpu"):
+            content = self._read_cgroup_file(os.path.join(folder, "cpu.max"))
+            if content is not None:
+                # 'max 100000' when there is no quota
+                parts = content.split()
+            else:
+                quota = self._read_cgroup_file(
+                    os.path.join(folder, "cpu.cfs_quota_us")
+                )
+                period = self._read_cgroup_file(
+                    os.path.join(folder, "cpu.cfs_period_us")
+                )
+                parts = [quota, period]
+            try:
+                quota, period = int(parts[0]), int(parts[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if quota > 0 and period > 0:
+                quotas.append(quota / period)
+        if len(quotas) == 0:
+            return None
+        return min(quotas)
+
+    def _get_cgroup_memory_limit(self) -> Union[int, None]:
+        """_summary_
+        Get the memory limit of the container (cgroup v2 memory.max, cgroup v1 memory.limit_in_bytes).
+
+        Returns:
+            Union[int, None]: _description_: The limit in bytes, None if there is no limit.
+        """
+        limits = []
+        for folder in self._get_cgroup_folders("memory"):
+            for name in ("memory.max", "memory.limit_in_bytes"):
+                content = self._read_cgroup_file(os.path.join(folder, name))
+                if content is None or content.isdigit() is False:
+                    continue
+                limit = int(content)
+                if 0 < limit < UNLIMITED_MEMORY:
+                    limits.append(limit)
+        if len(limits) == 0:
+            return None
+        return min(limits)
+
+    def _get_memory_jobs_limit(self) -> Union[int, None]:
+        """_summary_
+        Get the number of conversions the memory limit of the container can hold (MEMORY_PER_JOB per conversion).
+
+        Returns:
+            Union[int, None]: _description_: The number of conversions (at least 1), None if there is no memory limit.
+        """
+        if self.memory_limit is None:
+            return None
+        return max(1, self.memory_limit // MEMORY_PER_JOB)
+
+    def _get_cpu_jobs(self) -> int:
+        """_summary_
+        Get the number of conversions the cpus can run at the same time.
+        It honours the cpus this process may run on and the cpu quota of its container, but not its memory limit.
+
+        Returns:
+            int: _description_: The number of cpus available to the conversions (at least 1).
+        """
+        jobs = self.cpu_count
+        if self.cpu_quota is not None:
+            jobs = min(jobs, max(1, math.floor(self.cpu_quota)))
+        return max(1, jobs)
+
+    def _get_default_jobs(self) -> int:
+        """_summary_
+        Get the default number of conversions that can run at the same time.
+        It honours the cpus this process may run on, the cpu quota of its container and its memory limit (MEMORY_PER_JOB per conversion),
+        so that a container does not start one worker per cpu of the host.
+
+        Returns:
+            int: _description_: The default number of workers (at least 1).
+        """
+        jobs = self.cpu_jobs
+        if self.memory_jobs_limit is not None:
+            jobs = min(jobs, self.memory_jobs_limit)
+        return max(1, jobs)
+
     def _find_mdi2tiff_binary(self, binary_name: str = "MDI2TIF.EXE") -> Union[str, None]:
         """
         Search for the mdi2tiff binary in the module's directory.
@@ -129,7 +322,10 @@ class Constants:
         Args:
             string (str, optional): _description_. Defaults to "".
         """
-        self.dttyi.logger.success("(mdi2img) %s", string)
+        if hasattr(self.dttyi.logger, "success") is True:
+            self.dttyi.logger.success("(mdi2img) %s", string)
+        else:
+            self.dttyi.logger.info("(mdi2img) %s", string)
 
     def pinfo(self, string: str = "") -> None:
         """_summary_
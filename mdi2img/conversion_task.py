@@ -0,0 +1,53 @@
+"""_summary_
+    This is the file containing the description of a file to convert during a folder conversion.
+"""
+
+import os
+from typing import Union
+
+
+class ConversionTask:
+    """_summary_
+    A file found during a folder conversion and the place where its conversion will be written.
+    """
+
+    def __init__(self, input_file: str, output_file: str, relative_path: str, entry: Union[os.DirEntry, None] = None) -> None:
+        """_summary_
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+            output_file (str): _description_: The path to the file to create.
+            relative_path (str): _description_: The path of the mdi file relative to the input directory (with '/' separators).
+            entry (Union[os.DirEntry, None], optional): _description_: The directory entry the file was found with, its stat data is reused when available. Defaults to None.
+        """
+        self.input_file = input_file
+        self.output_file = output_file
+        self.relative_path = relative_path
+        self.entry = entry
+        self.fingerprint: Union[str, None] = None
+
+    def get_stat(self) -> Union[os.stat_result, None]:
+        """_summary_
+        Get the stat data of the input file, the data cached by the directory entry is used when available.
+
+        Returns:
+            Union[os.stat_result, None]: _description_: The stat data, None if the file cannot be reached.
+        """
+        try:
+            if self.entry is not None:
+                return self.entry.stat()
+            return os.stat(self.input_file)
+        except OSError:
+            return None
+
+    def get_size(self) -> int:
+        """_summary_
+        Get the size of the input file.
+
+        Returns:
+            int: _description_: The size in bytes, 0 if the file cannot be reached.
+        """
+        stat = self.get_stat()
+        if stat is None:
+            return 0
+        return stat.st_size
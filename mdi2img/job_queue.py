@@ -0,0 +1,558 @@
+"""_summary_
+    This is the file in charge of the persistent job queue.
+    Producers add files to a local SQLite database and workers, started independently, take them one at a time and convert them.
+    The queue survives restarts: a job taken by a worker that died is handed out again once its lease expires.
+
+    States of a job:
+        * queued    waiting for a worker
+        * running   taken by a worker
+        * done      converted (or skipped because the output already existed)
+        * failed    the conversion failed, or the job was abandoned by its workers too many times
+    A job whose conversion failed for a transient reason (see retry.py) is queued again until it ran out of attempts.
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Union
+
+from .constants import Constants, SUCCESS, ERROR
+from .mdi2tiff import MDIToTiff
+from .retry import TRANSIENT, classify_exception, record_failure
+
+QUEUE_NAME = "mdi2img_queue.sqlite3"
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATES = (STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_FAILED)
+
+# The number of times a job can be taken by a worker
+DEFAULT_MAX_ATTEMPTS = 3
+# The number of seconds after which a running job whose worker did not report back is handed out again
+DEFAULT_JOB_LEASE = 3600.0
+# The number of seconds a worker waits before looking at an empty queue again
+DEFAULT_POLL_INTERVAL = 1.0
+# The number of seconds a connection waits for a lock held by another process
+SQLITE_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_file TEXT NOT NULL,
+    output_file TEXT NOT NULL,
+    format TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    status INTEGER,
+    worker TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, id);
+"""
+
+
+class QueueJob:
+    """_summary_
+    A row of the job queue.
+    """
+
+    def __init__(self, row: sqlite3.Row) -> None:
+        """_summary_
+
+        Args:
+            row (sqlite3.Row): _description_: The row read from the jobs table.
+        """
+        self.id: int = row["id"]
+        self.input_file: str = row["input_file"]
+        self.output_file: str = row["output_file"]
+        self.format: str = row["format"]
+        self.state: str = row["state"]
+        self.attempts: int = row["attempts"]
+        self.max_attempts: int = row["max_attempts"]
+        self.status: Union[int, None] = row["status"]
+        self.worker: Union[str, None] = row["worker"]
+        self.enqueued_at: float = row["enqueued_at"]
+        self.started_at: Union[float, None] = row["started_at"]
+        self.finished_at: Union[float, None] = row["finished_at"]
+        self.duration: Union[float, None] = row["duration"]
+
+    def to_dict(self) -> Dict[str, object]:
+        """_summary_
+        Get the content of the job.
+
+        Returns:
+            Dict[str, object]: _description_: The columns of the job.
+        """
+        return dict(self.__dict__)
+
+
+class JobQueue:
+    """_summary_
+    The class in charge of the jobs stored in the database, every method opens its own connection so the queue can be shared between threads and processes.
+    """
+
+    def __init__(self, constants: Constants, path: str = "", lease: float = DEFAULT_JOB_LEASE) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            path (str, optional): _description_: The path of the database, an empty string uses QUEUE_NAME in the temporary folder. Defaults to "".
+            lease (float, optional): _description_: The number of seconds after which a running job is considered abandoned (it has to be longer than the longest conversion). Defaults to DEFAULT_JOB_LEASE.
+        """
+        self.const: Constants = constants
+        self.path = path
+        if self.path == "":
+            self.path = os.path.join(self.const.temporary_folder, QUEUE_NAME)
+        self.lease = lease
+        if self.lease <= 0:
+            self.lease = DEFAULT_JOB_LEASE
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """_summary_
+        Open a connection to the database for the duration of a with block, it is closed when the block ends.
+        The connection is in autocommit mode, the transactions that span several statements are started explicitly.
+
+        Yields:
+            Iterator[sqlite3.Connection]: _description_: The connection.
+        """
+        connection = sqlite3.connect(
+            self.path,
+            timeout=SQLITE_TIMEOUT,
+            isolation_level=None
+        )
+        try:
+            connection.row_factory = sqlite3.Row
+            yield connection
+        finally:
+            connection.close()
+
+    def get_output_file(self, input_file: str, img_format: str, output_directory: str = "") -> str:
+        """_summary_
+        Get the default destination of a file.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+            img_format (str): _description_: The destination format.
+            output_directory (str, optional): _description_: The folder of the converted file, an empty string uses the folder of the input. Defaults to "".
+
+        Returns:
+            str: _description_: The path of the converted file.
+        """
+        folder, name = os.path.split(os.path.abspath(input_file))
+        if output_directory != "":
+            folder = os.path.abspath(output_directory)
+        return os.path.join(folder, f"{os.path.splitext(name)[0]}.{img_format}")
+
+    def enqueue(self, input_file: str, output_file: str = "", img_format: str = "tiff", max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """_summary_
+        Add a file to the queue.
+
+        Args:
+            input_file (str): _description_: The path to the mdi file.
+            output_file (str, optional): _description_: The path of the converted file, an empty string places it next to the input. Defaults to "".
+            img_format (str, optional): _description_: The destination format. Defaults to "tiff".
+            max_attempts (int, optional): _description_: The number of times the job can be taken by a worker. Defaults to DEFAULT_MAX_ATTEMPTS.
+
+        Returns:
+            int: _description_: The identifier of the job.
+        """
+        if output_file == "":
+            output_file = self.get_output_file(input_file, img_format)
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (input_file, output_file, format, state, max_attempts, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.abspath(input_file),
+                    os.path.abspath(output_file),
+                    img_format,
+                    STATE_QUEUED,
+                    max(1, max_attempts),
+                    time.time()
+                )
+            )
+            return cursor.lastrowid
+
+    def enqueue_path(self, path: str, img_format: str = "tiff", output_directory: str = "", recursive: bool = False) -> List[int]:
+        """_summary_
+        Add a file, or the mdi files of a folder, to the queue.
+
+        Args:
+            path (str): _description_: The mdi file or the folder.
+            img_format (str, optional): _description_: The destination format. Defaults to "tiff".
+            output_directory (str, optional): _description_: The folder of the converted files (the tree of a folder is mirrored in it), an empty string places them next to the inputs. Defaults to "".
+            recursive (bool, optional): _description_: Also add the files of the sub-folders. Defaults to False.
+
+        Returns:
+            List[int]: _description_: The identifiers of the jobs.
+        """
+        if os.path.isdir(path) is False:
+            return [
+                self.enqueue(
+                    path,
+                    self.get_output_file(path, img_format, output_directory),
+                    img_format
+                )
+            ]
+        job_ids = []
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            if recursive is False:
+                directories.clear()
+            destination = ""
+            if output_directory != "":
+                destination = os.path.join(
+                    output_directory,
+                    os.path.relpath(root, path)
+                )
+            for name in sorted(files):
+                if name.endswith(".mdi") is False:
+                    continue
+                input_file = os.path.join(root, name)
+                job_ids.append(
+                    self.enqueue(
+                        input_file,
+                        self.get_output_file(input_file, img_format, destination),
+                        img_format
+                    )
+                )
+        return job_ids
+
+    def _requeue_abandoned(self, connection: sqlite3.Connection) -> None:
+        """_summary_
+        Hand out again the running jobs whose lease expired, or fail them when they ran out of attempts.
+        Must be called inside a write transaction.
+
+        Args:
+            connection (sqlite3.Connection): _description_: The connection holding the transaction.
+        """
+        expired = time.time() - self.lease
+        connection.execute(
+            "UPDATE jobs SET state = ?, worker = NULL WHERE state = ? AND started_at < ? AND attempts < max_attempts",
+            (STATE_QUEUED, STATE_RUNNING, expired)
+        )
+        connection.execute(
+            "UPDATE jobs SET state = ?, finished_at = ? WHERE state = ? AND started_at < ?",
+            (STATE_FAILED, time.time(), STATE_RUNNING, expired)
+        )
+
+    def take(self, worker: str) -> Union[QueueJob, None]:
+        """_summary_
+        Take the oldest queued job.
+
+        Args:
+            worker (str): _description_: The name of the worker taking the job.
+
+        Returns:
+            Union[QueueJob, None]: _description_: The job, None if the queue is empty.
+        """
+        with self._connect() as connection:
+            # IMMEDIATE takes the write lock first, so two workers never read the same queued job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_abandoned(connection)
+                row = connection.execute(
+                    "SELECT id FROM jobs WHERE state = ? ORDER BY id LIMIT 1",
+                    (STATE_QUEUED,)
+                ).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                connection.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, worker = ?, started_at = ?, finished_at = NULL, duration = NULL WHERE id = ?",
+                    (STATE_RUNNING, worker, time.time(), row["id"])
+                )
+                job = connection.execute(
+                    "SELECT * FROM jobs WHERE id = ?",
+                    (row["id"],)
+                ).fetchone()
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+        return QueueJob(job)
+
+    def finish(self, job_id: int, worker: str, status: int, succeeded: bool) -> bool:
+        """_summary_
+        Record the outcome of a job.
+        Only the worker currently holding the job can finish it: a worker whose lease expired must not overwrite the attempt of the worker the job was handed to.
+
+        Args:
+            job_id (int): _description_: The identifier of the job.
+            worker (str): _description_: The name of the worker that took the job.
+            status (int): _description_: The status returned by the conversion.
+            succeeded (bool): _description_: True if the file was converted (or already was).
+
+        Returns:
+            bool: _description_: True if the outcome was recorded, False if the job no longer belongs to the worker.
+        """
+        finished_at = time.time()
+        state = STATE_DONE if succeeded is True else STATE_FAILED
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, status = ?, finished_at = ?, duration = ? - started_at WHERE id = ? AND worker = ? AND state = ?",
+                (state, status, finished_at, finished_at, job_id, worker, STATE_RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def requeue(self, job_id: int, worker: str, status: int) -> bool:
+        """_summary_
+        Hand a job out again after a transient failure, its attempt counts towards its max_attempts.
+
+        Args:
+            job_id (int): _description_: The identifier of the job.
+            worker (str): _description_: The name of the worker that took the job.
+            status (int): _description_: The status returned by the failed attempt.
+
+        Returns:
+            bool: _description_: True if the job was queued again, False if the job no longer belongs to the worker.
+        """
+        finished_at = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, status = ?, worker = NULL, finished_at = ?, duration = ? - started_at WHERE id = ? AND worker = ? AND state = ?",
+                (STATE_QUEUED, status, finished_at, finished_at, job_id, worker, STATE_RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def get_job(self, job_id: int) -> Union[QueueJob, None]:
+        """_summary_
+        Get a job.
+
+        Args:
+            job_id (int): _description_: The identifier of the job.
+
+        Returns:
+            Union[QueueJob, None]: _description_: The job, None if it does not exist.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return QueueJob(row)
+
+    def list_jobs(self, state: str = "", limit: int = 0) -> List[QueueJob]:
+        """_summary_
+        Get the jobs of the queue, oldest first.
+
+        Args:
+            state (str, optional): _description_: Only return the jobs in this state, an empty string returns all of them. Defaults to "".
+            limit (int, optional): _description_: The maximum number of jobs returned, 0 returns all of them. Defaults to 0.
+
+        Returns:
+            List[QueueJob]: _description_: The jobs.
+        """
+        query = "SELECT * FROM jobs"
+        parameters = []
+        if state != "":
+            query += " WHERE state = ?"
+            parameters.append(state)
+        query += " ORDER BY id"
+        if limit > 0:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        with self._connect() as connection:
+            rows = connection.execute(query, parameters).fetchall()
+        return [QueueJob(row) for row in rows]
+
+    def get_counts(self) -> Dict[str, int]:
+        """_summary_
+        Count the jobs in each state.
+
+        Returns:
+            Dict[str, int]: _description_: The number of jobs per state.
+        """
+        counts = {state: 0 for state in STATES}
+        with self._connect() as connection:
+            for row in connection.execute("SELECT state, COUNT(*) AS total FROM jobs GROUP BY state"):
+                counts[row["state"]] = row["total"]
+        return counts
+
+
+class QueueWorker:
+    """_summary_
+    The class in charge of taking the jobs of the queue and converting them.
+    """
+
+    def __init__(self, converter: MDIToTiff, queue: JobQueue, jobs: int = 1, poll_interval: float = DEFAULT_POLL_INTERVAL, success: int = SUCCESS, error: int = ERROR) -> None:
+        """_summary_
+
+        Args:
+            converter (MDIToTiff): _description_: The converter shared by the jobs.
+            queue (JobQueue): _description_: The queue to take the jobs from.
+            jobs (int, optional): _description_: The number of jobs converted at the same time, 0 uses the number of available cpus. Defaults to 1.
+            poll_interval (float, optional): _description_: The number of seconds waited before looking at an empty queue again. Defaults to DEFAULT_POLL_INTERVAL.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+        """
+        self.success = success
+        self.error = error
+        self.converter = converter
+        self.const = converter.const
+        self.queue = queue
+        self.jobs = jobs
+        if self.jobs < 1:
+            self.jobs = self.const.jobs
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self.total_jobs_done = 0
+        self.total_jobs_failed = 0
+        self.total_jobs_requeued = 0
+
+    def run_job(self, job: QueueJob) -> int:
+        """_summary_
+        Convert the file of a job and record its outcome.
+        A conversion that raises is recorded as a failure, so that the job is not left running and the worker thread keeps going.
+        A transient failure queues the job again while it has attempts left.
+
+        Args:
+            job (QueueJob): _description_: The job taken from the queue.
+
+        Returns:
+            int: _description_: The status of the conversion.
+        """
+        self.const.pinfo(
+            f"Job {job.id} (attempt {job.attempts}/{job.max_attempts}): converting '{job.input_file}' to '{job.output_file}'"
+        )
+        failures: List[str] = []
+        try:
+            os.makedirs(os.path.dirname(job.output_file), exist_ok=True)
+            status = self.converter.convert(
+                job.input_file,
+                job.output_file,
+                job.format,
+                failures=failures
+            )
+        except Exception as e:
+            self.const.perror(
+                f"Job {job.id}: unexpected error while converting '{job.input_file}': '{e}'"
+            )
+            record_failure(failures, classify_exception(e))
+            status = self.error
+        succeeded = status in (self.converter.success, self.converter.skipped)
+        if succeeded is False and len(failures) > 0 and failures[-1] == TRANSIENT and job.attempts < job.max_attempts:
+            return self._requeue_job(job, status)
+        try:
+            if self.queue.finish(job.id, self.name, status, succeeded) is False:
+                self.const.pwarning(
+                    f"Job {job.id}: its lease expired and it was handed out again, its outcome is not recorded."
+                )
+        except sqlite3.Error as e:
+            self.const.perror(
+                f"Job {job.id}: failed to record its outcome ('{e}'), it will be handed out again once its lease expires."
+            )
+        with self._lock:
+            if succeeded is True:
+                self.total_jobs_done += 1
+            else:
+                self.total_jobs_failed += 1
+        return status
+
+    def _requeue_job(self, job: QueueJob, status: int) -> int:
+        """_summary_
+        Queue a job again after a transient failure.
+
+        Args:
+            job (QueueJob): _description_: The job taken from the queue.
+            status (int): _description_: The status of the failed attempt.
+
+        Returns:
+            int: _description_: The status of the attempt.
+        """
+        try:
+            if self.queue.requeue(job.id, self.name, status) is False:
+                self.const.pwarning(
+                    f"Job {job.id}: its lease expired and it was handed out again, its outcome is not recorded."
+                )
+                return status
+        except sqlite3.Error as e:
+            self.const.perror(
+                f"Job {job.id}: failed to queue it again ('{e}'), it will be handed out again once its lease expires."
+            )
+            return status
+        self.const.pwarning(
+            f"Job {job.id}: transient failure, queued again (attempt {job.attempts}/{job.max_attempts})."
+        )
+        with self._lock:
+            self.total_jobs_requeued += 1
+        return status
+
+    def _work(self, until_empty: bool) -> None:
+        """_summary_
+        The loop of a worker thread.
+
+        Args:
+            until_empty (bool): _description_: Stop once the queue is empty instead of waiting for new jobs.
+        """
+        while self.converter.stop_requested is False:
+            try:
+                job = self.queue.take(self.name)
+            except sqlite3.Error as e:
+                self.const.pwarning(f"Failed to take a job from the queue: '{e}'")
+                time.sleep(self.poll_interval)
+                continue
+            if job is None:
+                if until_empty is True:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run(self, until_empty: bool = False) -> int:
+        """_summary_
+        Convert the jobs of the queue until it is empty (until_empty) or until the process is asked to stop (Ctrl+C, SIGTERM).
+
+        Args:
+            until_empty (bool, optional): _description_: Stop once the queue is empty instead of waiting for new jobs. Defaults to False.
+
+        Returns:
+            int: _description_: The status of the worker (error if a job failed).
+        """
+        self.const.pinfo(
+            f"Worker '{self.name}' started with {self.jobs} threads on '{self.queue.path}'."
+        )
+        self.converter.stop_requested = False
+        previous_handlers = self.converter._install_stop_handlers()
+        self.converter.wine.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="mdi2img-worker") as executor:
+                futures = [
+                    executor.submit(self._work, until_empty)
+                    for _ in range(self.jobs)
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    # The other threads would otherwise keep waiting for jobs and the worker would never exit
+                    self.converter.stop_requested = True
+                    raise
+        finally:
+            self.converter.wine.stop()
+            self.converter._restore_stop_handlers(previous_handlers)
+        self.const.pinfo(f"Total jobs done: {self.total_jobs_done}")
+        self.const.pinfo(f"Total jobs failed: {self.total_jobs_failed}")
+        self.const.pinfo(f"Total jobs queued again: {self.total_jobs_requeued}")
+        if self.total_jobs_failed > 0:
+            return self.error
+        return self.success
@@ -0,0 +1,191 @@
+"""_summary_
+    This is the file in charge of the checkpoint journal of the folder conversions.
+    The journal is stored in the output directory while a folder is being converted and records, in the order of the walk,
+    the files handed to the workers and the files that finished. Since the walk visits the files in a stable order, the last
+    file handed out (the cursor) is enough to know which part of the tree is already done, so an interrupted run can be resumed
+    without listing or stat'ing that part again. The journal is removed once a run completes.
+"""
+
+import os
+import json
+from typing import Dict, Union
+
+from .constants import Constants
+
+JOURNAL_NAME = ".mdi2img_journal.jsonl"
+
+EVENT_SETTINGS = "settings"
+EVENT_CHECKPOINT = "checkpoint"
+EVENT_DISPATCHED = "dispatched"
+EVENT_PENDING = "pending"
+EVENT_FINISHED = "finished"
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_FAILED = "failed"
+OUTCOMES = (OUTCOME_SUCCESS, OUTCOME_SKIPPED, OUTCOME_FAILED)
+
+
+class ConversionJournal:
+    """_summary_
+    The class in charge of recording the progress of a folder conversion and of finding where an interrupted one stopped.
+    """
+
+    def __init__(self, constants: Constants, output_directory: str, settings: Dict[str, Union[str, bool]], name: str = JOURNAL_NAME) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            output_directory (str): _description_: The directory where the converted files (and the journal) are stored.
+            settings (Dict[str, Union[str, bool]]): _description_: The options of the run, a journal written with other options is not resumed.
+            name (str, optional): _description_: The name of the journal file. Defaults to JOURNAL_NAME.
+        """
+        self.const: Constants = constants
+        self.path = os.path.join(output_directory, name)
+        self.settings = settings
+        self.cursor: Union[str, None] = None
+        self.in_flight: Dict[str, None] = {}
+        self.previous = {outcome: 0 for outcome in OUTCOMES}
+        self._file = None
+
+    def _apply(self, record: dict) -> None:
+        """_summary_
+        Replay a record of the journal.
+
+        Args:
+            record (dict): _description_: The record read from the journal.
+        """
+        event = record.get("event")
+        if event == EVENT_CHECKPOINT:
+            self.cursor = record.get("cursor")
+            for outcome in OUTCOMES:
+                self.previous[outcome] = int(record.get(outcome, 0))
+        elif event == EVENT_DISPATCHED:
+            self.cursor = record["input"]
+            self.in_flight[record["input"]] = None
+        elif event == EVENT_PENDING:
+            self.in_flight[record["input"]] = None
+        elif event == EVENT_FINISHED:
+            self.in_flight.pop(record["input"], None)
+            if record.get("outcome") in self.previous:
+                self.previous[record["outcome"]] += 1
+
+    def load(self) -> bool:
+        """_summary_
+        Read the journal left by an interrupted run.
+        Lines that cannot be parsed (for instance the last one after a crash) are ignored.
+
+        Returns:
+            bool: _description_: True if a journal written with the same settings was found.
+        """
+        self.cursor = None
+        self.in_flight = {}
+        self.previous = {outcome: 0 for outcome in OUTCOMES}
+        if os.path.exists(self.path) is False:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline() or "{}")
+                if header.get("event") != EVENT_SETTINGS or header.get("settings") != self.settings:
+                    self.const.pwarning(
+                        f"The journal '{self.path}' was written with other options, starting over."
+                    )
+                    return False
+                for line in file:
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except (OSError, ValueError) as e:
+            self.const.pwarning(f"Failed to read the journal '{self.path}': '{e}'")
+            return False
+        return True
+
+    def _write(self, record: dict) -> None:
+        """_summary_
+        Append a record to the journal.
+
+        Args:
+            record (dict): _description_: The record to append.
+        """
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+
+    def open(self, resume: bool = False) -> bool:
+        """_summary_
+        Get the journal ready to record a run.
+        When resuming, the journal of the interrupted run is rewritten as a single checkpoint followed by the files that were still in flight.
+
+        Args:
+            resume (bool, optional): _description_: Continue the run recorded in the existing journal. Defaults to False.
+
+        Returns:
+            bool: _description_: True if an interrupted run is being resumed.
+        """
+        resumed = resume is True and self.load() is True
+        if resumed is False:
+            self.cursor = None
+            self.in_flight = {}
+            self.previous = {outcome: 0 for outcome in OUTCOMES}
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"event": EVENT_SETTINGS, "settings": self.settings}) + "\n")
+            if resumed is True:
+                checkpoint = {"event": EVENT_CHECKPOINT, "cursor": self.cursor}
+                checkpoint.update(self.previous)
+                file.write(json.dumps(checkpoint) + "\n")
+                for relative_path in self.in_flight:
+                    file.write(json.dumps({"event": EVENT_PENDING, "input": relative_path}) + "\n")
+        os.replace(temporary_path, self.path)
+        # Line buffered so that every record reaches the operating system as soon as it is written
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        if resumed is True:
+            msg = f"Resuming after '{self.cursor}' "
+            msg += f"({sum(self.previous.values())} files already handled, "
+            msg += f"{len(self.in_flight)} to convert again)."
+            self.const.pinfo(msg)
+        return resumed
+
+    def dispatched(self, relative_path: str) -> None:
+        """_summary_
+        Record that a file found by the walk was handed to the workers, it becomes the cursor.
+
+        Args:
+            relative_path (str): _description_: The path of the file relative to the input directory.
+        """
+        self._write({"event": EVENT_DISPATCHED, "input": relative_path})
+
+    def redispatched(self, relative_path: str) -> None:
+        """_summary_
+        Record that a file left in flight by the interrupted run was handed to the workers again (the cursor does not move).
+
+        Args:
+            relative_path (str): _description_: The path of the file relative to the input directory.
+        """
+        self._write({"event": EVENT_PENDING, "input": relative_path})
+
+    def finished(self, relative_path: str, outcome: str) -> None:
+        """_summary_
+        Record that a file will not be converted again by a resumed run.
+
+        Args:
+            relative_path (str): _description_: The path of the file relative to the input directory.
+            outcome (str): _description_: One of OUTCOMES.
+        """
+        self._write({"event": EVENT_FINISHED, "input": relative_path, "outcome": outcome})
+
+    def close(self, completed: bool) -> None:
+        """_summary_
+        Close the journal, it is removed when the run went through the whole tree.
+
+        Args:
+            completed (bool): _description_: False if the run was interrupted and may be resumed.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if completed is True:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                self.const.pdebug(f"Failed to remove the journal '{self.path}': '{e}'")
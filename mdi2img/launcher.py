@@ -0,0 +1,169 @@
+"""_summary_
+    This is the file in charge of starting the conversion binary.
+    The binary is executed directly from a list of arguments (no intermediate shell) so that paths containing spaces are preserved and no shell has to be started for each file.
+"""
+
+import os
+import time
+import signal
+import threading
+import subprocess
+from typing import List, Union
+
+from .constants import Constants, ERROR, SUCCESS
+
+
+class LaunchResult:
+    """_summary_
+    The outcome of a call to the conversion binary.
+    """
+
+    def __init__(self, exit_code: int, stdout: str = "", stderr: str = "", spawn_time: float = 0.0, run_time: float = 0.0, spawned: bool = True, timed_out: bool = False) -> None:
+        """_summary_
+
+        Args:
+            exit_code (int): _description_: The real return code of the child process.
+            stdout (str, optional): _description_: The standard output of the child process. Defaults to "".
+            stderr (str, optional): _description_: The error output of the child process. Defaults to "".
+            spawn_time (float, optional): _description_: The time (in seconds) it took to start the child process. Defaults to 0.0.
+            run_time (float, optional): _description_: The time (in seconds) the child process ran for once started. Defaults to 0.0.
+            spawned (bool, optional): _description_: False if the child process could not be started. Defaults to True.
+            timed_out (bool, optional): _description_: True if the child process was killed because it ran for too long. Defaults to False.
+        """
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.spawn_time = spawn_time
+        self.run_time = run_time
+        self.spawned = spawned
+        self.timed_out = timed_out
+
+
+class Launcher:
+    """_summary_
+    The class in charge of running the conversion binary and keeping track of the time spent starting and running it.
+    """
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR) -> None:
+        self.success = success
+        self.error = error
+        self.const: Constants = constants
+        self._timings_lock = threading.Lock()
+        self.total_launches = 0
+        self.total_spawn_time = 0.0
+        self.total_run_time = 0.0
+        self.total_timeouts = 0
+
+    def get_popen_options(self, isolate: bool = False) -> dict:
+        """_summary_
+        Get the options passed to subprocess.Popen.
+        On posix systems, not closing the inherited descriptors allows subprocess to use posix_spawn instead of fork + exec.
+
+        Args:
+            isolate (bool, optional): _description_: Start the child in its own process group so that the whole tree can be killed (this disables posix_spawn). Defaults to False.
+
+        Returns:
+            dict: _description_: The keyword arguments for subprocess.Popen.
+        """
+        if os.name == "posix":
+            options = {"close_fds": False}
+            if isolate is True:
+                options["start_new_session"] = True
+            return options
+        if isolate is True:
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {}
+
+    def kill_process_tree(self, pid: int) -> None:
+        """_summary_
+        Kill a child process started with isolate=True and every process it started.
+
+        Args:
+            pid (int): _description_: The identifier of the child process (and of its process group).
+        """
+        self.const.pdebug(f"Killing the process tree of {pid}.")
+        if os.name == "posix":
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError as e:
+                self.const.pdebug(f"Failed to kill the process group {pid}: '{e}'")
+            return
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(pid)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False
+        )
+
+    def reset_timings(self) -> None:
+        """_summary_
+        Reset the accumulated spawn and run times.
+        """
+        with self._timings_lock:
+            self.total_launches = 0
+            self.total_spawn_time = 0.0
+            self.total_run_time = 0.0
+            self.total_timeouts = 0
+
+    def register_timings(self, spawn_time: float, run_time: float, timed_out: bool = False) -> None:
+        """_summary_
+        Add the timings of a launch to the accumulated totals.
+
+        Args:
+            spawn_time (float): _description_: The time (in seconds) it took to start the child process.
+            run_time (float): _description_: The time (in seconds) the child process ran for.
+            timed_out (bool, optional): _description_: True if the child process was killed because it ran for too long. Defaults to False.
+        """
+        with self._timings_lock:
+            self.total_launches += 1
+            self.total_spawn_time += spawn_time
+            self.total_run_time += run_time
+            if timed_out is True:
+                self.total_timeouts += 1
+
+    def run(self, command: List[str], timeout: Union[float, None] = None) -> LaunchResult:
+        """_summary_
+        Run a command and wait for it to finish.
+
+        Args:
+            command (List[str]): _description_: The program followed by its arguments.
+            timeout (Union[float, None], optional): _description_: The number of seconds the child process is allowed to run for before it and its children are killed, None waits forever. Defaults to None.
+
+        Returns:
+            LaunchResult: _description_: The exit code, outputs and timings of the child process.
+        """
+        spawn_start = time.perf_counter()
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **self.get_popen_options(timeout is not None)
+            )
+        except (OSError, ValueError) as e:
+            self.const.perror(f"Failed to start '{command[0]}': '{e}'")
+            return LaunchResult(self.error, stderr=str(e), spawned=False)
+        run_start = time.perf_counter()
+        timed_out = False
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            self.kill_process_tree(process.pid)
+            stdout, stderr = process.communicate()
+        run_end = time.perf_counter()
+        exit_code = process.returncode
+        if timed_out is True:
+            exit_code = self.error
+        result = LaunchResult(
+            exit_code=exit_code,
+            stdout=stdout.decode("utf-8", errors="replace"),
+            stderr=stderr.decode("utf-8", errors="replace"),
+            spawn_time=run_start - spawn_start,
+            run_time=run_end - run_start,
+            timed_out=timed_out
+        )
+        self.register_timings(result.spawn_time, result.run_time, timed_out)
+        return result
@@ -6,9 +6,17 @@
 import os
 import sys
 from sys import argv
+from typing import List, Union
 from display_tty import IDISP
 
 from .mdi2tiff import MDIToTiff
+from .retry import RetryPolicy, DEFAULT_MAX_ATTEMPTS
+from .workspace import RAM_TEMP_FOLDER
+from .backends import FakeBackend
+from .shard import parse_shard
+from .claim import DEFAULT_LEASE
+from .server import ConversionServer, DEFAULT_HOST, DEFAULT_PORT
+from .job_queue import JobQueue, QueueWorker, QUEUE_NAME, STATES
 from . import constants as CONST
 from .change_image_format import AVAILABLE_FORMATS, AVAILABLE_FORMATS_HELP
 
@@ -32,15 +40,61 @@ class Main:
         self.available_formats = AVAILABLE_FORMATS
         self.dest_found = False
         self.output_format = "default"
+        self.jobs = 0
+        self.backend = CONST.DEFAULT_BACKEND
+        self.schedule = CONST.DEFAULT_SCHEDULE
+        self.fake_latency = 0.0
+        self.in_memory = False
+        self.recursive = False
+        self.use_manifest = False
+        self.resume = False
+        self.shard = ""
+        self.claim = False
+        self.lease = DEFAULT_LEASE
+        self.cache_size = 0
+        self.cache_outputs = False
+        self.timeout = 0.0
+        self.deadline = 0.0
+        self.retries = DEFAULT_MAX_ATTEMPTS - 1
+        self.ram_temp = ""
+        self.launcher = ""
+        self.wineserver = ""
+        self.serve = False
+        self.host = DEFAULT_HOST
+        self.port = DEFAULT_PORT
+        self.max_requests = 0
+        self.serve_root = ""
+        self.queue_command = ""
+        self.queue_path = ""
+        self.queue_paths = []
+        self.queue_state = ""
+        self.until_empty = False
         self._check_args()
         self.const = CONST.Constants(self.binary_name, self.output_format)
         if self.dest_found is False:
             self.dest = self.const.temporary_img_folder
         self.const.debug = self.debug
+        backend = self.backend
+        if backend == FakeBackend.name:
+            backend = FakeBackend(
+                self.const,
+                self.success,
+                self.error,
+                latency=self.fake_latency
+            )
         self.mdi_to_tiff_initialised: MDIToTiff = MDIToTiff(
             self.const,
             self.success,
-            self.error
+            self.error,
+            backend,
+            self.in_memory,
+            self.cache_size,
+            self.cache_outputs,
+            self.timeout,
+            RetryPolicy(max_attempts=self.retries + 1),
+            self.ram_temp,
+            self.launcher,
+            self.wineserver
         )
 
     def _display_splash_screen(self, display: bool = True) -> None:
@@ -79,6 +133,146 @@ class Main:
             )
             return self.output_format
 
+    def _check_jobs(self, jobs: str) -> int:
+        """_summary_
+        Check the number of workers provided by the user and return it if correct.
+
+        Args:
+            jobs (str): _description_: The number of workers provided by the user.
+
+        Returns:
+            int: _description_: The number of workers after the check (0 means the default).
+        """
+        if jobs.isdigit() is True and int(jobs) > 0:
+            return int(jobs)
+        IDISP.logger.warning(
+            "(mdi2img) The number of jobs '%s' is not valid, using the default.",
+            f"{jobs}"
+        )
+        return self.jobs
+
+    def _check_size(self, size: str) -> int:
+        """_summary_
+        Convert a size provided by the user (for instance '512M' or '2G') to bytes.
+
+        Args:
+            size (str): _description_: The size provided by the user.
+
+        Returns:
+            int: _description_: The number of bytes, 0 if the size is not valid.
+        """
+        units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+        data = size.strip().lower().rstrip("b")
+        multiplier = 1
+        if data != "" and data[-1] in units:
+            multiplier = units[data[-1]]
+            data = data[:-1]
+        try:
+            return int(float(data) * multiplier)
+        except ValueError:
+            IDISP.logger.warning(
+                "(mdi2img) The size '%s' is not valid, ignoring it.",
+                f"{size}"
+            )
+            return 0
+
+    def _check_seconds(self, seconds: str) -> float:
+        """_summary_
+        Check a duration provided by the user (in seconds) and return it if correct.
+
+        Args:
+            seconds (str): _description_: The duration provided by the user.
+
+        Returns:
+            float: _description_: The number of seconds, 0 if the duration is not valid.
+        """
+        try:
+            value = float(seconds)
+        except ValueError:
+            value = -1
+        if value >= 0:
+            return value
+        IDISP.logger.warning(
+            "(mdi2img) The duration '%s' is not valid, ignoring it.",
+            f"{seconds}"
+        )
+        return 0.0
+
+    def _check_shard(self, shard: str) -> str:
+        """_summary_
+        Check the shard provided by the user and return it if correct.
+
+        Args:
+            shard (str): _description_: The shard provided by the user ('i/N').
+
+        Returns:
+            str: _description_: The shard after the check, an empty string converts every file.
+        """
+        if parse_shard(shard) is not None:
+            return shard.strip()
+        IDISP.logger.critical(
+            "(mdi2img) The shard '%s' is not valid, it must be written 'i/N' with 1 <= i <= N, aborting!",
+            f"{shard}"
+        )
+        sys.exit(self.error)
+
+    def _check_retries(self, retries: str) -> int:
+        """_summary_
+        Check the number of retries provided by the user and return it if correct.
+
+        Args:
+            retries (str): _description_: The number of retries provided by the user.
+
+        Returns:
+            int: _description_: The number of retries after the check.
+        """
+        if retries.isdigit() is True:
+            return int(retries)
+        IDISP.logger.warning(
+            "(mdi2img) The number of retries '%s' is not valid, using %s.",
+            f"{retries}",
+            f"{self.retries}"
+        )
+        return self.retries
+
+    def _check_backend(self, backend: str) -> str:
+        """_summary_
+        Check the conversion backend provided by the user and return it if correct.
+
+        Args:
+            backend (str): _description_: The backend provided by the user.
+
+        Returns:
+            str: _description_: The backend after the check.
+        """
+        if backend in CONST.AVAILABLE_BACKENDS:
+            return backend
+        IDISP.logger.warning(
+            "(mdi2img) The backend '%s' is not supported, using '%s'.",
+            f"{backend}",
+            f"{self.backend}"
+        )
+        return self.backend
+
+    def _check_schedule(self, schedule: str) -> str:
+        """_summary_
+        Check the schedule provided by the user and return it if correct.
+
+        Args:
+            schedule (str): _description_: The schedule provided by the user.
+
+        Returns:
+            str: _description_: The schedule after the check.
+        """
+        if schedule in CONST.AVAILABLE_SCHEDULES:
+            return schedule
+        IDISP.logger.warning(
+            "(mdi2img) The schedule '%s' is not supported, using '%s'.",
+            f"{schedule}",
+            f"{self.schedule}"
+        )
+        return self.schedule
+
     def _disp_version(self) -> None:
         """_summary_
         Display the version of the program
@@ -91,7 +285,16 @@ class Main:
         """
         print("USAGE:")
         msg = f"\t{argv[0]} <<-h>|<-v>|<SRC>> [DEST]"
-        msg += "[--debug] [--no-show] [--format=<format>]"
+        msg += "[--debug] [--no-show] [--format=<format>] [--jobs=<n>|auto] [--schedule=<order>] [--backend=<backend>] [--fake-latency=<seconds>] [--in-memory] [--recursive] [--manifest] [--cache=<size>] [--cache-outputs] [--timeout=<seconds>] [--deadline=<seconds>] [--retries=<n>] [--resume] [--shard <i/N>] [--claim] [--lease=<seconds>] [--ram-temp[=<folder>]] [--launcher=<command>] [--wineserver=<command>]"
+        print(msg)
+        msg = f"\t{argv[0]} serve [--host=<host>] [--port=<port>] "
+        msg += "[--max-requests=<n>] [--root=<folder>] [--backend=<backend>] [--cache=<size>]"
+        print(msg)
+        msg = f"\t{argv[0]} enqueue <SRC> [SRC...] [--queue=<file>] [--format=<format>] [--dest=<folder>] [--recursive]"
+        print(msg)
+        msg = f"\t{argv[0]} worker [--queue=<file>] [--jobs=<n>] [--until-empty] [--backend=<backend>] [--timeout=<seconds>] [--retries=<n>]"
+        print(msg)
+        msg = f"\t{argv[0]} queue [--queue=<file>] [--state=<state>]"
         print(msg)
         print()
         print("KEEP IN MIND:")
@@ -122,6 +325,107 @@ class Main:
         print(
             "[--format=<format>]  \tThis option allows you to change the default output format (tiff)"
         )
+        print(
+            "[--jobs=<n>|-j=<n>]  \tThis option sets the number of files converted at the same time when the source is a folder (default: number of available cpus, within the cpu quota and memory limit of the container)"
+        )
+        print(
+            "[--jobs=auto]        \tThis option measures the number of files converted per second while the folder is converted and raises or lowers the number of workers to find the best level, which is displayed at the end so that it can be pinned with --jobs=<n>"
+        )
+        print(
+            "[--schedule=<order>] \tThis option sets the order in which the files of a folder are converted by several workers: 'size' (the largest of the next files of the folder first, default), 'pages' (the largest decoded pages of the next files first) or 'directory' (the order of the folder)"
+        )
+        print(
+            "[--backend=<backend>]\tThis option selects the conversion engine: 'exe' (the windows binary, default), 'native' (decode in memory, only for pages that do not use the proprietary MODI compression), 'fake' (deterministic images without the binary, to test the batch options) or 'auto' (native when possible, the binary otherwise)"
+        )
+        print(
+            "[--fake-latency=<seconds>]\tThis option sets the time the 'fake' backend spends on each file"
+        )
+        print(
+            f"[--in-memory|-im]    \tThis option writes the intermediate tiff to a RAM-backed folder (--ram-temp, default: {RAM_TEMP_FOLDER}) instead of the disk and loads it in memory for the format change"
+        )
+        print(
+            "[--recursive|-r]     \tThis option also converts the files of the sub-folders, the folder tree is mirrored in the destination"
+        )
+        print(
+            "[--manifest|-m]      \tThis option keeps a manifest in the destination folder so that a rerun only converts the files that are new or changed"
+        )
+        print(
+            "[--resume]           \tThis option continues a folder conversion that was interrupted (Ctrl+C, SIGTERM, --deadline) from where it stopped"
+        )
+        print(
+            "[--shard <i/N>]      \tThis option only converts the part i of N of a folder (the files are split by a hash of their relative path) so that N computers can share the same input tree, each part writes its own report in the destination"
+        )
+        print(
+            "[--claim]            \tThis option claims each file with a marker placed next to it before converting it, so that several processes (on several computers) can convert the same folder without converting a file twice"
+        )
+        print(
+            f"[--lease=<seconds>]  \tThis option sets the time after which the claim of a process that crashed is taken over (default: {DEFAULT_LEASE:.0f})"
+        )
+        print(
+            "[--cache=<size>]     \tThis option keeps the converted documents in a cache of the given size (for instance 512M or 2G) so that the binary is not run twice on the same document"
+        )
+        print(
+            "[--cache-outputs]    \tThis option also keeps the final outputs in the cache (requires --cache)"
+        )
+        print(
+            "[--timeout=<seconds>]\tThis option kills the binary (and the processes it started) when it runs for longer than this on a single file, the file is counted as failed"
+        )
+        print(
+            "[--deadline=<seconds>]\tThis option stops a folder conversion once it ran for this long, the files that were not converted are left for a later run"
+        )
+        print(
+            f"[--retries=<n>]      \tThis option sets the number of times a file is converted again after a transient failure (locked file, full disk, binary that could not start) (default: {DEFAULT_MAX_ATTEMPTS - 1})"
+        )
+        print(
+            f"[--ram-temp[=<folder>]]\tThis option writes the intermediate files to a RAM-backed folder (default: {RAM_TEMP_FOLDER}) when it has room for them, the disk is used otherwise"
+        )
+        print(
+            "[--launcher=<command>]\tThis option runs the binary through a launcher (for instance 'wine' on linux), with Wine the paths are given in their windows form and a wineserver is kept alive for the whole batch"
+        )
+        print(
+            "[--wineserver=<command>]\tThis option sets the wineserver kept alive during the batch (default: the one installed next to the Wine launcher)"
+        )
+        print("SERVICE:")
+        print(
+            "\tserve                \tStart a local http conversion service instead of converting a path."
+        )
+        print(
+            "\t                     \tPOST /convert?format=<format> with the mdi file as body (or &path=<path> below --root), GET /health, GET /metrics"
+        )
+        print(
+            f"[--host=<host>]      \tThe address the service listens on (default: {DEFAULT_HOST})"
+        )
+        print(
+            f"[--port=<port>]      \tThe port the service listens on (default: {DEFAULT_PORT})"
+        )
+        print(
+            "[--max-requests=<n>] \tThe number of conversions the service runs at once, other requests get a 503 (default: number of available cpus)"
+        )
+        print(
+            "[--root=<folder>]    \tAllow the conversion of server-side files below this folder"
+        )
+        print("QUEUE:")
+        print(
+            "\tenqueue              \tAdd files (or the mdi files of folders) to the job queue instead of converting them."
+        )
+        print(
+            "\tworker               \tConvert the jobs of the queue, several workers (on the same computer) can share a queue."
+        )
+        print(
+            "\tqueue                \tDisplay the number of jobs in each state and the jobs with their attempts and timings."
+        )
+        print(
+            f"[--queue=<file>]     \tThe SQLite file of the queue (default: '{QUEUE_NAME}' in the temporary folder)"
+        )
+        print(
+            "[--dest=<folder>]    \tThe folder of the converted files of the enqueued jobs (default: next to each file)"
+        )
+        print(
+            "[--until-empty]      \tStop the worker once the queue is empty instead of waiting for new jobs"
+        )
+        print(
+            f"[--state=<state>]    \tOnly display the jobs in this state ({', '.join(STATES)})"
+        )
         print("ABOUT:")
         print(f"This program was created by {CONST.__author__}")
         self._disp_version()
@@ -136,54 +440,377 @@ class Main:
                 print(f"\t{index}. '{i}': {AVAILABLE_FORMATS_HELP[i]}")
                 index += 1
 
-    def _check_args(self) -> None:
+    def _check_serve_arg(self, argument: str) -> bool:
         """_summary_
-        Check the arguments passed to the program
+        Check the arguments that are specific to the conversion service.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used by the service.
+        """
+        arg = argument.lower()
+        if "=" not in arg:
+            return False
+        value = argument.split("=", 1)[1]
+        if arg.startswith("--host="):
+            self.host = value
+            return True
+        if arg.startswith("--port="):
+            if value.isdigit() is True:
+                self.port = int(value)
+            else:
+                IDISP.logger.warning(
+                    "(mdi2img) The port '%s' is not valid, using %s.",
+                    f"{value}",
+                    f"{self.port}"
+                )
+            return True
+        if arg.startswith("--max-requests="):
+            self.max_requests = self._check_jobs(value)
+            return True
+        if arg.startswith("--root="):
+            self.serve_root = value
+            return True
+        return False
+
+    def _check_queue_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that are specific to the job queue.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used by the queue.
+        """
+        arg = argument.lower()
+        if arg == "--until-empty":
+            self.until_empty = True
+            return True
+        if "=" not in arg:
+            return False
+        value = argument.split("=", 1)[1]
+        if arg.startswith("--queue="):
+            self.queue_path = value
+            return True
+        if arg.startswith("--dest="):
+            self.dest = value
+            self.dest_found = True
+            return True
+        if arg.startswith("--state="):
+            if value.lower() in STATES:
+                self.queue_state = value.lower()
+            else:
+                IDISP.logger.warning(
+                    "(mdi2img) The state '%s' is not valid, displaying every job.",
+                    f"{value}"
+                )
+            return True
+        return False
+
+    def _check_general_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that change the display and the files that are converted.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used.
+        """
+        arg = argument.lower()
+        if arg in ("--debug", "-d", "/d"):
+            self.debug = True
+            return True
+        if arg in ("--no-show", "-ns", "/ns"):
+            self.show = True
+            return True
+        if arg in ("--recursive", "-r", "/r"):
+            self.recursive = True
+            return True
+        if arg in ("--resume", "/resume"):
+            self.resume = True
+            return True
+        if arg.startswith("--format"):
+            self.output_format = self._check_output_format(
+                arg.split("=")[1]
+            )
+            return True
+        return False
+
+    def _check_backend_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that choose how the files are decoded (backend, launcher of the binary).
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used.
+        """
+        arg = argument.lower()
+        if arg.startswith("--backend="):
+            self.backend = self._check_backend(arg.split("=")[1])
+            return True
+        if arg.startswith("--fake-latency="):
+            self.fake_latency = self._check_seconds(arg.split("=")[1])
+            return True
+        # The commands keep their case, the paths are case sensitive
+        if arg.startswith("--launcher="):
+            self.launcher = argument.split("=", 1)[1]
+            return True
+        if arg.startswith("--wineserver="):
+            self.wineserver = argument.split("=", 1)[1]
+            return True
+        return False
+
+    def _check_sharing_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that share a tree between runs or processes (shard, claims, manifest).
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used.
+        """
+        arg = argument.lower()
+        if arg in ("--manifest", "-m", "/m"):
+            self.use_manifest = True
+            return True
+        if arg == "--claim":
+            self.claim = True
+            return True
+        if arg.startswith("--lease="):
+            lease = self._check_seconds(arg.split("=")[1])
+            if lease > 0:
+                self.lease = lease
+            return True
+        if arg == "--shard":
+            # The shard is the next argument
+            self._expecting_shard = True
+            return True
+        if arg.startswith("--shard="):
+            self.shard = self._check_shard(arg.split("=", 1)[1])
+            return True
+        return False
+
+    def _check_storage_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that choose where the temporary and cached files are kept.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used.
+        """
+        arg = argument.lower()
+        if arg in ("--in-memory", "-im", "/im"):
+            self.in_memory = True
+            return True
+        if arg.startswith("--cache="):
+            self.cache_size = self._check_size(arg.split("=")[1])
+            return True
+        if arg == "--cache-outputs":
+            self.cache_outputs = True
+            return True
+        if arg == "--ram-temp":
+            self.ram_temp = RAM_TEMP_FOLDER
+            return True
+        if arg.startswith("--ram-temp="):
+            # The folder keeps its case, the paths are case sensitive
+            self.ram_temp = argument.split("=", 1)[1]
+            return True
+        return False
+
+    def _check_concurrency_arg(self, argument: str) -> bool:
+        """_summary_
+        Check the arguments that drive the workers and bound the conversions (jobs, schedule, time limits, retries).
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument was used.
+        """
+        arg = argument.lower()
+        if arg.startswith("--jobs=") or arg.startswith("-j="):
+            if arg.split("=")[1] == CONST.AUTO_JOBS:
+                self.jobs = CONST.AUTO_JOBS
+            else:
+                self.jobs = self._check_jobs(arg.split("=")[1])
+            return True
+        if arg.startswith("--schedule="):
+            self.schedule = self._check_schedule(arg.split("=")[1])
+            return True
+        if arg.startswith("--timeout="):
+            self.timeout = self._check_seconds(arg.split("=")[1])
+            return True
+        if arg.startswith("--deadline="):
+            self.deadline = self._check_seconds(arg.split("=")[1])
+            return True
+        if arg.startswith("--retries="):
+            self.retries = self._check_retries(arg.split("=")[1])
+            return True
+        return False
+
+    def _get_command_arguments(self) -> List[str]:
+        """_summary_
+        Handle the help and version arguments, and the sub-command (serve, enqueue, worker, queue) given first.
+
+        Returns:
+            List[str]: _description_: The arguments left to check.
         """
-        src_found = False
-        self.dest_found = False
         if self.argc == 0:
             self._help_section()
             sys.exit(self.error)
-        if self.argv[0].lower() in ("-h", "--help", "/?"):
+        command = self.argv[0].lower()
+        if command in ("-h", "--help", "/?"):
             self._help_section()
             sys.exit(self.success)
-        if self.argv[0].lower() in ("-v", "--version", "/v"):
+        if command in ("-v", "--version", "/v"):
             self._disp_version()
             sys.exit(self.success)
-        for i in self.argv:
-            arg = i.lower()
-            is_path = os.path.exists(i)
-            if is_path is True and src_found is False:
-                self.src = i
-                src_found = True
-                continue
-            if is_path is True and src_found is True and self.dest_found is False:
-                self.dest = i
-                self.dest_found = True
-                continue
-            if is_path is True and self.dest_found is True:
-                IDISP.logger.warning(
-                    "(mdi2img) Argument '%s' was not expected, ignoring it.",
-                    f"{i}"
-                )
+        if command == "serve":
+            self.serve = True
+            return self.argv[1:]
+        if command in ("enqueue", "worker", "queue"):
+            self.queue_command = command
+            return self.argv[1:]
+        return self.argv
+
+    def _check_command_arg(self, argument: str) -> Union[bool, None]:
+        """_summary_
+        Check the arguments that are specific to the sub-command.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            Union[bool, None]: _description_: True if the argument was used, False if it is not a path, None if it may be a path (no sub-command).
+        """
+        if self.serve is True:
+            return self._check_serve_arg(argument)
+        if self.queue_command != "":
+            if self._check_queue_arg(argument) is True:
+                return True
+            if self.queue_command == "enqueue" and os.path.exists(argument) is True:
+                self.queue_paths.append(argument)
+                return True
+            return False
+        return None
+
+    def _check_path_arg(self, argument: str) -> bool:
+        """_summary_
+        Use an existing path as the source, then as the destination.
+
+        Args:
+            argument (str): _description_: The argument provided by the user.
+
+        Returns:
+            bool: _description_: True if the argument is a path.
+        """
+        if os.path.exists(argument) is False:
+            return False
+        if self.src_found is False:
+            self.src = argument
+            self.src_found = True
+        elif self.dest_found is False:
+            self.dest = argument
+            self.dest_found = True
+        else:
+            IDISP.logger.warning(
+                "(mdi2img) Argument '%s' was not expected, ignoring it.",
+                f"{argument}"
+            )
+        return True
+
+    def _check_args(self) -> None:
+        """_summary_
+        Check the arguments passed to the program
+        """
+        self.src_found = False
+        self.dest_found = False
+        self._expecting_shard = False
+        checks = (
+            self._check_general_arg,
+            self._check_backend_arg,
+            self._check_sharing_arg,
+            self._check_storage_arg,
+            self._check_concurrency_arg
+        )
+        for i in self._get_command_arguments():
+            if self._expecting_shard is True:
+                self.shard = self._check_shard(i)
+                self._expecting_shard = False
                 continue
-            if arg in ("--debug", "-d", "/d"):
-                self.debug = True
+            command_arg = self._check_command_arg(i)
+            if command_arg is True:
                 continue
-            if arg in ("--no-show", "-ns", "/ns"):
-                self.show = True
+            if command_arg is None and self._check_path_arg(i) is True:
                 continue
-            if arg.startswith("--format"):
-                self.output_format = self._check_output_format(
-                    arg.split("=")[1]
-                )
-        if src_found is False:
+            for check in checks:
+                if check(i) is True:
+                    break
+        if self.queue_command == "enqueue":
+            self.src_found = len(self.queue_paths) > 0
+        elif self.serve is True or self.queue_command != "":
+            self.src_found = True
+        if self.src_found is False:
             IDISP.logger.critical(
                 "(mdi2img) No source path provided, aborting!"
             )
             sys.exit(self.error)
 
+    def _run_queue_command(self) -> int:
+        """_summary_
+        Run the enqueue, worker or queue command.
+
+        Returns:
+            int: _description_: The return status of the call
+        """
+        queue = JobQueue(self.const, self.queue_path)
+        if self.queue_command == "enqueue":
+            img_format = self.output_format
+            if img_format == "default":
+                img_format = "tiff"
+            destination = self.dest if self.dest_found is True else ""
+            for path in self.queue_paths:
+                job_ids = queue.enqueue_path(
+                    path,
+                    img_format,
+                    destination,
+                    self.recursive
+                )
+                self.const.pinfo(
+                    f"Added {len(job_ids)} job(s) for '{path}' to '{queue.path}'."
+                )
+            return self.success
+        if self.queue_command == "worker":
+            worker = QueueWorker(
+                self.mdi_to_tiff_initialised,
+                queue,
+                0 if self.jobs == CONST.AUTO_JOBS else self.jobs,
+                success=self.success,
+                error=self.error
+            )
+            return worker.run(self.until_empty)
+        counts = queue.get_counts()
+        self.const.pinfo(
+            f"Queue '{queue.path}': " + ", ".join(
+                f"{state}: {total}" for state, total in counts.items()
+            )
+        )
+        for job in queue.list_jobs(self.queue_state):
+            duration = "-" if job.duration is None else f"{job.duration:.3f}s"
+            print(
+                f"{job.id}\t{job.state}\t{job.attempts}/{job.max_attempts}\t{duration}\t{job.input_file} -> {job.output_file}"
+            )
+        return self.success
+
     def main(self) -> int:
         """_summary_
         This is the main function of this class.
@@ -198,15 +825,70 @@ class Main:
                 ("self.dest_found", self.dest_found),
                 ("self.debug", self.debug),
                 ("self.show", self.show),
-                ("self.output_format", self.output_format)
+                ("self.output_format", self.output_format),
+                ("self.jobs", self.jobs),
+                ("self.const.cpu_count", self.const.cpu_count),
+                ("self.const.cpu_quota", self.const.cpu_quota),
+                ("self.const.memory_limit", self.const.memory_limit),
+                ("self.const.memory_jobs_limit", self.const.memory_jobs_limit),
+                ("self.const.jobs", self.const.jobs),
+                ("self.schedule", self.schedule),
+                ("self.backend", self.backend),
+                ("self.fake_latency", self.fake_latency),
+                ("self.in_memory", self.in_memory),
+                ("self.recursive", self.recursive),
+                ("self.use_manifest", self.use_manifest),
+                ("self.resume", self.resume),
+                ("self.shard", self.shard),
+                ("self.claim", self.claim),
+                ("self.lease", self.lease),
+                ("self.cache_size", self.cache_size),
+                ("self.cache_outputs", self.cache_outputs),
+                ("self.timeout", self.timeout),
+                ("self.deadline", self.deadline),
+                ("self.retries", self.retries),
+                ("self.ram_temp", self.ram_temp),
+                ("self.launcher", self.launcher),
+                ("self.wineserver", self.wineserver),
+                ("self.queue_command", self.queue_command),
+                ("self.queue_path", self.queue_path),
+                ("self.queue_paths", self.queue_paths),
+                ("self.queue_state", self.queue_state),
+                ("self.until_empty", self.until_empty)
             ]:
                 self.const.pdebug(f"(main) Variable '{i[0]}' = '{i[1]}'")
+        if self.serve is True:
+            self.const.pdebug("(main) Starting the conversion service.")
+            server = ConversionServer(
+                self.mdi_to_tiff_initialised,
+                host=self.host,
+                port=self.port,
+                max_requests=self.max_requests,
+                allowed_root=self.serve_root,
+                success=self.success,
+                error=self.error
+            )
+            return server.serve_forever()
+        if self.queue_command != "":
+            self.const.pdebug(
+                f"(main) Running the '{self.queue_command}' queue command."
+            )
+            return self._run_queue_command()
         if os.path.isdir(self.src) is True:
             self.const.pdebug("(main) The provided source path is a folder.")
             return self.mdi_to_tiff_initialised.convert_all(
                 self.src,
                 self.dest,
-                self.output_format
+                self.output_format,
+                self.jobs,
+                self.recursive,
+                self.use_manifest,
+                self.deadline,
+                self.resume,
+                self.shard,
+                self.claim,
+                self.lease,
+                self.schedule
             )
         if os.path.isfile(self.src) is True:
             self.const.pdebug("(main) The provided source path is a file")
@@ -0,0 +1,231 @@
+"""_summary_
+    This is the file in charge of remembering which files were converted during previous folder conversions.
+    The manifest is stored in the output directory as a list of json records (one per line) that is only ever appended to,
+    so a rerun only writes the records of the files it converted.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, Union
+
+from .constants import Constants
+from .conversion_task import ConversionTask
+
+MANIFEST_NAME = ".mdi2img_manifest.jsonl"
+HASH_CHUNK_SIZE = 1024 * 1024
+# Rewrite the manifest when it holds more than this many outdated records per live record
+COMPACTION_RATIO = 2
+COMPACTION_MIN_RECORDS = 1000
+
+
+def hash_file(path: str) -> Union[str, None]:
+    """_summary_
+    Compute the sha256 of a file.
+
+    Args:
+        path (str): _description_: The path to the file.
+
+    Returns:
+        Union[str, None]: _description_: The hexadecimal digest, None if the file could not be read.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as file:
+            chunk = file.read(HASH_CHUNK_SIZE)
+            while chunk:
+                digest.update(chunk)
+                chunk = file.read(HASH_CHUNK_SIZE)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """_summary_
+    The class in charge of deciding if a file needs to be converted again and of recording the conversions that succeeded.
+    """
+
+    def __init__(self, constants: Constants, output_directory: str, img_format: str, options: Union[Dict[str, str], None] = None, name: str = MANIFEST_NAME) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            output_directory (str): _description_: The directory where the converted files (and the manifest) are stored.
+            img_format (str): _description_: The destination format of the conversion.
+            options (Union[Dict[str, str], None], optional): _description_: The options that change the converted files. Defaults to None.
+            name (str, optional): _description_: The name of the manifest file. Defaults to MANIFEST_NAME.
+        """
+        self.const: Constants = constants
+        self.output_directory = output_directory
+        self.path = os.path.join(output_directory, name)
+        self.img_format = img_format
+        self.options = options or {}
+        self.records: Dict[str, dict] = {}
+        self.total_records_read = 0
+        self._file = None
+        # The number of bytes of the manifest that were read, the records past it were written by other processes
+        self._read_offset = 0
+
+    def _read_records(self) -> None:
+        """_summary_
+        Read the records written after the part of the manifest that was already read.
+        A line that is not finished yet is left for the next read.
+        """
+        with open(self.path, "rb") as file:
+            file.seek(self._read_offset)
+            for line in file:
+                if line.endswith(b"\n") is False:
+                    break
+                self._read_offset += len(line)
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                    self.records[record["input"]] = record
+                    self.total_records_read += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def load(self) -> None:
+        """_summary_
+        Load the records of the previous conversions.
+        Lines that cannot be parsed (for instance after an interruption while writing) are ignored.
+        """
+        self.records = {}
+        self.total_records_read = 0
+        self._read_offset = 0
+        if os.path.exists(self.path) is False:
+            return
+        try:
+            self._read_records()
+        except OSError as e:
+            self.const.pwarning(f"Failed to read the manifest '{self.path}': '{e}'")
+            self.records = {}
+            return
+        self.const.pdebug(
+            f"Loaded {len(self.records)} records from '{self.path}'."
+        )
+        if self.total_records_read > COMPACTION_MIN_RECORDS and self.total_records_read > COMPACTION_RATIO * len(self.records):
+            self._compact()
+
+    def _compact(self) -> None:
+        """_summary_
+        Rewrite the manifest with only the latest record of each file.
+        """
+        temporary_path = f"{self.path}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                for record in self.records.values():
+                    file.write(json.dumps(record) + "\n")
+            os.replace(temporary_path, self.path)
+            self.total_records_read = len(self.records)
+            self._read_offset = os.path.getsize(self.path)
+        except OSError as e:
+            self.const.pwarning(f"Failed to compact the manifest '{self.path}': '{e}'")
+
+    def open(self) -> None:
+        """_summary_
+        Load the manifest and get it ready to receive new records.
+        """
+        self.load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        """_summary_
+        Write the pending records to the disk and close the manifest.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def refresh(self) -> None:
+        """_summary_
+        Read the records that other processes sharing the output directory wrote since the manifest was loaded.
+        """
+        try:
+            if os.path.getsize(self.path) < self._read_offset:
+                # Compacted by another process, the offset no longer points at a record
+                self.load()
+                return
+            self._read_records()
+        except OSError as e:
+            self.const.pdebug(f"Failed to refresh the manifest '{self.path}': '{e}'")
+
+    def flush(self) -> None:
+        """_summary_
+        Write the pending records to the disk.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def is_up_to_date(self, task: ConversionTask) -> bool:
+        """_summary_
+        Check if the output of a file is still valid.
+        The size and modification time are compared first, the content is only hashed when the file was touched without changing its size.
+
+        Args:
+            task (ConversionTask): _description_: The file to check.
+
+        Returns:
+            bool: _description_: True if the file does not need to be converted again.
+        """
+        record = self.records.get(task.relative_path)
+        if record is None:
+            return False
+        if record.get("format") != self.img_format or record.get("options") != self.options:
+            return False
+        try:
+            output_stat = os.stat(task.output_file)
+        except OSError:
+            return False
+        if output_stat.st_size != record.get("output_size"):
+            return False
+        stat = task.get_stat()
+        if stat is None or stat.st_size != record.get("size"):
+            return False
+        if stat.st_mtime_ns == record.get("mtime_ns"):
+            return True
+        if hash_file(task.input_file) != record.get("sha256"):
+            return False
+        task.fingerprint = record["sha256"]
+        self.record(task)
+        return True
+
+    def fingerprint(self, task: ConversionTask) -> None:
+        """_summary_
+        Compute the content hash of a file so that it can be recorded.
+        This is meant to be called by the worker that converted the file.
+
+        Args:
+            task (ConversionTask): _description_: The file that was converted.
+        """
+        task.fingerprint = hash_file(task.input_file)
+
+    def record(self, task: ConversionTask) -> None:
+        """_summary_
+        Record a successful conversion.
+
+        Args:
+            task (ConversionTask): _description_: The file that was converted.
+        """
+        stat = task.get_stat()
+        try:
+            output_size = os.stat(task.output_file).st_size
+        except OSError:
+            return
+        if stat is None:
+            return
+        if task.fingerprint is None:
+            self.fingerprint(task)
+        record = {
+            "input": task.relative_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": task.fingerprint,
+            "output": os.path.relpath(task.output_file, self.output_directory).replace("\\", "/"),
+            "output_size": output_size,
+            "format": self.img_format,
+            "options": self.options
+        }
+        self.records[task.relative_path] = record
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
@@ -1,12 +1,32 @@
 """
 File in charge of converting mdi files to tiff
-This extension relies on the windows mdi2tiff program
+This extension relies on the windows mdi2tiff program, files that can be decoded natively are converted in memory instead.
 """
 
 import os
-from typing import Union, List
+import time
+import signal
+import asyncio
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Union, List, Tuple, Dict, Iterable, Iterator
 from . import constants as CONST
 from .change_image_format import ChangeImageFormat
+from .launcher import LaunchResult
+from .mdi_decoder import MDIDecoder
+from .backends import ConversionBackend, ExeBackend, NativeBackend, FakeBackend, select_backends
+from .conversion_task import ConversionTask
+from .manifest import ConversionManifest, MANIFEST_NAME, hash_file
+from .journal import ConversionJournal, JOURNAL_NAME, OUTCOME_SUCCESS, OUTCOME_SKIPPED, OUTCOME_FAILED
+from .cache import ConversionCache
+from .atomic_file import get_temporary_sibling, publish_file, discard_file
+from .workspace import JobWorkspace, TemporaryStorage, RAM_TEMP_FOLDER
+from .shard import Shard, parse_shard
+from .claim import WorkClaims, DEFAULT_LEASE
+from .schedule import TaskScheduler, WINDOW_PER_JOB
+from .concurrency import ConcurrencyController
+from .retry import RetryPolicy, DETERMINISTIC, classify_exception, classify_launch_result, record_failure
 
 
 class MDIToTiff:
@@ -14,17 +34,31 @@ class MDIToTiff:
     The class in charge of converting an mdi file to a tiff file
         :param success: The exit code of a successful conversion
         :param error: The exit code of a failed conversion
+        :param backend: The conversion engine: 'exe' (binary), 'native' (in memory decoder), 'fake' (deterministic images, for tests) or 'auto' (native when possible), or a ConversionBackend instance
+        :param in_memory: Write the intermediate tiff to the RAM-backed folder (ram_temp, RAM_TEMP_FOLDER by default) so that it never reaches the disk, and load it in memory before changing its format
+        :param cache_size: The maximum size (in bytes) of the conversion cache, 0 disables the cache
+        :param cache_outputs: Also keep the final outputs in the conversion cache
+        :param timeout: The number of seconds the binary is allowed to run for on a single file before it is killed, 0 disables the limit
+        :param retry_policy: The number of attempts and the backoff used when a conversion fails for a transient reason, None uses the default policy
+        :param ram_temp: The RAM-backed folder used for the intermediate files when it has room for them, an empty string keeps them on disk
+        :param launcher: The command placed before the binary (for instance 'wine')
+        :param wineserver: The wineserver kept alive during a batch, an empty string looks for it next to a Wine launcher
     """
 
-    def __init__(self, binary_name: Union[str, CONST.Constants] = "", success: int = 0, error: int = 1) -> None:
+    def __init__(self, binary_name: Union[str, CONST.Constants] = "", success: int = 0, error: int = 1, backend: Union[str, ConversionBackend] = CONST.DEFAULT_BACKEND, in_memory: bool = False, cache_size: int = 0, cache_outputs: bool = False, timeout: float = 0, retry_policy: Union[RetryPolicy, None] = None, ram_temp: str = "", launcher: str = "", wineserver: str = "") -> None:
         self.error = error
         self.success = success
+        self.timed_out = CONST.TIMEOUT
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        if self.retry_policy is None:
+            self.retry_policy = RetryPolicy()
+        self.in_memory = in_memory
         self.skipped = int(error * success)
-        if callable(binary_name) is True:
+        if isinstance(binary_name, CONST.Constants) is True:
             self.const = binary_name
         else:
             self.const = CONST.Constants(binary_name)
-        self.bin_path = self.const.binary_path
         # ------------------- Start Folder conversion stats --------------------
         self.session_active = False
         self.total_items = 0
@@ -33,7 +67,21 @@ class MDIToTiff:
         self.total_files_skipped = 0
         self.total_files_success = 0
         self.total_files_fails = 0
+        self.total_files_timed_out = 0
+        self.total_files_interrupted = 0
+        self.total_files_resumed = 0
+        self.total_files_other_shards = 0
+        self.total_files_claimed_elsewhere = 0
+        self.deadline_reached = False
+        self.stop_requested = False
         self.global_status = self.success
+        self._deadline: Union[float, None] = None
+        self.claims: Union[WorkClaims, None] = None
+        self.concurrency: Union[ConcurrencyController, None] = None
+        self.shard: Union[Shard, None] = None
+        self.shard_failures: List[str] = []
+        self.manifest: Union[ConversionManifest, None] = None
+        self.journal: Union[ConversionJournal, None] = None
         # -------------------- End Folder conversion stats ---------------------
         # ----------------------- Begin image conversion -----------------------
         self.cifi = ChangeImageFormat(
@@ -42,6 +90,77 @@ class MDIToTiff:
             error=self.error
         )
         # ----------------------(- End image conversion -----(------------------
+        # ----------------------- Begin conversion backends --------------------
+        self.decoder = MDIDecoder(
+            constants=self.const,
+            success=self.success,
+            error=self.error
+        )
+        self.exe_backend = ExeBackend(
+            constants=self.const,
+            success=self.success,
+            error=self.error,
+            launcher=launcher,
+            wineserver=wineserver
+        )
+        self.launcher = self.exe_backend.launcher
+        self.wine = self.exe_backend.wine
+        self.available_backends: Dict[str, ConversionBackend] = {
+            NativeBackend.name: NativeBackend(
+                constants=self.const,
+                success=self.success,
+                error=self.error,
+                decoder=self.decoder
+            ),
+            ExeBackend.name: self.exe_backend,
+            FakeBackend.name: FakeBackend(
+                constants=self.const,
+                success=self.success,
+                error=self.error
+            )
+        }
+        if isinstance(backend, ConversionBackend) is True:
+            self.available_backends[backend.name] = backend
+            backend = backend.name
+        self.backend = backend
+        if self.backend not in self.available_backends and self.backend != "auto":
+            self.backend = CONST.DEFAULT_BACKEND
+        self.backends = select_backends(self.backend, self.available_backends)
+        # ------------------------ End conversion backends ---------------------
+        # ----------------------- Begin temporary storage ----------------------
+        if self.in_memory is True and ram_temp == "":
+            # Without a RAM-backed destination the binary would still write the intermediate to the disk
+            ram_temp = RAM_TEMP_FOLDER
+        self.temp_storage = TemporaryStorage(
+            constants=self.const,
+            ram_folder=ram_temp,
+            decoder=self.decoder
+        )
+        # ------------------------ End temporary storage -----------------------
+        # ------------------------ Begin conversion cache ----------------------
+        self.cache: Union[ConversionCache, None] = None
+        if cache_size > 0:
+            self.cache = ConversionCache(
+                self.const,
+                cache_size,
+                cache_outputs
+            )
+        # ------------------------- End conversion cache -----------------------
+        # ------------------------ Begin async conversion ----------------------
+        self._async_semaphore: Union[asyncio.Semaphore, None] = None
+        self._async_semaphore_loop: Union[asyncio.AbstractEventLoop, None] = None
+        # ------------------------- End async conversion -----------------------
+
+    @property
+    def bin_path(self) -> Union[str, None]:
+        """_summary_
+        The path to the conversion binary, None if it was not found.
+        """
+        return self.exe_backend.bin_path
+
+    @bin_path.setter
+    def bin_path(self, bin_path: Union[str, None]) -> None:
+        self.exe_backend.bin_path = bin_path
 
     def _reset_folder_conversion_stats_session(self) -> None:
         """_summary_
@@ -55,22 +174,23 @@ class MDIToTiff:
         self.total_files_fails = 0
         self.total_files_skipped = 0
         self.total_files_success = 0
+        self.total_files_timed_out = 0
+        self.total_files_interrupted = 0
+        self.total_files_resumed = 0
+        self.total_files_other_shards = 0
+        self.total_files_claimed_elsewhere = 0
+        self.shard_failures = []
+        self.deadline_reached = False
+        self.stop_requested = False
+        self.launcher.reset_timings()
+        self.retry_policy.reset()
+        self.temp_storage.reset()
 
-    def _initialise_folder_conversion_stat_session(self, folder_content: List[str]) -> None:
+    def _initialise_folder_conversion_stat_session(self) -> None:
         """_summary_
-        Set the variables that can be set based on the contents of the folder
-
-        Args:
-            folder_content (List[str]): _description_: A list of the content of the input folder.
+        Start a new stats session, the content of the folder is counted while it is being walked.
         """
         self._reset_folder_conversion_stats_session()
-        self.total_items = len(folder_content)
-        self.total_nb_of_files = self.total_items
-        for i in folder_content:
-            if os.path.isdir(i) is True:
-                self.total_folders += 1
-                self.total_nb_of_files -= 1
-                continue
         self.session_active = True
 
     def _update_folder_conversion_stat_session(self, status: int = CONST.SUCCESS) -> None:
@@ -84,6 +204,10 @@ class MDIToTiff:
             self.total_files_success += 1
         elif status == self.skipped:
             self.total_files_skipped += 1
+        elif status == self.timed_out:
+            self.total_files_fails += 1
+            self.total_files_timed_out += 1
+            self.global_status = self.error
         else:
             self.total_files_fails += 1
             self.global_status = status
@@ -98,12 +222,412 @@ class MDIToTiff:
         self.const.pinfo(f"Total files skipped: {self.total_files_skipped}")
         self.const.pinfo(f"Total files success: {self.total_files_success}")
         self.const.pinfo(f"Total files fails: {self.total_files_fails}")
+        self.const.pinfo(f"Total files timed out: {self.total_files_timed_out}")
+        self.const.pinfo(f"Total retries: {self.retry_policy.total_retries}")
+        if self.claims is not None:
+            msg = "Total files claimed by other processes: "
+            msg += f"{self.total_files_claimed_elsewhere} "
+            msg += f"(abandoned claims taken over: {self.claims.total_taken_over})"
+            self.const.pinfo(msg)
+        if self.shard is not None:
+            msg = f"Total files left to the other shards (this is shard {self.shard}): "
+            msg += f"{self.total_files_other_shards}"
+            self.const.pinfo(msg)
+        if self.temp_storage.is_ram_enabled() is True:
+            msg = "Total jobs using the RAM-backed temporary folder: "
+            msg += f"{self.temp_storage.total_ram_jobs} "
+            msg += f"(disk fallbacks: {self.temp_storage.total_disk_fallbacks})"
+            self.const.pinfo(msg)
+        if self.total_files_resumed > 0:
+            msg = "Total files handled before resuming: "
+            msg += f"{self.total_files_resumed}"
+            self.const.pinfo(msg)
+        if self.total_files_interrupted > 0:
+            msg = "Total files interrupted: "
+            msg += f"{self.total_files_interrupted}"
+            self.const.pinfo(msg)
+        if self.launcher.total_launches > 0:
+            spawn_time = self.launcher.total_spawn_time
+            run_time = self.launcher.total_run_time
+            launches = self.launcher.total_launches
+            msg = f"Total binary spawn time: {spawn_time:.3f}s "
+            msg += f"(average: {spawn_time / launches:.4f}s)"
+            self.const.pinfo(msg)
+            msg = f"Total binary run time: {run_time:.3f}s "
+            msg += f"(average: {run_time / launches:.4f}s)"
+            self.const.pinfo(msg)
+        if self.cache is not None:
+            msg = f"Cache hits: {self.cache.hits}, misses: {self.cache.misses}"
+            msg += f", evictions: {self.cache.evictions}"
+            self.const.pinfo(msg)
+        if self.deadline_reached is True:
+            msg = "The batch deadline was reached, "
+            msg += "the remaining files were not converted."
+            self.const.pwarning(msg)
+        if self.stop_requested is True:
+            msg = "The conversion was interrupted, "
+            msg += "use --resume to continue where it stopped."
+            self.const.pwarning(msg)
         if self.global_status == self.success:
             self.const.psuccess("All files have been converted successfully.")
         else:
             self.const.perror("Some files could not be converted.")
 
-    def _run_conversion_steps(self, input_file: str, output_file: str, image_format: str) -> int:
+    def _get_conversion_steps(self, output_file: Union[str, List[str]]) -> Tuple[str, Union[str, None]]:
+        """_summary_
+        Split the checked output file into the destination of the binary and the destination of the format change (if any).
+
+        Args:
+            output_file (Union[str, List[str]]): _description_: The output file(s) returned by _check_output_file.
+
+        Returns:
+            Tuple[str, Union[str, None]]: _description_: The tiff destination and the final destination (None when no second step is required).
+        """
+        if isinstance(output_file, list) is True:
+            return output_file[0], output_file[1]
+        return output_file, None
+
+    def _create_workspace(self, input_file: str) -> JobWorkspace:
+        """_summary_
+        Create the temporary workspace of a job, its folder is chosen by the temporary storage when it is first used.
+
+        Args:
+            input_file (str): _description_: The file converted by the job.
+
+        Returns:
+            JobWorkspace: _description_: The workspace (to use as a context manager).
+        """
+        return JobWorkspace(
+            self.const,
+            storage=self.temp_storage,
+            input_file=input_file
+        )
+
+    def _get_job_intermediate(self, step1: str, step2: Union[str, None], workspace: JobWorkspace) -> str:
+        """_summary_
+        Get the destination of the binary for a job: the intermediate tiff is kept in the workspace of the job, a final tiff is written in place.
+
+        Args:
+            step1 (str): _description_: The tiff destination returned by _get_conversion_steps.
+            step2 (Union[str, None]): _description_: The final destination when the format is not tiff.
+            workspace (JobWorkspace): _description_: The temporary workspace of the job.
+
+        Returns:
+            str: _description_: The path where the binary has to write the tiff.
+        """
+        if step2 is None:
+            return step1
+        return workspace.get_intermediate_path(os.path.basename(step1))
+
+    def _log_launch_result(self, result: LaunchResult, input_file: str, workspace: Union[JobWorkspace, None] = None) -> None:
+        """_summary_
+        Display the timings of a call to the binary, and its outputs (and log) when it failed.
+
+        Args:
+            result (LaunchResult): _description_: The result of the call.
+            input_file (str): _description_: The file that was being converted.
+            workspace (Union[JobWorkspace, None], optional): _description_: The workspace holding the log of the binary. Defaults to None.
+        """
+        msg = f"'{input_file}': spawn time: {result.spawn_time:.4f}s, "
+        msg += f"run time: {result.run_time:.4f}s, "
+        msg += f"exit code: {result.exit_code}"
+        self.const.pdebug(msg)
+        if result.exit_code != self.success:
+            for name, content in (("stdout", result.stdout), ("stderr", result.stderr)):
+                if content.strip() != "":
+                    self.const.perror(
+                        f"'{input_file}': {name} of the binary:\n{content.strip()}"
+                    )
+            if workspace is not None:
+                content = workspace.read_log()
+                if content.strip() != "":
+                    self.const.perror(
+                        f"'{input_file}': log of the binary:\n{content.strip()}"
+                    )
+
+    def _get_launch_timeout(self) -> Union[float, None]:
+        """_summary_
+        Get the time the binary is allowed to run for, based on the per-file timeout and on the deadline of the batch.
+
+        Returns:
+            Union[float, None]: _description_: The number of seconds (0 or less when the deadline has passed), None if there is no limit.
+        """
+        timeout = None
+        if self.timeout > 0:
+            timeout = float(self.timeout)
+        if self._deadline is not None:
+            remaining = self._deadline - time.monotonic()
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+        return timeout
+
+    def _is_past_deadline(self) -> bool:
+        """_summary_
+        Check if the deadline of the batch has passed, and remember it for the stats session.
+
+        Returns:
+            bool: _description_: True if no new conversion should be started.
+        """
+        if self._deadline is None or time.monotonic() < self._deadline:
+            return False
+        if self.deadline_reached is False:
+            self.deadline_reached = True
+            self.global_status = self.error
+            self.const.pwarning("The batch deadline was reached, stopping.")
+        return True
+
+    def _publish_binary_output(self, temporary_step1: str, step1: str, exit_code: int, failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Move the tiff written by the binary to its real name, or discard it when the binary failed.
+
+        Args:
+            temporary_step1 (str): _description_: The path the binary was asked to write to.
+            step1 (str): _description_: The real path of the tiff.
+            exit_code (int): _description_: The status of the binary.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the binary step.
+        """
+        if exit_code != self.success:
+            discard_file(temporary_step1)
+            return exit_code
+        try:
+            publish_file(temporary_step1, step1)
+        except OSError as e:
+            discard_file(temporary_step1)
+            self.const.perror(f"The binary did not create '{step1}': '{e}'")
+            record_failure(failures, classify_exception(e))
+            return self.error
+        return exit_code
+
+    def _handle_binary_result(self, result: LaunchResult, input_file: str, workspace: JobWorkspace, temporary_step1: str, step1: str, failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Report a call to the binary and publish (or discard) the tiff it wrote.
+
+        Args:
+            result (LaunchResult): _description_: The result of the call.
+            input_file (str): _description_: The file that was being converted.
+            workspace (JobWorkspace): _description_: The workspace holding the log of the binary.
+            temporary_step1 (str): _description_: The path the binary was asked to write to.
+            step1 (str): _description_: The real path of the tiff.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the binary step.
+        """
+        self._log_launch_result(result, input_file, workspace)
+        if result.timed_out is True:
+            discard_file(temporary_step1)
+            return self._log_timeout(result, input_file)
+        if result.exit_code != self.success:
+            record_failure(failures, classify_launch_result(result))
+        return self._publish_binary_output(
+            temporary_step1,
+            step1,
+            result.exit_code,
+            failures
+        )
+
+    def _request_stop(self, signal_number: int, frame) -> None:
+        """_summary_
+        Signal handler asking the folder conversion to stop handing out files, a second Ctrl+C aborts immediately.
+
+        Args:
+            signal_number (int): _description_: The signal that was received.
+            frame (_type_): _description_: The frame that was interrupted.
+        """
+        self.stop_requested = True
+        self.global_status = self.error
+        msg = f"Received signal {signal_number}, "
+        msg += "waiting for the conversions in flight to finish "
+        msg += "(press Ctrl+C again to abort)."
+        self.const.pwarning(msg)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    def _install_stop_handlers(self) -> Dict[int, object]:
+        """_summary_
+        Catch SIGINT and SIGTERM during a folder conversion so that it stops gracefully.
+        Signal handlers can only be installed from the main thread, nothing is done otherwise.
+
+        Returns:
+            Dict[int, object]: _description_: The handlers that were replaced.
+        """
+        previous_handlers = {}
+        if threading.current_thread() is not threading.main_thread():
+            return previous_handlers
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signal_number] = signal.getsignal(signal_number)
+            signal.signal(signal_number, self._request_stop)
+        return previous_handlers
+
+    def _restore_stop_handlers(self, previous_handlers: Dict[int, object]) -> None:
+        """_summary_
+        Put back the signal handlers replaced by _install_stop_handlers.
+
+        Args:
+            previous_handlers (Dict[int, object]): _description_: The handlers that were replaced.
+        """
+        for signal_number, handler in previous_handlers.items():
+            signal.signal(signal_number, handler)
+
+    def _should_stop_dispatching(self) -> bool:
+        """_summary_
+        Check if the folder conversion has to stop handing out files (interruption or deadline).
+
+        Returns:
+            bool: _description_: True if no new conversion should be started.
+        """
+        if self.stop_requested is True:
+            return True
+        return self._is_past_deadline()
+
+    def _log_timeout(self, result: LaunchResult, input_file: str) -> int:
+        """_summary_
+        Display that the binary was killed because it ran for too long.
+
+        Args:
+            result (LaunchResult): _description_: The result of the call.
+            input_file (str): _description_: The file that was being converted.
+
+        Returns:
+            int: _description_: The status of a conversion that timed out.
+        """
+        msg = f"'{input_file}': the binary was killed after "
+        msg += f"{result.run_time:.1f}s, the conversion timed out."
+        self.const.perror(msg)
+        return self.timed_out
+
+    def _run_in_process_conversion(self, input_file: str, step1: str, step2: Union[str, None], image_format: str, failures: Union[List[str], None] = None) -> Union[int, None]:
+        """_summary_
+        Convert a file with the first in-process backend that can decode it, the pages are written straight to their final destination.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            step1 (str): _description_: The tiff destination (used when no format change is required).
+            step2 (Union[str, None]): _description_: The final destination when the format is not tiff.
+            image_format (str): _description_: The destination format of the image.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            Union[int, None]: _description_: The status of the conversion, None if the file has to be converted by the binary.
+        """
+        images = None
+        for backend in self.backends:
+            if backend.in_process is False:
+                continue
+            try:
+                images = backend.decode(input_file)
+            except OSError as e:
+                self.const.perror(f"Failed to read '{input_file}': '{e}'")
+                record_failure(failures, classify_exception(e))
+                return self.error
+            if images is not None:
+                self.const.pdebug(
+                    f"'{input_file}' was decoded by the '{backend.name}' backend."
+                )
+                break
+        if images is None:
+            if self.exe_backend not in self.backends:
+                msg = f"'{input_file}' cannot be decoded by the '{self.backend}' backend."
+                self.const.perror(msg)
+                record_failure(failures, DETERMINISTIC)
+                return self.error
+            return None
+        if step2 is None:
+            return self.cifi.images_to_desired_format(
+                images, step1, "tiff", failures
+            )
+        return self.cifi.images_to_desired_format(
+            images, step2, image_format, failures
+        )
+
+    def _run_format_change(self, step1: str, step2: str, image_format: str, failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Change the format of the intermediate tiff created by the binary and discard it.
+
+        Args:
+            step1 (str): _description_: The path to the intermediate tiff.
+            step2 (str): _description_: The path to the final file.
+            image_format (str): _description_: The destination format of the image.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the format change.
+        """
+        if self.in_memory is True:
+            content = self.cifi.read_intermediate(step1, failures)
+            if content is None:
+                return self.error
+            return self.cifi.to_desired_format(
+                content, step2, image_format, failures
+            )
+        status = self.cifi.to_desired_format(
+            step1, step2, image_format, failures
+        )
+        self.cifi.remove_intermediate(step1)
+        return status
+
+    def _write_content(self, content: BytesIO, destination: str, failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Write an image that is held in memory to a file, the file is renamed into place once complete.
+
+        Args:
+            content (BytesIO): _description_: The content of the image.
+            destination (str): _description_: The path of the file to create.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the write.
+        """
+        temporary_destination = get_temporary_sibling(destination)
+        try:
+            with open(temporary_destination, "wb") as file:
+                file.write(content.getbuffer())
+            publish_file(temporary_destination, destination)
+        except OSError as e:
+            discard_file(temporary_destination)
+            self.const.perror(f"Failed to write '{destination}': '{e}'")
+            record_failure(failures, classify_exception(e))
+            return self.error
+        return self.success
+
+    def _run_cached_conversion(self, cache_key: str, step1: str, step2: Union[str, None], image_format: str, failures: Union[List[str], None] = None) -> Union[int, None]:
+        """_summary_
+        Convert a file from the content of the conversion cache.
+
+        Args:
+            cache_key (str): _description_: The hash of the input file.
+            step1 (str): _description_: The tiff destination (used when no format change is required).
+            step2 (Union[str, None]): _description_: The final destination when the format is not tiff.
+            image_format (str): _description_: The destination format of the image.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            Union[int, None]: _description_: The status of the conversion, None if the file is not in the cache.
+        """
+        if step2 is None:
+            content = self.cache.get_intermediate(cache_key)
+            if content is None:
+                return None
+            return self._write_content(content, step1, failures)
+        # A lookup is a single miss even though two entries are tried
+        content = self.cache.get_output(
+            cache_key, image_format, count_miss=False
+        )
+        if content is not None:
+            return self._write_content(content, step2, failures)
+        content = self.cache.get_intermediate(cache_key)
+        if content is None:
+            return None
+        status = self.cifi.to_desired_format(
+            content, step2, image_format, failures
+        )
+        if status == self.success:
+            self.cache.put_output(cache_key, image_format, step2)
+        return status
+
+    def _run_conversion_steps(self, input_file: str, output_file: str, image_format: str, workspace: JobWorkspace, failures: Union[List[str], None] = None) -> int:
         """_summary_
         This function is the one that will run the different conversion steps that are required in order to achieve the desired format.
 
@@ -111,37 +635,152 @@ class MDIToTiff:
             input_file (str): _description_: The path to the input file.
             output_file (str): _description_: The path to the output file.
             image_format (str): _description_: The destination format of the image.
+            workspace (JobWorkspace): _description_: The temporary workspace of the job (intermediate tiff and log of the binary).
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
 
         Returns:
             int: _description_: The status of the execution.
         """
-        if isinstance(output_file, list) is True:
-            step1 = output_file[0]
-            step2 = output_file[1]
-        else:
-            step1 = output_file
-            step2 = None
-        command = f"{self.bin_path} -source {input_file} -dest {step1} "
-        command += f"-log {self.const.log_file_location}"
-        exit_code = os.system(command)
+        step1, step2 = self._get_conversion_steps(output_file)
+        exit_code = self._run_in_process_conversion(
+            input_file,
+            step1,
+            step2,
+            image_format,
+            failures
+        )
+        if exit_code is not None:
+            return exit_code
+        cache_key = None
+        if self.cache is not None:
+            cache_key = hash_file(input_file)
+        if cache_key is not None:
+            exit_code = self._run_cached_conversion(
+                cache_key,
+                step1,
+                step2,
+                image_format,
+                failures
+            )
+            if exit_code is not None:
+                return exit_code
+        if self.bin_path is None:
+            self.const.err_binary_path_not_found()
+            record_failure(failures, DETERMINISTIC)
+            return self.error
+        timeout = self._get_launch_timeout()
+        if timeout is not None and timeout <= 0:
+            self.const.perror(f"'{input_file}': the batch deadline has passed.")
+            return self.timed_out
+        step1 = self._get_job_intermediate(step1, step2, workspace)
+        temporary_step1 = get_temporary_sibling(step1)
+        result = self.exe_backend.run(
+            input_file,
+            temporary_step1,
+            workspace.log_file,
+            timeout
+        )
+        exit_code = self._handle_binary_result(
+            result,
+            input_file,
+            workspace,
+            temporary_step1,
+            step1,
+            failures
+        )
         if exit_code != self.success:
             return exit_code
+        if cache_key is not None:
+            self.cache.put_intermediate(cache_key, step1)
         if step2 is not None:
-            return self.cifi.to_desired_format(step1, step2, image_format)
+            exit_code = self._run_format_change(
+                step1, step2, image_format, failures
+            )
+            if exit_code == self.success and cache_key is not None:
+                self.cache.put_output(cache_key, image_format, step2)
         return exit_code
 
-    def convert(self, input_file: str, output_file: Union[str, List[str]], img_format: str) -> int:
+    def _get_retry_delay(self, exit_code: int, failures: List[str], attempt: int, input_file: str) -> Union[float, None]:
         """_summary_
-        Convert an mdi file to a tiff file
+        Decide if a failed attempt has to be run again and how long to wait before it.
+
+        Args:
+            exit_code (int): _description_: The status of the attempt.
+            failures (List[str]): _description_: The kinds of the failures met during the attempt.
+            attempt (int): _description_: The number of the attempt (starting at 1).
+            input_file (str): _description_: The file that is being converted.
+
+        Returns:
+            Union[float, None]: _description_: The number of seconds to wait, None if the conversion must not be attempted again.
+        """
+        if exit_code in (self.success, self.timed_out):
+            return None
+        if self.retry_policy.should_retry(failures, attempt) is False:
+            if len(failures) > 0 and failures[-1] == DETERMINISTIC and attempt == 1:
+                self.const.pdebug(
+                    f"'{input_file}': the failure is not transient, not retrying."
+                )
+            return None
+        delay = self.retry_policy.get_delay(attempt)
+        if self._deadline is not None and time.monotonic() + delay >= self._deadline:
+            return None
+        msg = f"'{input_file}': transient failure, retrying in {delay:.2f}s "
+        msg += f"(attempt {attempt + 1}/{self.retry_policy.max_attempts})."
+        self.const.pwarning(msg)
+        self.retry_policy.register_retry()
+        return delay
+
+    def _run_conversion_steps_with_retry(self, input_file: str, output_file: Union[str, List[str]], image_format: str, last_failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        Run the conversion steps until they succeed, fail for a reason that is not transient, or run out of attempts.
+        The attempts share a temporary workspace that is removed once the job ends, whatever its outcome.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            output_file (Union[str, List[str]]): _description_: The path(s) to the output file.
+            image_format (str): _description_: The destination format of the image.
+            last_failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures of the last attempt. Defaults to None.
+
+        Returns:
+            int: _description_: The status of the last attempt.
+        """
+        attempt = 1
+        with self._create_workspace(input_file) as workspace:
+            while True:
+                failures: List[str] = []
+                exit_code = self._run_conversion_steps(
+                    input_file,
+                    output_file,
+                    image_format,
+                    workspace,
+                    failures
+                )
+                delay = self._get_retry_delay(
+                    exit_code,
+                    failures,
+                    attempt,
+                    input_file
+                )
+                if delay is None:
+                    if last_failures is not None:
+                        last_failures.extend(failures)
+                    return exit_code
+                time.sleep(delay)
+                attempt += 1
+
+    def _get_pre_conversion_status(self, input_file: str, output_file: str, overwrite: bool = False) -> Union[int, None]:
+        """_summary_
+        Check if a conversion has to be run.
 
         Args:
             input_file (str): _description_: The mdi file to convert
-            output_file (Union[str, List[str, str]]): _description_: The tiff file to create
+            output_file (str): _description_: The file to create
+            overwrite (bool, optional): _description_: Convert the file even if the output already exists. Defaults to False.
 
         Returns:
-            int: _description_: The status of the convertion (success:int  or error:int)
+            Union[int, None]: _description_: The status to return without converting, None if the conversion has to be run.
         """
-        if self.session_active is False and self.bin_path is None:
+        if self.session_active is False and self.bin_path is None and self.backend == "exe":
             self.const.err_binary_path_not_found()
             return self.error
         if os.path.exists(input_file) is False:
@@ -152,38 +791,77 @@ class MDIToTiff:
                 critical=True
             )
             return self.error
-        if os.path.exists(output_file) is True:
+        if overwrite is False and os.path.exists(output_file) is True:
             self.const.pwarning(f"'{output_file}' already exists, skipping.")
             if self.session_active is True:
                 return self.skipped
             return self.success
-        checked_output_file = self.cifi._check_output_file(
-            output_file,
-            img_format
-        )
-        exit_code = self._run_conversion_steps(
-            input_file,
-            checked_output_file,
-            img_format
-        )
+        return None
+
+    def _log_conversion_result(self, exit_code: int, input_file: str, output_file: str) -> int:
+        """_summary_
+        Display the result of a single conversion and normalise the returned status.
+
+        Args:
+            exit_code (int): _description_: The status returned by the conversion steps.
+            input_file (str): _description_: The mdi file that was converted
+            output_file (str): _description_: The file that was created
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
         if exit_code == self.success:
             if self.session_active is False:
                 msg = f"{input_file} -> {output_file}: ok"
                 self.const.psuccess(msg)
             return exit_code
+        if exit_code == self.timed_out:
+            return exit_code
         return self.error
 
-    def convert_all(self, input_directory: str = "", output_directory: str = "", img_format: str = "") -> int:
+    def convert(self, input_file: str, output_file: Union[str, List[str]], img_format: str, overwrite: bool = False, failures: Union[List[str], None] = None) -> int:
         """_summary_
-        Convert all mdi files in a directory to tiff files
+        Convert an mdi file to a tiff file
 
         Args:
-            input_directory (str, optional): _description_: The directory containing the mdi files to convert. Defaults to "".
-            output_directory (str, optional): _description_: The directory where the tiff files will be created. Defaults to "".
+            input_file (str): _description_: The mdi file to convert
+            output_file (Union[str, List[str, str]]): _description_: The tiff file to create
+            overwrite (bool, optional): _description_: Convert the file even if the output already exists. Defaults to False.
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures of the last attempt (see retry.py). Defaults to None.
 
         Returns:
             int: _description_: The status of the convertion (success:int  or error:int)
         """
+        status = self._get_pre_conversion_status(
+            input_file,
+            output_file,
+            overwrite
+        )
+        if status is not None:
+            return status
+        checked_output_file = self.cifi._check_output_file(
+            output_file,
+            img_format
+        )
+        exit_code = self._run_conversion_steps_with_retry(
+            input_file,
+            checked_output_file,
+            img_format,
+            failures
+        )
+        return self._log_conversion_result(exit_code, input_file, output_file)
+
+    def _get_folder_conversion_directories(self, input_directory: str, output_directory: str) -> Union[Tuple[str, str], None]:
+        """_summary_
+        Resolve the input and output directories of a folder conversion and create the output directory if required.
+
+        Args:
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files will be created.
+
+        Returns:
+            Union[Tuple[str, str], None]: _description_: The (input, output) directories, None if the conversion cannot take place.
+        """
         if input_directory == "":
             e = self.const.in_directory
             self.const.pwarning(
@@ -196,12 +874,12 @@ class MDIToTiff:
                 f"No output directory was found, defaulting to: '{e}'"
             )
             output_directory = e
-        if self.bin_path is None:
+        if self.bin_path is None and self.backend == "exe":
             self.const.err_binary_path_not_found()
-            return self.error
+            return None
         if os.path.exists(input_directory) is False:
             self.const.err_item_not_found(True, "input", input_directory, True)
-            return self.error
+            return None
         if os.path.exists(output_directory) is False:
             try:
                 os.makedirs(output_directory)
@@ -213,30 +891,882 @@ class MDIToTiff:
                     True,
                     additional_text=f"Error: '{e}'"
                 )
+                return None
+        return input_directory, output_directory
+
+    def _get_output_name(self, file_name: str) -> str:
+        """_summary_
+        Get the name of the converted file based on the name of the mdi file.
+
+        Args:
+            file_name (str): _description_: The name of the mdi file.
+
+        Returns:
+            str: _description_: The name of the file to create.
+        """
+        return file_name.replace(".mdi", ".tiff")
+
+    def _get_folder_task(self, input_directory: str, output_directory: str, relative_path: str) -> Union[ConversionTask, None]:
+        """_summary_
+        Build the task of a file from its path relative to the input directory (used for the files left in flight by an interrupted run).
+
+        Args:
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files will be created.
+            relative_path (str): _description_: The path of the file relative to the input directory (with '/' separators).
+
+        Returns:
+            Union[ConversionTask, None]: _description_: The task, None if the file no longer exists.
+        """
+        parts = relative_path.split("/")
+        input_file = os.path.join(input_directory, *parts)
+        if os.path.isfile(input_file) is False:
+            self.const.pwarning(f"'{input_file}' no longer exists, skipping.")
+            return None
+        current_output = os.path.join(output_directory, *parts[:-1])
+        os.makedirs(current_output, exist_ok=True)
+        return ConversionTask(
+            input_file=input_file,
+            output_file=os.path.join(
+                current_output,
+                self._get_output_name(parts[-1])
+            ),
+            relative_path=relative_path
+        )
+
+    def _iter_folder_conversion_tasks(self, input_directory: str, output_directory: str, recursive: bool = False, resume_after: Union[str, None] = None) -> Iterator[ConversionTask]:
+        """_summary_
+        Walk the input directory and yield the files to convert, one directory at a time.
+        The walk relies on os.scandir so that the type of each entry comes from the directory listing itself.
+        The listing of the directory being visited is held in memory to be sorted (so the memory used grows with the largest directory,
+        not with the whole tree), along with the directories that remain to be visited.
+        The order of the walk is stable: the files of a directory sorted by name, then its sub-directories sorted by name.
+        This allows a walk to resume after a given file without visiting the directories that come before it.
+        Like os.walk, the symbolic links to directories are not followed (a link to a parent would make the walk loop).
+        The content of the folder is counted in the stats session as it is walked.
+
+        Args:
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files will be created (the input tree is mirrored in it).
+            recursive (bool, optional): _description_: Also walk the sub-directories. Defaults to False.
+            resume_after (Union[str, None], optional): _description_: The relative path of the last file handed out by an interrupted walk, only the files after it are yielded. Defaults to None.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files to convert.
+        """
+        cursor = None
+        if resume_after is not None:
+            cursor = resume_after.split("/")
+        # Each item is a directory to visit and the part of the cursor that is inside it (None once past the cursor)
+        pending_directories = [("", cursor)]
+        while len(pending_directories) > 0:
+            relative_directory, cursor = pending_directories.pop()
+            current_directory = os.path.join(input_directory, relative_directory)
+            current_output = os.path.join(output_directory, relative_directory)
+            files = []
+            sub_directories = []
+            try:
+                with os.scandir(current_directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) is True:
+                            if cursor is not None and len(cursor) > 1 and entry.name < cursor[0]:
+                                continue
+                            sub_directories.append(entry)
+                        elif entry.is_symlink() is True and entry.is_dir() is True:
+                            self.const.pdebug(
+                                f"Not following the directory link '{entry.path}'."
+                            )
+                        elif cursor is None or (len(cursor) == 1 and entry.name > cursor[0]):
+                            files.append(entry)
+            except OSError as e:
+                self.const.perror(
+                    f"Failed to walk '{current_directory}': '{e}'"
+                )
+                self.global_status = self.error
+                continue
+            files.sort(key=lambda item: item.name)
+            sub_directories.sort(key=lambda item: item.name, reverse=True)
+            output_created = relative_directory == ""
+            for entry in files:
+                self.total_items += 1
+                self.total_nb_of_files += 1
+                if entry.name.endswith(".mdi") is False:
+                    continue
+                relative_path = entry.name
+                if relative_directory != "":
+                    relative_path = f"{relative_directory}/{entry.name}"
+                if output_created is False:
+                    os.makedirs(current_output, exist_ok=True)
+                    output_created = True
+                yield ConversionTask(
+                    input_file=entry.path,
+                    output_file=os.path.join(
+                        current_output,
+                        self._get_output_name(entry.name)
+                    ),
+                    relative_path=relative_path,
+                    entry=entry
+                )
+            for entry in sub_directories:
+                sub_cursor = None
+                if cursor is not None and len(cursor) > 1 and entry.name == cursor[0]:
+                    sub_cursor = cursor[1:]
+                self.total_items += 1
+                self.total_folders += 1
+                if recursive is False:
+                    continue
+                relative_path = entry.name
+                if relative_directory != "":
+                    relative_path = f"{relative_directory}/{entry.name}"
+                pending_directories.append((relative_path, sub_cursor))
+
+    def _convert_folder_task(self, task: ConversionTask, img_format: str) -> int:
+        """_summary_
+        Convert a single file that is part of a folder conversion.
+        This is the function run by the workers.
+
+        Args:
+            task (ConversionTask): _description_: The file to convert.
+            img_format (str): _description_: The destination format of the image.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int, skipped:int or error:int)
+        """
+        self.const.pinfo(
+            f"Converting '{task.input_file}' to '{task.output_file}'"
+        )
+        status = self.convert(
+            task.input_file,
+            task.output_file,
+            img_format,
+            overwrite=self.manifest is not None
+        )
+        if status == self.success and self.manifest is not None:
+            self.manifest.fingerprint(task)
+        return status
+
+    def _finish_folder_task(self, task: ConversionTask, status: int) -> None:
+        """_summary_
+        Register the outcome of a file of a folder conversion.
+        This is only called from the thread that dispatches the files.
+
+        Args:
+            task (ConversionTask): _description_: The file that was converted.
+            status (int): _description_: The status returned by the conversion.
+        """
+        if self.stop_requested is True and status not in (self.success, self.skipped):
+            # A failure after the stop request may come from the interruption (without --timeout the binary shares the terminal's
+            # process group and receives Ctrl+C too, with --timeout it runs in its own session and does not), the outcome
+            # cannot be trusted either way, so the file is left in flight for a resumed run
+            self.total_files_interrupted += 1
+            self.const.pwarning(
+                f"'{task.input_file}' was interrupted, it will be converted again on resume."
+            )
+            if self.claims is not None:
+                self.claims.release(task.input_file)
+            return
+        self._register_folder_item_status(
+            status,
+            task.input_file,
+            task.output_file
+        )
+        if status == self.success and self.manifest is not None:
+            self.manifest.record(task)
+        if self.claims is not None:
+            # The record is on the disk before the claim is released, so a process claiming the file next sees it is done
+            if self.manifest is not None:
+                self.manifest.flush()
+            self.claims.release(task.input_file)
+        if self.journal is not None:
+            outcome = OUTCOME_FAILED
+            if status == self.success:
+                outcome = OUTCOME_SUCCESS
+            elif status == self.skipped:
+                outcome = OUTCOME_SKIPPED
+            self.journal.finished(task.relative_path, outcome)
+
+    def _filter_shard_tasks(self, tasks: Iterable[ConversionTask]) -> Iterator[ConversionTask]:
+        """_summary_
+        Filter out the files that belong to the other shards.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files found in the input directory.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files of this shard.
+        """
+        for task in tasks:
+            if self.shard is not None and self.shard.contains(task.relative_path) is False:
+                self.total_files_other_shards += 1
+                continue
+            yield task
+
+    def _claim_tasks(self, tasks: Iterable[ConversionTask]) -> Iterator[ConversionTask]:
+        """_summary_
+        Filter out the files that another process is converting, the files that are yielded are claimed by this process.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files found in the input directory.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files claimed by this process.
+        """
+        for task in tasks:
+            if self.claims is not None and self.claims.claim(task.input_file) is False:
+                self.const.pdebug(
+                    f"'{task.input_file}' is claimed by another process, skipping."
+                )
+                self.total_files_claimed_elsewhere += 1
+                if self.journal is not None:
+                    # The other process converts it, a resumed run does not have to
+                    self.journal.finished(task.relative_path, OUTCOME_SKIPPED)
+                continue
+            yield task
+
+    def _get_bookkeeping_name(self, name: str) -> str:
+        """_summary_
+        Get the name of a file kept in the output directory (journal, manifest), each shard has its own.
+
+        Args:
+            name (str): _description_: The name used without sharding.
+
+        Returns:
+            str: _description_: The name of the file.
+        """
+        if self.shard is None:
+            return name
+        return self.shard.get_file_name(name)
+
+    def _write_shard_report(self, input_directory: str, output_directory: str, img_format: str, started_at: float, completed: bool) -> None:
+        """_summary_
+        Write the summary report of the shard that was converted.
+
+        Args:
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files are stored.
+            img_format (str): _description_: The destination format of the images.
+            started_at (float): _description_: The time (time.time) the conversion started at.
+            completed (bool): _description_: False if the conversion was interrupted.
+        """
+        if self.shard is None:
+            return
+        finished_at = time.time()
+        path = self.shard.write_report(
+            self.const,
+            output_directory,
+            {
+                "input_directory": os.path.abspath(input_directory),
+                "output_directory": os.path.abspath(output_directory),
+                "format": img_format,
+                "backend": self.backend,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "duration": finished_at - started_at,
+                "completed": completed,
+                "status": self.global_status,
+                "files_handled": self.total_files_success + self.total_files_skipped + self.total_files_fails,
+                "files_in_other_shards": self.total_files_other_shards,
+                "success": self.total_files_success,
+                "skipped": self.total_files_skipped,
+                "fails": self.total_files_fails,
+                "timed_out": self.total_files_timed_out,
+                "interrupted": self.total_files_interrupted,
+                "failed_files": self.shard_failures
+            }
+        )
+        if path is not None:
+            self.const.pinfo(f"Report of shard {self.shard} written to '{path}'.")
+
+    def _skip_up_to_date_tasks(self, tasks: Iterable[ConversionTask]) -> Iterator[ConversionTask]:
+        """_summary_
+        Filter out the files whose output recorded in the manifest is still valid.
+        With claims, the files reach this filter once claimed, the records written since by the processes sharing the tree
+        are read first so that a file another process finished and released is not converted again.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files found in the input directory.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files that are new or changed.
+        """
+        for task in tasks:
+            if self.manifest is not None and self.claims is not None:
+                self.manifest.refresh()
+            if self.manifest is not None and self.manifest.is_up_to_date(task) is True:
+                self.const.pdebug(
+                    f"'{task.input_file}' has not changed, skipping."
+                )
+                self.total_files_skipped += 1
+                if self.journal is not None:
+                    self.journal.finished(task.relative_path, OUTCOME_SKIPPED)
+                if self.claims is not None:
+                    self.claims.release(task.input_file)
+                continue
+            yield task
+
+    def _journal_folder_tasks(self, tasks: Iterable[ConversionTask], input_directory: str, output_directory: str) -> Iterator[ConversionTask]:
+        """_summary_
+        Record the files in the journal as they are handed out.
+        When resuming, the files left in flight by the interrupted run are handed out first.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files found by the walk.
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files will be created.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files to convert.
+        """
+        for relative_path in list(self.journal.in_flight):
+            task = self._get_folder_task(
+                input_directory,
+                output_directory,
+                relative_path
+            )
+            if task is None:
+                self.journal.finished(relative_path, OUTCOME_FAILED)
+                continue
+            self.journal.redispatched(relative_path)
+            yield task
+        for task in tasks:
+            self.journal.dispatched(task.relative_path)
+            yield task
+
+    def _register_folder_item_status(self, status: int, input_file: str, output_file: str) -> None:
+        """_summary_
+        Add the status of a converted file to the stats session and display the outcome.
+
+        Args:
+            status (int): _description_: The status returned by the conversion.
+            input_file (str): _description_: The path to the input file.
+            output_file (str): _description_: The path to the output file.
+        """
+        self._update_folder_conversion_stat_session(status)
+        if self.shard is not None and status not in (self.success, self.skipped):
+            self.shard_failures.append(input_file)
+        if status == self.success:
+            msg = f"File '{input_file}' has been converted to "
+            msg += f"'{output_file}'."
+            self.const.psuccess(msg)
+        elif status == self.skipped:
+            msg = f"File '{input_file}' was skipped."
+            self.const.pinfo(msg)
+        elif status == self.timed_out:
+            msg = f"File '{input_file}' timed out and was not converted to "
+            msg += f"'{output_file}'"
+            self.const.perror(msg)
+        else:
+            msg = f"File '{input_file}' could not be converted to "
+            msg += f"'{output_file}'"
+            self.const.perror(msg)
+
+    def _convert_folder_sequentially(self, tasks: Iterable[ConversionTask], img_format: str) -> None:
+        """_summary_
+        Convert the files of a folder one after the other.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files to convert.
+            img_format (str): _description_: The destination format of the images.
+        """
+        for task in tasks:
+            if self._should_stop_dispatching() is True:
+                break
+            status = self._convert_folder_task(task, img_format)
+            self._finish_folder_task(task, status)
+
+    def _collect_finished_conversions(self, pending: Dict[Future, ConversionTask], return_when: str = FIRST_COMPLETED) -> None:
+        """_summary_
+        Wait for conversions of the pool to finish and add their status to the stats session.
+
+        Args:
+            pending (Dict[Future, ConversionTask]): _description_: The conversions in flight, the finished ones are removed from it.
+            return_when (str, optional): _description_: When to stop waiting (see concurrent.futures.wait). Defaults to FIRST_COMPLETED.
+        """
+        if len(pending) == 0:
+            return
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            task = pending.pop(future)
+            try:
+                status = future.result()
+            except Exception as e:
+                self.const.perror(
+                    f"Unexpected error while converting '{task.input_file}': '{e}'"
+                )
+                status = self.error
+            self._finish_folder_task(task, status)
+            if self.concurrency is not None:
+                self.concurrency.record_completion(task.get_size())
+
+    def _convert_folder_in_parallel(self, tasks: Iterable[ConversionTask], img_format: str, jobs: int) -> None:
+        """_summary_
+        Convert the files of a folder using a pool of workers.
+        Only a bounded number of files are handed to the pool at once so the memory used does not depend on the number of files.
+        With the adaptive concurrency, the files in flight are kept at the level chosen by the controller instead.
+        The statistics are only updated from the calling thread so the totals stay consistent.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files to convert.
+            img_format (str): _description_: The destination format of the images.
+            jobs (int): _description_: The number of conversions allowed to run at the same time.
+        """
+        if self.concurrency is None:
+            self.const.pdebug(f"Converting the files using {jobs} workers.")
+        else:
+            self.const.pdebug(
+                f"Converting the files using {self.concurrency.jobs} workers at first, adjusted between {self.concurrency.min_jobs} and {jobs}."
+            )
+        max_pending = jobs * 2
+        pending: Dict[Future, ConversionTask] = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for task in tasks:
+                while len(pending) >= (max_pending if self.concurrency is None else self.concurrency.jobs):
+                    self._collect_finished_conversions(pending)
+                if self._should_stop_dispatching() is True:
+                    break
+                future = executor.submit(
+                    self._convert_folder_task,
+                    task,
+                    img_format
+                )
+                pending[future] = task
+            while len(pending) > 0:
+                self._collect_finished_conversions(pending)
+
+    def _start_deadline(self, deadline: float = 0) -> None:
+        """_summary_
+        Set the time after which the batch stops starting new conversions.
+
+        Args:
+            deadline (float, optional): _description_: The number of seconds the batch is allowed to run for, 0 disables the deadline. Defaults to 0.
+        """
+        self._deadline = None
+        if deadline > 0:
+            self._deadline = time.monotonic() + deadline
+
+    def _open_journal(self, input_directory: str, output_directory: str, img_format: str, recursive: bool, resume: bool) -> Union[str, None]:
+        """_summary_
+        Start the checkpoint journal of a folder conversion.
+
+        Args:
+            input_directory (str): _description_: The directory containing the mdi files to convert.
+            output_directory (str): _description_: The directory where the converted files (and the journal) are stored.
+            img_format (str): _description_: The destination format of the images.
+            recursive (bool): _description_: If the sub-directories are converted.
+            resume (bool): _description_: Continue the run recorded in the journal left by an interrupted run.
+
+        Returns:
+            Union[str, None]: _description_: The file after which the walk resumes, None to walk the whole tree.
+        """
+        self.journal = ConversionJournal(
+            self.const,
+            output_directory,
+            {
+                "input_directory": os.path.abspath(input_directory),
+                "format": img_format,
+                "recursive": recursive,
+                "shard": str(self.shard or "")
+            },
+            self._get_bookkeeping_name(JOURNAL_NAME)
+        )
+        try:
+            resumed = self.journal.open(resume)
+        except OSError as e:
+            self.const.pwarning(f"Failed to create the journal: '{e}'")
+            self.journal = None
+            return None
+        if resume is True and resumed is False:
+            self.const.pwarning("No interrupted run to resume, converting everything.")
+        if resumed is False:
+            return None
+        self.total_files_resumed = sum(self.journal.previous.values())
+        return self.journal.cursor
+
+    def _get_scheduler(self, schedule: str, jobs: int) -> Union[TaskScheduler, None]:
+        """_summary_
+        Get the scheduler ordering the files of a folder conversion.
+
+        Args:
+            schedule (str): _description_: One of CONST.AVAILABLE_SCHEDULES.
+            jobs (int): _description_: The number of files converted at the same time.
+
+        Returns:
+            Union[TaskScheduler, None]: _description_: The scheduler, None when the files are handed out in the order of the walk (the order does not change the length of a sequential run).
+        """
+        if schedule not in CONST.AVAILABLE_SCHEDULES:
+            self.const.pwarning(
+                f"The schedule '{schedule}' is not supported, using '{CONST.DEFAULT_SCHEDULE}'."
+            )
+            schedule = CONST.DEFAULT_SCHEDULE
+        scheduler = TaskScheduler(
+            self.const,
+            schedule,
+            self.decoder,
+            window=jobs * WINDOW_PER_JOB,
+            should_stop=self._should_stop_dispatching
+        )
+        if jobs == 1 or scheduler.is_ordered() is False:
+            return None
+        return scheduler
+
+    def convert_all(self, input_directory: str = "", output_directory: str = "", img_format: str = "", jobs: Union[int, str] = 0, recursive: bool = False, use_manifest: bool = False, deadline: float = 0, resume: bool = False, shard: str = "", claim: bool = False, lease: float = DEFAULT_LEASE, schedule: str = CONST.DEFAULT_SCHEDULE) -> int:
+        """_summary_
+        Convert all mdi files in a directory to tiff files
+
+        Args:
+            input_directory (str, optional): _description_: The directory containing the mdi files to convert. Defaults to "".
+            output_directory (str, optional): _description_: The directory where the tiff files will be created. Defaults to "".
+            jobs (Union[int, str], optional): _description_: The number of files converted at the same time, 0 uses the number of available cpus, CONST.AUTO_JOBS measures the throughput while converting and raises or lowers the number of workers to find its peak. Defaults to 0.
+            recursive (bool, optional): _description_: Also convert the files of the sub-directories, the tree is mirrored in the output directory. Defaults to False.
+            use_manifest (bool, optional): _description_: Keep a manifest of the conversions in the output directory and only convert the files that are new or changed since the last run. Defaults to False.
+            deadline (float, optional): _description_: The number of seconds the batch is allowed to run for, the conversions in flight are stopped and no new one is started once it is over, 0 disables it. Defaults to 0.
+            resume (bool, optional): _description_: Continue the run recorded in the journal left by an interrupted run instead of walking the whole tree. Defaults to False.
+            shard (str, optional): _description_: Only convert the files of one shard, written 'i/N', the files are given to the shards by a stable hash of their relative path and a summary report of the shard is written in the output directory, an empty string converts everything. Defaults to "".
+            claim (bool, optional): _description_: Claim each file with a marker placed next to it before converting it, so that any number of processes (on any number of computers) can convert the same tree without converting a file twice. Defaults to False.
+            lease (float, optional): _description_: The number of seconds after which the claim of a process that stopped renewing it (because it crashed) can be taken over. Defaults to DEFAULT_LEASE.
+            schedule (str, optional): _description_: The order in which the files are converted when several are converted at the same time: 'size' or 'pages' (the most expensive first among the next few files of the walk) or 'directory' (the order of the walk). Defaults to CONST.DEFAULT_SCHEDULE.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
+        directories = self._get_folder_conversion_directories(
+            input_directory,
+            output_directory
+        )
+        if directories is None:
+            return self.error
+        input_directory, output_directory = directories
+        self.shard = None
+        if shard != "":
+            self.shard = parse_shard(shard)
+            if self.shard is None:
+                self.const.perror(
+                    f"The shard '{shard}' is not valid, it must be written 'i/N' with 1 <= i <= N."
+                )
                 return self.error
-        dir_content = os.listdir(input_directory)
-        self._initialise_folder_conversion_stat_session(dir_content)
-        for file in dir_content:
-            if file.endswith(".mdi"):
-                input_file = os.path.join(input_directory, file)
-                output_file = os.path.join(
-                    output_directory, file.replace(".mdi", ".tiff")
+        self.concurrency = None
+        if jobs == CONST.AUTO_JOBS:
+            self.concurrency = ConcurrencyController(self.const)
+            jobs = self.concurrency.max_jobs
+        elif jobs < 1:
+            jobs = self.const.jobs
+        started_at = time.time()
+        self._initialise_folder_conversion_stat_session()
+        self._start_deadline(deadline)
+        resume_after = self._open_journal(
+            input_directory,
+            output_directory,
+            img_format,
+            recursive,
+            resume
+        )
+        tasks = self._iter_folder_conversion_tasks(
+            input_directory,
+            output_directory,
+            recursive,
+            resume_after
+        )
+        if self.shard is not None:
+            tasks = self._filter_shard_tasks(tasks)
+        if self.journal is not None:
+            # The journal sees the files in the order of the walk so that its cursor stays valid whatever the schedule
+            tasks = self._journal_folder_tasks(
+                tasks,
+                input_directory,
+                output_directory
+            )
+        scheduler = self._get_scheduler(schedule, jobs)
+        if scheduler is not None:
+            tasks = scheduler.order(tasks)
+        self.claims = None
+        if claim is True:
+            # Claimed once ordered, so that the files are claimed one at a time as the workers take them
+            self.claims = WorkClaims(self.const, lease)
+            tasks = self._claim_tasks(tasks)
+        if use_manifest is True:
+            self.manifest = ConversionManifest(
+                self.const,
+                output_directory,
+                img_format,
+                {"backend": self.backend},
+                self._get_bookkeeping_name(MANIFEST_NAME)
+            )
+            self.manifest.open()
+            tasks = self._skip_up_to_date_tasks(tasks)
+        previous_handlers = self._install_stop_handlers()
+        completed = False
+        self.wine.start()
+        if self.claims is not None:
+            self.claims.start()
+        try:
+            if jobs == 1:
+                self._convert_folder_sequentially(tasks, img_format)
+            else:
+                self._convert_folder_in_parallel(tasks, img_format, jobs)
+            completed = self.stop_requested is False and self.deadline_reached is False
+        finally:
+            if self.claims is not None:
+                self.claims.stop()
+            self.wine.stop()
+            self._restore_stop_handlers(previous_handlers)
+            self._deadline = None
+            if self.manifest is not None:
+                self.manifest.close()
+                self.manifest = None
+            if self.journal is not None:
+                self.journal.close(completed)
+                self.journal = None
+        self._display_folder_conversion_stat_session()
+        if self.concurrency is not None:
+            self.concurrency.log_summary()
+            self.concurrency = None
+        self._write_shard_report(
+            input_directory,
+            output_directory,
+            img_format,
+            started_at,
+            completed
+        )
+        self.shard = None
+        self.claims = None
+        return self.global_status
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """_summary_
+        Get the semaphore limiting the number of asynchronous conversions running on the current event loop.
+
+        Returns:
+            asyncio.Semaphore: _description_: The semaphore shared by the convert_async calls of this instance.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_semaphore is None or self._async_semaphore_loop is not loop:
+            self._async_semaphore = asyncio.Semaphore(self.const.jobs)
+            self._async_semaphore_loop = loop
+        return self._async_semaphore
+
+    async def _run_conversion_steps_async(self, input_file: str, output_file: Union[str, List[str]], image_format: str, workspace: JobWorkspace, failures: Union[List[str], None] = None) -> int:
+        """_summary_
+        The asynchronous version of _run_conversion_steps.
+        The binary is awaited as a subprocess, the conversion cache and the format change are used from the default executor
+        so that the event loop is never blocked.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+            output_file (Union[str, List[str]]): _description_: The path(s) to the output file.
+            image_format (str): _description_: The destination format of the image.
+            workspace (JobWorkspace): _description_: The temporary workspace of the job (intermediate tiff and log of the binary).
+            failures (Union[List[str], None], optional): _description_: The list receiving the kind of the failures (see retry.py). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the execution.
+        """
+        step1, step2 = self._get_conversion_steps(output_file)
+        loop = asyncio.get_running_loop()
+        exit_code = await loop.run_in_executor(
+            None,
+            self._run_in_process_conversion,
+            input_file,
+            step1,
+            step2,
+            image_format,
+            failures
+        )
+        if exit_code is not None:
+            return exit_code
+        cache_key = None
+        if self.cache is not None:
+            cache_key = await loop.run_in_executor(None, hash_file, input_file)
+        if cache_key is not None:
+            exit_code = await loop.run_in_executor(
+                None,
+                self._run_cached_conversion,
+                cache_key,
+                step1,
+                step2,
+                image_format,
+                failures
+            )
+            if exit_code is not None:
+                return exit_code
+        if self.bin_path is None:
+            self.const.err_binary_path_not_found()
+            record_failure(failures, DETERMINISTIC)
+            return self.error
+        timeout = self._get_launch_timeout()
+        if timeout is not None and timeout <= 0:
+            self.const.perror(f"'{input_file}': the batch deadline has passed.")
+            return self.timed_out
+        step1 = self._get_job_intermediate(step1, step2, workspace)
+        temporary_step1 = get_temporary_sibling(step1)
+        result = await self.exe_backend.run_async(
+            input_file,
+            temporary_step1,
+            workspace.log_file,
+            timeout
+        )
+        exit_code = self._handle_binary_result(
+            result,
+            input_file,
+            workspace,
+            temporary_step1,
+            step1,
+            failures
+        )
+        if exit_code != self.success:
+            return exit_code
+        if cache_key is not None:
+            await loop.run_in_executor(
+                None, self.cache.put_intermediate, cache_key, step1
+            )
+        if step2 is not None:
+            exit_code = await loop.run_in_executor(
+                None,
+                self._run_format_change,
+                step1,
+                step2,
+                image_format,
+                failures
+            )
+            if exit_code == self.success and cache_key is not None:
+                await loop.run_in_executor(
+                    None,
+                    self.cache.put_output,
+                    cache_key,
+                    image_format,
+                    step2
                 )
-                self.const.pinfo(
-                    f"Converting '{input_file}' to '{output_file}'"
+        return exit_code
+
+    async def convert_async(self, input_file: str, output_file: str, img_format: str, semaphore: Union[asyncio.Semaphore, None] = None) -> int:
+        """_summary_
+        Convert an mdi file without blocking the event loop.
+
+        Args:
+            input_file (str): _description_: The mdi file to convert
+            output_file (str): _description_: The file to create
+            img_format (str): _description_: The destination format of the image.
+            semaphore (Union[asyncio.Semaphore, None], optional): _description_: The semaphore limiting the conversions in flight, None uses the one of this instance (sized on the number of available cpus). Defaults to None.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
+        if semaphore is None:
+            semaphore = self._get_async_semaphore()
+        async with semaphore:
+            status = self._get_pre_conversion_status(input_file, output_file)
+            if status is not None:
+                return status
+            checked_output_file = self.cifi._check_output_file(
+                output_file,
+                img_format
+            )
+            attempt = 1
+            with self._create_workspace(input_file) as workspace:
+                while True:
+                    failures: List[str] = []
+                    exit_code = await self._run_conversion_steps_async(
+                        input_file,
+                        checked_output_file,
+                        img_format,
+                        workspace,
+                        failures
+                    )
+                    delay = self._get_retry_delay(
+                        exit_code,
+                        failures,
+                        attempt,
+                        input_file
+                    )
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        return self._log_conversion_result(exit_code, input_file, output_file)
+
+    async def convert_all_async(self, input_directory: str = "", output_directory: str = "", img_format: str = "", jobs: int = 0, recursive: bool = False, deadline: float = 0, schedule: str = CONST.DEFAULT_SCHEDULE) -> int:
+        """_summary_
+        Convert all mdi files in a directory without blocking the event loop.
+
+        Args:
+            input_directory (str, optional): _description_: The directory containing the mdi files to convert. Defaults to "".
+            output_directory (str, optional): _description_: The directory where the tiff files will be created. Defaults to "".
+            img_format (str, optional): _description_: The destination format of the images. Defaults to "".
+            jobs (int, optional): _description_: The number of files converted at the same time, 0 uses the number of available cpus. Defaults to 0.
+            recursive (bool, optional): _description_: Also convert the files of the sub-directories, the tree is mirrored in the output directory. Defaults to False.
+            deadline (float, optional): _description_: The number of seconds the batch is allowed to run for, 0 disables it. Defaults to 0.
+            schedule (str, optional): _description_: The order in which the files are converted, see convert_all. Defaults to CONST.DEFAULT_SCHEDULE.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
+        directories = self._get_folder_conversion_directories(
+            input_directory,
+            output_directory
+        )
+        if directories is None:
+            return self.error
+        input_directory, output_directory = directories
+        if jobs < 1:
+            jobs = self.const.jobs
+        semaphore = asyncio.Semaphore(jobs)
+        self._initialise_folder_conversion_stat_session()
+        self._start_deadline(deadline)
+        tasks = self._iter_folder_conversion_tasks(
+            input_directory,
+            output_directory,
+            recursive
+        )
+        scheduler = self._get_scheduler(schedule, jobs)
+        if scheduler is not None:
+            tasks = scheduler.order(tasks)
+
+        async def _convert_task(task: ConversionTask) -> int:
+            self.const.pinfo(
+                f"Converting '{task.input_file}' to '{task.output_file}'"
+            )
+            return await self.convert_async(
+                task.input_file,
+                task.output_file,
+                img_format,
+                semaphore
+            )
+
+        async def _collect(return_when: str) -> None:
+            done, _ = await asyncio.wait(pending, return_when=return_when)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    status = future.result()
+                except Exception as e:
+                    self.const.perror(
+                        f"Unexpected error while converting '{task.input_file}': '{e}'"
+                    )
+                    status = self.error
+                self._register_folder_item_status(
+                    status,
+                    task.input_file,
+                    task.output_file
                 )
-                status = self.convert(input_file, output_file, img_format)
-                self._update_folder_conversion_stat_session(status)
-                if status == self.success:
-                    msg = f"File '{input_file}' has been converted to "
-                    msg += f"'{output_file}'."
-                    self.const.psuccess(msg)
-                elif status == self.skipped:
-                    msg = f"File '{input_file}' was skipped."
-                    self.const.pinfo(msg)
-                else:
-                    msg = f"File '{input_file}' could not be converted to "
-                    msg += f"'{output_file}'"
-                    self.const.perror(msg)
+
+        max_pending = jobs * 2
+        pending: Dict[asyncio.Future, ConversionTask] = {}
+        self.wine.start()
+        try:
+            for task in tasks:
+                if len(pending) >= max_pending:
+                    await _collect(asyncio.FIRST_COMPLETED)
+                if self._is_past_deadline() is True:
+                    break
+                pending[asyncio.ensure_future(_convert_task(task))] = task
+            if len(pending) > 0:
+                await _collect(asyncio.ALL_COMPLETED)
+        finally:
+            # Only left when the batch itself failed or was cancelled, the conversions are not left running unawaited
+            for future in pending:
+                future.cancel()
+            if len(pending) > 0:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self.wine.stop()
+            self._deadline = None
         self._display_folder_conversion_stat_session()
         return self.global_status
@@ -0,0 +1,258 @@
+"""_summary_
+    This is the file in charge of reading mdi files without the help of the windows binary.
+    An mdi file is a little endian tiff container whose magic number is 'EP*\\0' instead of 'II*\\0'.
+    The page directories are parsed here, and the pages stored with a compression known to Pillow are decoded in memory.
+    Pages compressed with the proprietary Microsoft Office Document Imaging codecs cannot be decoded and are left to the binary.
+"""
+
+import struct
+from io import BytesIO
+from typing import List, Union, BinaryIO
+
+from PIL import Image, ImageSequence
+
+from .constants import Constants, ERROR, SUCCESS
+
+MDI_MAGIC = b"EP*\x00"
+TIFF_MAGIC = b"II*\x00"
+
+# The Microsoft Office Document Imaging codecs (no public specification)
+PROPRIETARY_COMPRESSIONS = (34718, 34719, 34720)
+
+# The tiff compressions Pillow is able to decode
+SUPPORTED_COMPRESSIONS = (1, 2, 3, 4, 5, 6, 7, 8, 32773, 32946)
+
+TAG_IMAGE_WIDTH = 256
+TAG_IMAGE_LENGTH = 257
+TAG_BITS_PER_SAMPLE = 258
+TAG_COMPRESSION = 259
+TAG_SAMPLES_PER_PIXEL = 277
+
+# The size in bytes of each tiff field type
+FIELD_TYPE_SIZES = {
+    1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1,
+    7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4
+}
+
+# Guard against looping directory chains in corrupt files
+MAX_PAGES = 10000
+
+
+class MDIPage:
+    """_summary_
+    The description of a page contained in an mdi file.
+    """
+
+    def __init__(self, index: int, width: int, height: int, compression: int, samples_per_pixel: int = 1, bits_per_sample: int = 1) -> None:
+        """_summary_
+
+        Args:
+            index (int): _description_: The position of the page in the file.
+            width (int): _description_: The width of the page in pixels.
+            height (int): _description_: The height of the page in pixels.
+            compression (int): _description_: The tiff compression identifier of the page.
+            samples_per_pixel (int, optional): _description_: The number of channels. Defaults to 1.
+            bits_per_sample (int, optional): _description_: The depth of each channel. Defaults to 1.
+        """
+        self.index = index
+        self.width = width
+        self.height = height
+        self.compression = compression
+        self.samples_per_pixel = samples_per_pixel
+        self.bits_per_sample = bits_per_sample
+
+    def get_raster_size(self) -> int:
+        """_summary_
+        Get the size of the uncompressed page.
+
+        Returns:
+            int: _description_: The number of bytes required to hold the decoded page.
+        """
+        bits = self.width * self.height
+        bits *= self.samples_per_pixel * self.bits_per_sample
+        return (bits + 7) // 8
+
+    def is_supported(self) -> bool:
+        """_summary_
+        Check if the page can be decoded without the binary.
+
+        Returns:
+            bool: _description_: True if the compression of the page is known to Pillow.
+        """
+        return self.compression in SUPPORTED_COMPRESSIONS
+
+
+class MDIDecoder:
+    """_summary_
+    The class in charge of reading the structure of mdi files and decoding their pages in memory.
+    """
+
+    def __init__(self, constants: Constants, success: int = SUCCESS, error: int = ERROR) -> None:
+        self.success = success
+        self.error = error
+        self.const: Constants = constants
+
+    def _read_field(self, file: BinaryIO, field_type: int, count: int, value: bytes) -> Union[int, None]:
+        """_summary_
+        Read the first value of a directory entry.
+
+        Args:
+            file (BinaryIO): _description_: The opened mdi file.
+            field_type (int): _description_: The tiff type of the entry.
+            count (int): _description_: The number of values of the entry.
+            value (bytes): _description_: The 4 bytes holding the value or the offset of the value.
+
+        Returns:
+            Union[int, None]: _description_: The first value of the entry, None if the type is not an integer.
+        """
+        formats = {1: "<B", 3: "<H", 4: "<I", 13: "<I"}
+        if field_type not in formats or count < 1:
+            return None
+        size = FIELD_TYPE_SIZES[field_type] * count
+        if size > 4:
+            offset = struct.unpack("<I", value)[0]
+            file.seek(offset)
+            value = file.read(FIELD_TYPE_SIZES[field_type])
+        return struct.unpack_from(formats[field_type], value)[0]
+
+    def _read_directory(self, file: BinaryIO, offset: int, index: int) -> Union[tuple, None]:
+        """_summary_
+        Read a page directory.
+
+        Args:
+            file (BinaryIO): _description_: The opened mdi file.
+            offset (int): _description_: The position of the directory in the file.
+            index (int): _description_: The position of the page in the file.
+
+        Returns:
+            Union[tuple, None]: _description_: The (page, next directory offset) pair, None if the directory is corrupt.
+        """
+        file.seek(offset)
+        raw_count = file.read(2)
+        if len(raw_count) != 2:
+            return None
+        entry_count = struct.unpack("<H", raw_count)[0]
+        raw_entries = file.read(entry_count * 12)
+        raw_next = file.read(4)
+        if len(raw_entries) != entry_count * 12 or len(raw_next) != 4:
+            return None
+        tags = {}
+        for i in range(entry_count):
+            tag, field_type, count, value = struct.unpack_from(
+                "<HHI4s", raw_entries, i * 12
+            )
+            if tag in (
+                TAG_IMAGE_WIDTH, TAG_IMAGE_LENGTH, TAG_BITS_PER_SAMPLE,
+                TAG_COMPRESSION, TAG_SAMPLES_PER_PIXEL
+            ):
+                tags[tag] = self._read_field(file, field_type, count, value)
+        if tags.get(TAG_IMAGE_WIDTH) is None or tags.get(TAG_IMAGE_LENGTH) is None:
+            return None
+        page = MDIPage(
+            index=index,
+            width=tags[TAG_IMAGE_WIDTH],
+            height=tags[TAG_IMAGE_LENGTH],
+            compression=tags.get(TAG_COMPRESSION) or 1,
+            samples_per_pixel=tags.get(TAG_SAMPLES_PER_PIXEL) or 1,
+            bits_per_sample=tags.get(TAG_BITS_PER_SAMPLE) or 1
+        )
+        return page, struct.unpack("<I", raw_next)[0]
+
+    def is_mdi_file(self, path: str) -> bool:
+        """_summary_
+        Check if a file starts with the mdi magic number.
+
+        Args:
+            path (str): _description_: The path to the file.
+
+        Returns:
+            bool: _description_: True if the file is an mdi file.
+        """
+        try:
+            with open(path, "rb") as file:
+                return file.read(4) == MDI_MAGIC
+        except OSError:
+            return False
+
+    def read_pages(self, path: str) -> Union[List[MDIPage], None]:
+        """_summary_
+        Read the description of the pages of an mdi file.
+        Only the page directories are read, the image data is left untouched.
+
+        Args:
+            path (str): _description_: The path to the mdi file.
+
+        Returns:
+            Union[List[MDIPage], None]: _description_: The pages of the file, None if the file is not a valid mdi file.
+        """
+        pages = []
+        try:
+            with open(path, "rb") as file:
+                header = file.read(8)
+                if len(header) != 8 or header[:4] != MDI_MAGIC:
+                    self.const.pdebug(f"'{path}' is not an mdi file.")
+                    return None
+                offset = struct.unpack_from("<I", header, 4)[0]
+                visited = set()
+                while offset != 0 and offset not in visited and len(pages) < MAX_PAGES:
+                    visited.add(offset)
+                    directory = self._read_directory(file, offset, len(pages))
+                    if directory is None:
+                        self.const.pdebug(f"'{path}' has a corrupt directory.")
+                        return None
+                    page, offset = directory
+                    pages.append(page)
+        except OSError as e:
+            self.const.perror(f"Failed to read '{path}': '{e}'")
+            return None
+        if len(pages) == 0:
+            return None
+        return pages
+
+    def can_decode(self, pages: Union[List[MDIPage], None]) -> bool:
+        """_summary_
+        Check if every page of a file can be decoded without the binary.
+
+        Args:
+            pages (Union[List[MDIPage], None]): _description_: The pages returned by read_pages.
+
+        Returns:
+            bool: _description_: True if all the pages can be decoded.
+        """
+        if not pages:
+            return False
+        for page in pages:
+            if page.is_supported() is False:
+                return False
+        return True
+
+    def decode(self, path: str) -> Union[List[Image.Image], None]:
+        """_summary_
+        Decode all the pages of an mdi file in memory.
+
+        Args:
+            path (str): _description_: The path to the mdi file.
+
+        Returns:
+            Union[List[Image.Image], None]: _description_: One image per page, None if the file cannot be decoded without the binary.
+        """
+        pages = self.read_pages(path)
+        if self.can_decode(pages) is False:
+            if pages:
+                compressions = sorted({page.compression for page in pages})
+                msg = f"'{path}' uses a compression that cannot be decoded "
+                msg += f"natively: {compressions}"
+                self.const.pdebug(msg)
+            return None
+        try:
+            with open(path, "rb") as file:
+                content = bytearray(file.read())
+            content[:4] = TIFF_MAGIC
+            images = []
+            with Image.open(BytesIO(content)) as container:
+                for frame in ImageSequence.Iterator(container):
+                    images.append(frame.copy())
+            return images
+        except Exception as e:
+            self.const.perror(f"Failed to decode '{path}': '{e}'")
+            return None
@@ -0,0 +1,170 @@
+"""_summary_
+    This is the file in charge of deciding if a failed conversion is worth running again.
+    Failures are sorted into transient ones (a locked file, a full disk, a binary that could not be started) that are retried
+    with an exponential backoff, and deterministic ones (an invalid mdi file, an unsupported format) that would fail the same way again.
+"""
+
+import errno
+import random
+import threading
+from typing import List, Union
+
+from .launcher import LaunchResult
+
+TRANSIENT = "transient"
+DETERMINISTIC = "deterministic"
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_MULTIPLIER = 2.0
+# Fraction of the delay that is randomised so workers that failed together do not retry together
+DEFAULT_JITTER = 0.1
+
+TRANSIENT_ERRNOS = {
+    getattr(errno, name)
+    for name in (
+        "ENOSPC", "EDQUOT", "EBUSY", "EAGAIN", "ETXTBSY",
+        "EMFILE", "ENFILE", "ENOMEM", "EINTR", "ETIMEDOUT"
+    )
+    if hasattr(errno, name)
+}
+# ERROR_SHARING_VIOLATION, ERROR_LOCK_VIOLATION, ERROR_HANDLE_DISK_FULL, ERROR_DISK_FULL
+TRANSIENT_WINERRORS = {32, 33, 39, 112}
+TRANSIENT_MESSAGES = (
+    "being used by another process",
+    "sharing violation",
+    "lock violation",
+    # Not a bare 'locked', which also matches 'blocked' or 'unlocked'
+    "is locked",
+    "file locked",
+    "no space",
+    "disk full",
+    "not enough space",
+    "not enough memory",
+    "out of memory",
+    "resource temporarily unavailable"
+)
+
+
+def classify_exception(exception: BaseException) -> str:
+    """_summary_
+    Sort an exception raised during a conversion.
+
+    Args:
+        exception (BaseException): _description_: The exception that was raised.
+
+    Returns:
+        str: _description_: TRANSIENT or DETERMINISTIC.
+    """
+    if isinstance(exception, MemoryError) is True:
+        return TRANSIENT
+    if isinstance(exception, OSError) is True:
+        if getattr(exception, "winerror", None) in TRANSIENT_WINERRORS:
+            return TRANSIENT
+        if exception.errno in TRANSIENT_ERRNOS:
+            return TRANSIENT
+    return DETERMINISTIC
+
+
+def classify_launch_result(result: LaunchResult) -> str:
+    """_summary_
+    Sort a failed call to the conversion binary.
+    The binary does not document its exit codes, so its outputs are searched for the usual messages of a locked file or a full disk.
+
+    Args:
+        result (LaunchResult): _description_: The result of the call.
+
+    Returns:
+        str: _description_: TRANSIENT or DETERMINISTIC.
+    """
+    if result.spawned is False:
+        return TRANSIENT
+    if result.timed_out is True:
+        return DETERMINISTIC
+    output = f"{result.stdout}\n{result.stderr}".lower()
+    for message in TRANSIENT_MESSAGES:
+        if message in output:
+            return TRANSIENT
+    return DETERMINISTIC
+
+
+class RetryPolicy:
+    """_summary_
+    The class in charge of the number of attempts of a conversion and of the time waited between them.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY, multiplier: float = DEFAULT_MULTIPLIER, jitter: float = DEFAULT_JITTER) -> None:
+        """_summary_
+
+        Args:
+            max_attempts (int, optional): _description_: The maximum number of times a file is converted (1 disables the retries). Defaults to DEFAULT_MAX_ATTEMPTS.
+            base_delay (float, optional): _description_: The time (in seconds) waited before the first retry. Defaults to DEFAULT_BASE_DELAY.
+            max_delay (float, optional): _description_: The longest time (in seconds) waited between two attempts. Defaults to DEFAULT_MAX_DELAY.
+            multiplier (float, optional): _description_: The factor applied to the delay after each attempt. Defaults to DEFAULT_MULTIPLIER.
+            jitter (float, optional): _description_: The fraction of the delay that is randomised. Defaults to DEFAULT_JITTER.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.multiplier = max(1.0, multiplier)
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self._lock = threading.Lock()
+        self.total_retries = 0
+
+    def get_delay(self, attempt: int) -> float:
+        """_summary_
+        Get the time to wait after a failed attempt.
+
+        Args:
+            attempt (int): _description_: The number of the attempt that failed (starting at 1).
+
+        Returns:
+            float: _description_: The number of seconds to wait.
+        """
+        delay = self.base_delay * (self.multiplier ** (attempt - 1))
+        delay = min(delay, self.max_delay)
+        if self.jitter > 0:
+            delay -= delay * self.jitter * random.random()
+        return delay
+
+    def should_retry(self, failures: List[str], attempt: int) -> bool:
+        """_summary_
+        Check if a failed conversion has to be attempted again.
+
+        Args:
+            failures (List[str]): _description_: The kinds of the failures met during the attempt.
+            attempt (int): _description_: The number of the attempt that failed (starting at 1).
+
+        Returns:
+            bool: _description_: True if the failure is transient and attempts are left.
+        """
+        if attempt >= self.max_attempts or len(failures) == 0:
+            return False
+        return failures[-1] == TRANSIENT
+
+    def register_retry(self) -> None:
+        """_summary_
+        Count a retry in the totals.
+        """
+        with self._lock:
+            self.total_retries += 1
+
+    def reset(self) -> None:
+        """_summary_
+        Reset the number of retries.
+        """
+        with self._lock:
+            self.total_retries = 0
+
+
+def record_failure(failures: Union[List[str], None], kind: str) -> None:
+    """_summary_
+    Add the kind of a failure to the list of an attempt (when the caller keeps one).
+
+    Args:
+        failures (Union[List[str], None]): _description_: The failures of the attempt, None if they are not tracked.
+        kind (str): _description_: TRANSIENT or DETERMINISTIC.
+    """
+    if failures is not None:
+        failures.append(kind)
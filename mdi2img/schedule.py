@@ -0,0 +1,113 @@
+"""_summary_
+    This is the file in charge of the order in which the files of a folder conversion are handed to the workers.
+    With several workers the batch lasts until its longest file is done, so starting the most expensive files first
+    keeps a large file from starting last while the other workers sit idle (longest processing time first).
+    The files are only ordered within a window of the walk (a few files per worker): the conversion starts as soon as the window
+    is full, the memory used does not grow with the tree and an interruption does not wait for the whole tree to be listed.
+    The directory order keeps the files of a folder together.
+"""
+
+import heapq
+from typing import Callable, Iterable, Iterator, List, Union
+
+from .constants import Constants
+from .conversion_task import ConversionTask
+from .mdi_decoder import MDIDecoder
+
+SCHEDULE_SIZE = "size"
+SCHEDULE_PAGES = "pages"
+SCHEDULE_DIRECTORY = "directory"
+# The number of files looked ahead per worker, the most expensive file of the window is handed out first
+WINDOW_PER_JOB = 8
+DEFAULT_WINDOW = 64
+
+
+class TaskScheduler:
+    """_summary_
+    The class in charge of ordering the files of a folder conversion by their estimated cost.
+    """
+
+    def __init__(self, constants: Constants, policy: str = SCHEDULE_SIZE, decoder: Union[MDIDecoder, None] = None, window: int = DEFAULT_WINDOW, should_stop: Union[Callable[[], bool], None] = None) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            policy (str, optional): _description_: One of CONST.AVAILABLE_SCHEDULES. Defaults to SCHEDULE_SIZE.
+            decoder (Union[MDIDecoder, None], optional): _description_: The decoder used to read the page headers for the pages policy, None creates one. Defaults to None.
+            window (int, optional): _description_: The number of files of the walk among which the most expensive one is handed out. Defaults to DEFAULT_WINDOW.
+            should_stop (Union[Callable[[], bool], None], optional): _description_: Called before reading each file of the walk, the files stop being handed out once it returns True. Defaults to None.
+        """
+        self.const: Constants = constants
+        self.policy = policy
+        self.window = max(1, window)
+        self.should_stop = should_stop
+        self.decoder = decoder
+        if self.decoder is None and self.policy == SCHEDULE_PAGES:
+            self.decoder = MDIDecoder(self.const)
+
+    def is_ordered(self) -> bool:
+        """_summary_
+        Check if the files are reordered.
+
+        Returns:
+            bool: _description_: False if the files are handed out in the order of the walk.
+        """
+        return self.policy in (SCHEDULE_SIZE, SCHEDULE_PAGES)
+
+    def get_cost(self, task: ConversionTask) -> int:
+        """_summary_
+        Estimate the cost of converting a file.
+
+        Args:
+            task (ConversionTask): _description_: The file to convert.
+
+        Returns:
+            int: _description_: The size of the decoded pages for the pages policy when they can be read, the size of the file otherwise (0 if it cannot be reached).
+        """
+        if self.policy == SCHEDULE_PAGES:
+            pages = self.decoder.read_pages(task.input_file)
+            if pages:
+                return sum(page.get_raster_size() for page in pages)
+        stat = task.get_stat()
+        if stat is None:
+            return 0
+        return stat.st_size
+
+    def _is_stopped(self) -> bool:
+        """_summary_
+        Check if the files have to stop being handed out.
+
+        Returns:
+            bool: _description_: True if should_stop asks for it.
+        """
+        return self.should_stop is not None and self.should_stop() is True
+
+    def order(self, tasks: Iterable[ConversionTask]) -> Iterator[ConversionTask]:
+        """_summary_
+        Hand out the files, the most expensive of the window first.
+        Files of the same cost keep the order of the walk.
+
+        Args:
+            tasks (Iterable[ConversionTask]): _description_: The files to convert.
+
+        Yields:
+            Iterator[ConversionTask]: _description_: The files in the order they should be converted.
+        """
+        if self.is_ordered() is False:
+            yield from tasks
+            return
+        self.const.pdebug(
+            f"Scheduling the files by {self.policy}, largest first within {self.window} files."
+        )
+        # The position in the walk breaks the ties and keeps the tasks from being compared
+        window: List[tuple] = []
+        for position, task in enumerate(tasks):
+            if self._is_stopped() is True:
+                return
+            heapq.heappush(window, (-self.get_cost(task), position, task))
+            if len(window) >= self.window:
+                yield heapq.heappop(window)[2]
+        while len(window) > 0:
+            if self._is_stopped() is True:
+                return
+            yield heapq.heappop(window)[2]
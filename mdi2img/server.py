@@ -0,0 +1,449 @@
+"""_summary_
+    This is the file in charge of the local http conversion service.
+    The converter is initialised once and reused by every request, which avoids paying the start-up of the program for each file.
+
+    Endpoints:
+        * POST /convert?format=<format>             the body of the request is the mdi file
+        * POST /convert?format=<format>&path=<path> the mdi file is read from the server (only below the allowed root)
+        * GET  /health                              the state of the service
+        * GET  /metrics                             the counters of the service
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Tuple, Union
+
+from PIL import Image
+
+from .mdi2tiff import MDIToTiff
+from .change_image_format import AVAILABLE_FORMATS
+from .constants import SUCCESS, ERROR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+DEFAULT_MAX_UPLOAD_SIZE = 512 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+
+def get_mime_type(img_format: str) -> str:
+    """_summary_
+    Get the mime type of an output format.
+    The format is first resolved to its Pillow format through the registered extensions ('tif', 'jfif' or 'apng' are not Pillow formats themselves).
+
+    Args:
+        img_format (str): _description_: The destination format (the extension of the output).
+
+    Returns:
+        str: _description_: The mime type, DEFAULT_MIME_TYPE if it is not known.
+    """
+    Image.init()
+    pillow_format = Image.registered_extensions().get(
+        f".{img_format.lower()}",
+        img_format.upper()
+    )
+    return Image.MIME.get(pillow_format, DEFAULT_MIME_TYPE)
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """_summary_
+    The class in charge of answering a single http request, the service is the conversion_server of the http server.
+    """
+
+    server_version = "mdi2img"
+
+    @property
+    def service(self) -> "ConversionServer":
+        """_summary_
+        Get the conversion service answering the request.
+
+        Returns:
+            ConversionServer: _description_: The service.
+        """
+        return self.server.conversion_server
+
+    def log_message(self, format: str, *args) -> None:
+        self.service.const.pdebug(f"(serve) {self.address_string()} {format % args}")
+
+    def _send_json(self, code: int, content: dict) -> None:
+        """_summary_
+        Answer with a json document.
+
+        Args:
+            code (int): _description_: The http status.
+            content (dict): _description_: The document.
+        """
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, code: int, message: str) -> None:
+        """_summary_
+        Answer with an error and count the request as invalid.
+
+        Args:
+            code (int): _description_: The http status.
+            message (str): _description_: The explanation sent to the client.
+        """
+        self.service._increment("requests_invalid")
+        self._send_json(code, {"status": "error", "message": message})
+
+    def _send_unavailable(self) -> None:
+        """_summary_
+        Answer that every conversion slot is taken.
+        """
+        self.send_response(503)
+        self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_file(self, path: str, img_format: str) -> None:
+        """_summary_
+        Stream a converted file to the client.
+
+        Args:
+            path (str): _description_: The converted file.
+            img_format (str): _description_: The format of the file.
+        """
+        mime = get_mime_type(img_format)
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as file:
+            shutil.copyfileobj(file, self.wfile, STREAM_CHUNK_SIZE)
+
+    def do_GET(self) -> None:
+        self.service._increment("requests_total")
+        route = urlparse(self.path).path
+        if route == "/health":
+            self._handle_health()
+        elif route == "/metrics":
+            self._handle_metrics()
+        else:
+            self._send_error_json(404, f"Unknown route '{route}'.")
+
+    def do_POST(self) -> None:
+        self.service._increment("requests_total")
+        url = urlparse(self.path)
+        if url.path == "/convert":
+            self._handle_convert(parse_qs(url.query))
+        else:
+            self._send_error_json(404, f"Unknown route '{url.path}'.")
+
+    def _handle_health(self) -> None:
+        """_summary_
+        Answer GET /health.
+        """
+        self._send_json(200, self.service.get_health())
+
+    def _handle_metrics(self) -> None:
+        """_summary_
+        Answer GET /metrics.
+        """
+        self._send_json(200, self.service.get_metrics())
+
+    def _parse_convert_request(self, query: dict) -> Union[Tuple[str, Union[str, None], int], None]:
+        """_summary_
+        Check the parameters of a conversion request, the client is answered when they are not valid.
+
+        Args:
+            query (dict): _description_: The parsed query string.
+
+        Returns:
+            Union[Tuple[str, Union[str, None], int], None]: _description_: The format, the server-side file (None for an upload)
+            and the length of the upload, None if the request was rejected.
+        """
+        img_format = query.get("format", ["tiff"])[0].lower()
+        if img_format not in AVAILABLE_FORMATS:
+            self._send_error_json(400, f"The format '{img_format}' is not supported.")
+            return None
+        if "path" in query:
+            input_file = self.service.resolve_server_path(query["path"][0])
+            if input_file is None:
+                self._send_error_json(403, "The requested path is not allowed.")
+                return None
+            return img_format, input_file, 0
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self._send_error_json(411, "The request has no content.")
+            return None
+        if length > self.service.max_upload_size:
+            self._send_error_json(413, "The upload is too large.")
+            return None
+        return img_format, None, length
+
+    def _read_upload(self, input_file: str, length: int) -> int:
+        """_summary_
+        Write the body of the request to a file.
+
+        Args:
+            input_file (str): _description_: The file to create.
+            length (int): _description_: The announced length of the body.
+
+        Returns:
+            int: _description_: The number of bytes that were announced but never received (0 for a complete upload).
+        """
+        remaining = length
+        with open(input_file, "wb") as file:
+            while remaining > 0:
+                chunk = self.rfile.read(min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                file.write(chunk)
+                remaining -= len(chunk)
+        return remaining
+
+    def _handle_convert(self, query: dict) -> None:
+        """_summary_
+        Answer POST /convert.
+
+        Args:
+            query (dict): _description_: The parsed query string.
+        """
+        request = self._parse_convert_request(query)
+        if request is None:
+            return
+        img_format, input_file, length = request
+        if self.service.acquire_slot() is False:
+            self._send_unavailable()
+            return
+        workspace = tempfile.mkdtemp(
+            prefix="serve_",
+            dir=self.service.const.temporary_img_folder
+        )
+        try:
+            remaining = 0
+            output_file = None
+            try:
+                if input_file is None:
+                    input_file = os.path.join(workspace, "input.mdi")
+                    remaining = self._read_upload(input_file, length)
+                if remaining == 0:
+                    output_file = self.service.convert(input_file, workspace, img_format)
+            finally:
+                self.service.release_slot()
+            if remaining > 0:
+                # The client went away before sending the whole document
+                self._send_error_json(400, f"The upload is incomplete ({remaining} bytes missing).")
+                return
+            if output_file is None:
+                self._send_json(422, {"status": "error", "message": "The conversion failed."})
+                return
+            self._send_file(output_file, img_format)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+class ConversionServer:
+    """_summary_
+    The class in charge of running the http conversion service.
+    """
+
+    def __init__(self, converter: MDIToTiff, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_requests: int = 0, allowed_root: str = "", max_upload_size: int = DEFAULT_MAX_UPLOAD_SIZE, success: int = SUCCESS, error: int = ERROR) -> None:
+        """_summary_
+
+        Args:
+            converter (MDIToTiff): _description_: The converter shared by all the requests.
+            host (str, optional): _description_: The address to listen on. Defaults to DEFAULT_HOST.
+            port (int, optional): _description_: The port to listen on. Defaults to DEFAULT_PORT.
+            max_requests (int, optional): _description_: The number of conversions allowed to run at the same time, the other requests are rejected (503), 0 uses the number of available cpus. Defaults to 0.
+            allowed_root (str, optional): _description_: The folder below which server-side paths can be converted, an empty string disables server-side paths. Defaults to "".
+            max_upload_size (int, optional): _description_: The largest upload accepted (in bytes). Defaults to DEFAULT_MAX_UPLOAD_SIZE.
+            success (int, optional): _description_: The status of a success. Defaults to SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to ERROR.
+        """
+        self.success = success
+        self.error = error
+        self.converter = converter
+        self.const = converter.const
+        self.host = host
+        self.port = port
+        if max_requests < 1:
+            max_requests = self.const.jobs
+        self.max_requests = max_requests
+        self.allowed_root = ""
+        if allowed_root != "":
+            self.allowed_root = os.path.realpath(allowed_root)
+        self.max_upload_size = max_upload_size
+        self._slots = threading.BoundedSemaphore(self.max_requests)
+        self._metrics_lock = threading.Lock()
+        self.start_time = time.time()
+        self.metrics = {
+            "requests_total": 0,
+            "requests_rejected": 0,
+            "requests_invalid": 0,
+            "conversions_success": 0,
+            "conversions_error": 0,
+            "conversions_in_flight": 0,
+            "conversion_time_total": 0.0
+        }
+        self.httpd: Union[ThreadingHTTPServer, None] = None
+
+    def _increment(self, key: str, value: Union[int, float] = 1) -> None:
+        """_summary_
+        Update a counter of the service.
+
+        Args:
+            key (str): _description_: The name of the counter.
+            value (Union[int, float], optional): _description_: The value to add. Defaults to 1.
+        """
+        with self._metrics_lock:
+            self.metrics[key] += value
+
+    def get_health(self) -> dict:
+        """_summary_
+        Get the state of the service.
+
+        Returns:
+            dict: _description_: The state of the service.
+        """
+        return {
+            "status": "ok",
+            "backend": self.converter.backend,
+            "binary_found": self.converter.bin_path is not None,
+            "uptime": round(time.time() - self.start_time, 3)
+        }
+
+    def get_metrics(self) -> dict:
+        """_summary_
+        Get the counters of the service.
+
+        Returns:
+            dict: _description_: The counters of the service.
+        """
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        metrics["max_requests"] = self.max_requests
+        metrics["binary_launches"] = self.converter.launcher.total_launches
+        metrics["binary_spawn_time_total"] = self.converter.launcher.total_spawn_time
+        metrics["binary_run_time_total"] = self.converter.launcher.total_run_time
+        if self.converter.cache is not None:
+            metrics["cache_hits"] = self.converter.cache.hits
+            metrics["cache_misses"] = self.converter.cache.misses
+            metrics["cache_evictions"] = self.converter.cache.evictions
+        return metrics
+
+    def resolve_server_path(self, path: str) -> Union[str, None]:
+        """_summary_
+        Check that a server-side path is allowed to be converted.
+
+        Args:
+            path (str): _description_: The path requested by the client.
+
+        Returns:
+            Union[str, None]: _description_: The resolved path, None if it is not allowed.
+        """
+        if self.allowed_root == "":
+            return None
+        resolved = os.path.realpath(os.path.join(self.allowed_root, path))
+        if os.path.commonpath([resolved, self.allowed_root]) != self.allowed_root:
+            return None
+        if os.path.isfile(resolved) is False:
+            return None
+        return resolved
+
+    def acquire_slot(self) -> bool:
+        """_summary_
+        Reserve a conversion slot.
+
+        Returns:
+            bool: _description_: False if the maximum number of conversions in flight is reached.
+        """
+        if self._slots.acquire(blocking=False) is False:
+            self._increment("requests_rejected")
+            return False
+        self._increment("conversions_in_flight")
+        return True
+
+    def release_slot(self) -> None:
+        """_summary_
+        Release a conversion slot.
+        """
+        self._increment("conversions_in_flight", -1)
+        self._slots.release()
+
+    def convert(self, input_file: str, workspace: str, img_format: str) -> Union[str, None]:
+        """_summary_
+        Convert a file into the workspace of a request.
+
+        Args:
+            input_file (str): _description_: The mdi file to convert.
+            workspace (str): _description_: The temporary folder of the request.
+            img_format (str): _description_: The destination format.
+
+        Returns:
+            Union[str, None]: _description_: The path to the converted file, None if the conversion failed.
+        """
+        # Named after the workspace so that the intermediate tiff of each request has a name of its own
+        output_file = os.path.join(
+            workspace,
+            f"{os.path.basename(workspace)}.{img_format}"
+        )
+        start = time.perf_counter()
+        status = self.converter.convert(input_file, output_file, img_format)
+        self._increment("conversion_time_total", time.perf_counter() - start)
+        if status != self.success or os.path.isfile(output_file) is False:
+            self._increment("conversions_error")
+            return None
+        self._increment("conversions_success")
+        return output_file
+
+    def start(self) -> None:
+        """_summary_
+        Bind the http server (without serving requests yet).
+        """
+        self.httpd = ThreadingHTTPServer(
+            (self.host, self.port),
+            ConversionRequestHandler
+        )
+        # The handlers reach the service through the http server they are created by
+        self.httpd.conversion_server = self
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+
+    def stop(self) -> None:
+        """_summary_
+        Stop serving requests and release the socket.
+        """
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def serve_forever(self) -> int:
+        """_summary_
+        Serve requests until the program is interrupted.
+
+        Returns:
+            int: _description_: The status of the service once stopped.
+        """
+        try:
+            self.start()
+        except OSError as e:
+            self.const.pcritical(f"Failed to listen on {self.host}:{self.port}: '{e}'")
+            return self.error
+        msg = f"Listening on http://{self.host}:{self.port} "
+        msg += f"(max {self.max_requests} conversions at once)."
+        self.const.pinfo(msg)
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            self.const.pinfo("Stopping the conversion service.")
+        finally:
+            if self.httpd is not None:
+                self.httpd.server_close()
+                self.httpd = None
+        return self.success
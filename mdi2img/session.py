@@ -0,0 +1,205 @@
+"""_summary_
+    This is the file in charge of the reusable conversion session for library users.
+    The configuration, the binary lookup, the image plugins and the pool of workers are set up once when the session is opened
+    and shared by every conversion until it is closed, no window or display is needed.
+
+    Usage:
+        with ConverterSession(jobs=4) as session:
+            session.convert("file.mdi", "file.png", "png")
+            for input_file, output_file, status in session.convert_many(pairs, "png"):
+                ...
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Union, Iterable, Iterator, Tuple, Deque
+
+from PIL import Image
+
+from . import constants as CONST
+from .mdi2tiff import MDIToTiff
+from .backends import ConversionBackend
+from .retry import RetryPolicy
+
+
+class ConverterSession:
+    """_summary_
+    The class in charge of keeping the resources of the conversions warm between calls.
+    """
+
+    def __init__(self, binary_name: Union[str, CONST.Constants] = "MDI2TIF.EXE", jobs: int = 0, backend: Union[str, ConversionBackend] = CONST.DEFAULT_BACKEND, in_memory: bool = False, cache_size: int = 0, cache_outputs: bool = False, timeout: float = 0, retry_policy: Union[RetryPolicy, None] = None, ram_temp: str = "", launcher: str = "", wineserver: str = "", success: int = CONST.SUCCESS, error: int = CONST.ERROR) -> None:
+        """_summary_
+
+        Args:
+            binary_name (Union[str, CONST.Constants], optional): _description_: The name of the binary to look for, or constants that are already initialised. Defaults to "MDI2TIF.EXE".
+            jobs (int, optional): _description_: The number of conversions run at the same time by convert_many, 0 uses the number of available cpus. Defaults to 0.
+            backend (Union[str, ConversionBackend], optional): _description_: The conversion engine (see CONST.AVAILABLE_BACKENDS) or a backend instance. Defaults to CONST.DEFAULT_BACKEND.
+            in_memory (bool, optional): _description_: Write the intermediate tiff to the RAM-backed folder and load it in memory before changing its format. Defaults to False.
+            cache_size (int, optional): _description_: The maximum size (in bytes) of the conversion cache, 0 disables the cache. Defaults to 0.
+            cache_outputs (bool, optional): _description_: Also keep the final outputs in the conversion cache. Defaults to False.
+            timeout (float, optional): _description_: The number of seconds the binary is allowed to run for on a single file, 0 disables the limit. Defaults to 0.
+            retry_policy (Union[RetryPolicy, None], optional): _description_: The retries applied to transient failures, None uses the default policy. Defaults to None.
+            ram_temp (str, optional): _description_: The RAM-backed folder used for the intermediate files when it has room for them, an empty string keeps them on disk. Defaults to "".
+            launcher (str, optional): _description_: The command placed before the binary (for instance 'wine'). Defaults to "".
+            wineserver (str, optional): _description_: The wineserver kept alive while the session is open, an empty string looks for it next to a Wine launcher. Defaults to "".
+            success (int, optional): _description_: The status of a success. Defaults to CONST.SUCCESS.
+            error (int, optional): _description_: The status of an error. Defaults to CONST.ERROR.
+        """
+        self.success = success
+        self.error = error
+        self.binary_name = binary_name
+        self.jobs = jobs
+        self.backend = backend
+        self.in_memory = in_memory
+        self.cache_size = cache_size
+        self.cache_outputs = cache_outputs
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.ram_temp = ram_temp
+        self.launcher = launcher
+        self.wineserver = wineserver
+        self.converter: Union[MDIToTiff, None] = None
+        self.executor: Union[ThreadPoolExecutor, None] = None
+
+    def __enter__(self) -> "ConverterSession":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def is_open(self) -> bool:
+        """_summary_
+        Check if the resources of the session are ready.
+
+        Returns:
+            bool: _description_: True if the session can convert files.
+        """
+        return self.converter is not None
+
+    def open(self) -> None:
+        """_summary_
+        Initialise the resources shared by the conversions, opening a session that is already open does nothing.
+        """
+        if self.is_open is True:
+            return
+        Image.init()
+        self.converter = MDIToTiff(
+            self.binary_name,
+            success=self.success,
+            error=self.error,
+            backend=self.backend,
+            in_memory=self.in_memory,
+            cache_size=self.cache_size,
+            cache_outputs=self.cache_outputs,
+            timeout=self.timeout,
+            retry_policy=self.retry_policy,
+            ram_temp=self.ram_temp,
+            launcher=self.launcher,
+            wineserver=self.wineserver
+        )
+        self.converter.const._create_temp_if_not_present()
+        self.converter.wine.start()
+        if self.jobs < 1:
+            self.jobs = self.converter.const.jobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.jobs,
+            thread_name_prefix="mdi2img"
+        )
+        self.converter.const.pdebug(
+            f"Conversion session opened with {self.jobs} workers."
+        )
+
+    def close(self) -> None:
+        """_summary_
+        Wait for the conversions in flight and release the resources of the session.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.converter is not None:
+            self.converter.wine.stop()
+            self.converter.const.pdebug("Conversion session closed.")
+            self.converter = None
+
+    def _get_converter(self) -> MDIToTiff:
+        """_summary_
+        Get the converter of the session, opening the session if needed.
+
+        Returns:
+            MDIToTiff: _description_: The converter shared by the conversions.
+        """
+        if self.is_open is False:
+            self.open()
+        return self.converter
+
+    def convert(self, input_file: str, output_file: str, img_format: str = "tiff", overwrite: bool = False) -> int:
+        """_summary_
+        Convert a single file.
+
+        Args:
+            input_file (str): _description_: The mdi file to convert.
+            output_file (str): _description_: The file to create.
+            img_format (str, optional): _description_: The destination format. Defaults to "tiff".
+            overwrite (bool, optional): _description_: Convert the file even if the output already exists. Defaults to False.
+
+        Returns:
+            int: _description_: The status of the convertion (success:int  or error:int)
+        """
+        return self._get_converter().convert(
+            input_file,
+            output_file,
+            img_format,
+            overwrite
+        )
+
+    def convert_many(self, files: Iterable[Tuple[str, str]], img_format: str = "tiff", overwrite: bool = False) -> Iterator[Tuple[str, str, int]]:
+        """_summary_
+        Convert several files using the workers of the session.
+        The files are consumed lazily and only a bounded number of them are in flight, the results are yielded in the order of the input.
+
+        Args:
+            files (Iterable[Tuple[str, str]]): _description_: The (input file, output file) pairs to convert.
+            img_format (str, optional): _description_: The destination format. Defaults to "tiff".
+            overwrite (bool, optional): _description_: Convert the files even if the outputs already exist. Defaults to False.
+
+        Yields:
+            Iterator[Tuple[str, str, int]]: _description_: The input file, the output file and the status of each conversion.
+        """
+        self._get_converter()
+        max_pending = self.jobs * 2
+        pending: Deque[Tuple[str, str, Future]] = deque()
+        for input_file, output_file in files:
+            if len(pending) >= max_pending:
+                yield self._get_result(pending.popleft())
+            future = self.executor.submit(
+                self.convert,
+                input_file,
+                output_file,
+                img_format,
+                overwrite
+            )
+            pending.append((input_file, output_file, future))
+        while len(pending) > 0:
+            yield self._get_result(pending.popleft())
+
+    def _get_result(self, item: Tuple[str, str, Future]) -> Tuple[str, str, int]:
+        """_summary_
+        Wait for a conversion handed to the workers.
+
+        Args:
+            item (Tuple[str, str, Future]): _description_: The input file, the output file and the pending conversion.
+
+        Returns:
+            Tuple[str, str, int]: _description_: The input file, the output file and the status of the conversion.
+        """
+        input_file, output_file, future = item
+        try:
+            status = future.result()
+        except Exception as e:
+            self.converter.const.perror(
+                f"Unexpected error while converting '{input_file}': '{e}'"
+            )
+            status = self.error
+        return input_file, output_file, status
@@ -0,0 +1,130 @@
+"""_summary_
+    This is the file in charge of splitting a folder conversion between several computers.
+    Each file is given to a shard by a stable hash of its path relative to the input directory, so computers pointed at
+    the same input tree with the same number of shards convert disjoint parts of it without talking to each other.
+    Each shard writes a summary of its run in the output directory.
+"""
+
+import os
+import json
+import socket
+import hashlib
+from typing import Dict, Union
+
+from .constants import Constants
+from .atomic_file import get_temporary_sibling, publish_file, discard_file
+
+REPORT_PREFIX = ".mdi2img_shard"
+
+
+class Shard:
+    """_summary_
+    The part of a folder conversion handled by this computer.
+    """
+
+    def __init__(self, index: int, count: int) -> None:
+        """_summary_
+
+        Args:
+            index (int): _description_: The number of this shard, from 1 to count.
+            count (int): _description_: The number of shards the conversion is split into.
+        """
+        self.index = index
+        self.count = count
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def contains(self, relative_path: str) -> bool:
+        """_summary_
+        Check if a file belongs to this shard.
+        The hash does not depend on the python process (unlike hash()) nor on the operating system separator.
+
+        Args:
+            relative_path (str): _description_: The path of the file relative to the input directory.
+
+        Returns:
+            bool: _description_: True if this shard has to convert the file.
+        """
+        key = relative_path.replace("\\", "/").encode("utf-8")
+        digest = hashlib.sha256(key).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index - 1
+
+    def get_file_name(self, name: str) -> str:
+        """_summary_
+        Get the name of a bookkeeping file of this shard, so that shards sharing an output directory do not share it.
+
+        Args:
+            name (str): _description_: The name used without sharding (for instance the name of the journal).
+
+        Returns:
+            str: _description_: The name of the file of this shard.
+        """
+        stem, extension = os.path.splitext(name)
+        return f"{stem}_{self.index}_of_{self.count}{extension}"
+
+    def get_report_path(self, output_directory: str) -> str:
+        """_summary_
+        Get the path of the summary report of this shard.
+
+        Args:
+            output_directory (str): _description_: The directory where the converted files are stored.
+
+        Returns:
+            str: _description_: The path of the report.
+        """
+        return os.path.join(
+            output_directory,
+            self.get_file_name(f"{REPORT_PREFIX}.json")
+        )
+
+    def write_report(self, constants: Constants, output_directory: str, summary: Dict[str, object]) -> Union[str, None]:
+        """_summary_
+        Write the summary report of this shard, the previous report of the shard is replaced once the new one is complete.
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            output_directory (str): _description_: The directory where the converted files are stored.
+            summary (Dict[str, object]): _description_: The outcome of the run.
+
+        Returns:
+            Union[str, None]: _description_: The path of the report, None if it could not be written.
+        """
+        report = {
+            "shard": str(self),
+            "index": self.index,
+            "count": self.count,
+            "host": socket.gethostname()
+        }
+        report.update(summary)
+        path = self.get_report_path(output_directory)
+        temporary_path = get_temporary_sibling(path)
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=4)
+            publish_file(temporary_path, path)
+        except OSError as e:
+            discard_file(temporary_path)
+            constants.perror(f"Failed to write the report of shard {self}: '{e}'")
+            return None
+        return path
+
+
+def parse_shard(shard: str) -> Union[Shard, None]:
+    """_summary_
+    Read a shard written as 'i/N' (for instance '2/4' is the second of four shards).
+
+    Args:
+        shard (str): _description_: The shard to read.
+
+    Returns:
+        Union[Shard, None]: _description_: The shard, None if it is not valid.
+    """
+    parts = shard.strip().split("/")
+    if len(parts) != 2 or parts[0].isdigit() is False or parts[1].isdigit() is False:
+        return None
+    index = int(parts[0])
+    count = int(parts[1])
+    if count < 1 or index < 1 or index > count:
+        return None
+    return Shard(index, count)
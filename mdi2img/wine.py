@@ -0,0 +1,191 @@
+"""_summary_
+    This is the file in charge of running the windows binary through a launcher such as Wine.
+    The launcher is prepended to every call of the binary and, when it is Wine, the paths given to the binary are translated
+    to their windows form and a persistent wineserver is kept alive for the whole batch,
+    so that each call does not have to start one.
+    The wineserver is killed at the end of the batch when it was started by the batch,
+    a wineserver that was already running is left to the programs that started it.
+"""
+
+import os
+import shlex
+import shutil
+import threading
+import subprocess
+from typing import List
+
+from .constants import Constants
+
+WINE_LAUNCHERS = ("wine", "wine64", "wine.exe", "wine64.exe")
+WINESERVER_NAME = "wineserver"
+# Wine maps the root of the unix filesystem to this drive by default
+DEFAULT_WINE_DRIVE = "Z:"
+# The number of seconds a wineserver command is allowed to run for
+WINESERVER_TIMEOUT = 30
+# The number of seconds the wineserver stays alive after its last client exited,
+# long enough to bridge the gap between two files
+WINESERVER_PERSISTENCE = 60
+
+
+class WineBridge:
+    """_summary_
+    The class in charge of the launcher prefix of the binary and of the wineserver shared by the calls.
+    """
+
+    def __init__(
+        self,
+        constants: Constants,
+        launcher: str = "",
+        wineserver: str = "",
+        drive: str = DEFAULT_WINE_DRIVE
+    ) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            launcher (str, optional): _description_: The command placed before the binary (for instance 'wine'),
+                an empty string runs the binary directly. Defaults to "".
+            wineserver (str, optional): _description_: The wineserver command,
+                an empty string looks for it next to a Wine launcher. Defaults to "".
+            drive (str, optional): _description_: The windows drive mapped to the root of the unix filesystem.
+                Defaults to DEFAULT_WINE_DRIVE.
+        """
+        self.const: Constants = constants
+        self.prefix: List[str] = shlex.split(launcher)
+        self.wineserver: List[str] = shlex.split(wineserver)
+        self.drive = drive.rstrip("\\/")
+        self.translate_paths = len(self.wineserver) > 0 or self._is_wine_launcher()
+        if len(self.wineserver) == 0 and self.translate_paths is True:
+            self.wineserver = self._find_wineserver()
+        self._lock = threading.Lock()
+        self._users = 0
+        self._server_started = False
+
+    def _is_wine_launcher(self) -> bool:
+        """_summary_
+        Check if the launcher is Wine.
+
+        Returns:
+            bool: _description_: True if the first word of the launcher is a Wine loader.
+        """
+        if len(self.prefix) == 0:
+            return False
+        return os.path.basename(self.prefix[0]).lower() in WINE_LAUNCHERS
+
+    def _find_wineserver(self) -> List[str]:
+        """_summary_
+        Look for the wineserver installed with the Wine launcher.
+
+        Returns:
+            List[str]: _description_: The wineserver command, empty if it was not found.
+        """
+        loader = shutil.which(self.prefix[0])
+        if loader is not None:
+            sibling = os.path.join(os.path.dirname(loader), WINESERVER_NAME)
+            if os.path.exists(sibling) is True:
+                return [sibling]
+        wineserver = shutil.which(WINESERVER_NAME)
+        if wineserver is not None:
+            return [wineserver]
+        self.const.pwarning(
+            "The wineserver was not found, Wine will start one for each file."
+        )
+        return []
+
+    def is_enabled(self) -> bool:
+        """_summary_
+        Check if the binary is run through a launcher.
+
+        Returns:
+            bool: _description_: True if a launcher prefix is configured.
+        """
+        return len(self.prefix) > 0
+
+    def to_binary_path(self, path: str) -> str:
+        """_summary_
+        Get a path in the form expected by the binary.
+        With Wine, an absolute unix path is reached through the drive mapped to the root of the filesystem.
+
+        Args:
+            path (str): _description_: The path on the host.
+
+        Returns:
+            str: _description_: The path to give to the binary.
+        """
+        if self.translate_paths is False:
+            return path
+        return self.drive + os.path.abspath(path).replace("/", "\\")
+
+    def wrap(self, command: List[str]) -> List[str]:
+        """_summary_
+        Place the launcher before a command.
+
+        Args:
+            command (List[str]): _description_: The binary followed by its arguments.
+
+        Returns:
+            List[str]: _description_: The command to run.
+        """
+        return self.prefix + command
+
+    def _run_wineserver(self, argument: str) -> bool:
+        """_summary_
+        Run the wineserver with a single argument.
+
+        Args:
+            argument (str): _description_: The argument (for instance '-p<seconds>' to keep it alive).
+
+        Returns:
+            bool: _description_: True if the command succeeded.
+        """
+        try:
+            result = subprocess.run(
+                self.wineserver + [argument],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=WINESERVER_TIMEOUT,
+                check=False
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            self.const.pwarning(f"Failed to run the wineserver ('{argument}'): '{e}'")
+            return False
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", errors="replace").strip()
+            self.const.pdebug(
+                f"The wineserver ('{argument}') returned {result.returncode}: '{error}'"
+            )
+            return False
+        return True
+
+    def start(self) -> None:
+        """_summary_
+        Start a wineserver that stays alive WINESERVER_PERSISTENCE seconds after its last client.
+        Calls can be nested with stop.
+        When a wineserver already runs for the prefix it is left as it is.
+        """
+        with self._lock:
+            self._users += 1
+            if self._users > 1 or len(self.wineserver) == 0:
+                return
+            self._server_started = self._run_wineserver(
+                f"-p{WINESERVER_PERSISTENCE}"
+            )
+            if self._server_started is True:
+                self.const.pdebug("Persistent wineserver started.")
+
+    def stop(self) -> None:
+        """_summary_
+        Mark the end of the batch started by start.
+        The wineserver is killed once the last batch ends if start launched it,
+        so that it does not outlive the program for WINESERVER_PERSISTENCE seconds.
+        """
+        with self._lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users > 0 or self._server_started is False:
+                return
+            self._server_started = False
+            if self._run_wineserver("-k") is True:
+                self.const.pdebug("Persistent wineserver stopped.")
@@ -0,0 +1,294 @@
+"""_summary_
+    This is the file in charge of the temporary workspace of a conversion job.
+    Every job gets its own folder for the intermediate tiff and for the log of the binary, so that files sharing a name
+    (in different folders of a tree, or in different processes) never overwrite each other.
+    The folder is removed when the job ends.
+    The workspaces holding an intermediate tiff can be placed on a RAM-backed filesystem (such as /dev/shm)
+    when it has room for it, the temporary folder on disk is used otherwise
+    (and for the jobs that only need a folder for the log of the binary).
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from typing import Tuple, Union
+
+from .constants import Constants
+from .mdi_decoder import MDIDecoder
+
+WORKSPACE_PREFIX = "job_"
+JOB_LOG_NAME = "mdi2tiff.log"
+# Only the end of the log of the binary is displayed when it fails
+MAX_LOG_DISPLAY_SIZE = 4096
+
+RAM_TEMP_FOLDER = "/dev/shm"
+RAM_WORKSPACE_FOLDER = "mdi_to_img_temp"
+# Space left free on the RAM-backed filesystem for the rest of the system (in bytes)
+DEFAULT_RAM_RESERVE = 64 * 1024 * 1024
+# Used when the pages of a file cannot be read: a decoded page is much larger than the compressed document
+DEFAULT_SIZE_FACTOR = 16
+# Room for the header and the page directories of the intermediate tiff
+TIFF_OVERHEAD = 64 * 1024
+
+
+class TemporaryStorage:
+    """_summary_
+    The class in charge of choosing where the workspace of a job is created.
+    The space promised to the jobs that are still running is remembered,
+    so that concurrent jobs do not all count on the same free space.
+    """
+
+    def __init__(
+        self,
+        constants: Constants,
+        ram_folder: str = "",
+        decoder: Union[MDIDecoder, None] = None,
+        reserve: int = DEFAULT_RAM_RESERVE
+    ) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            ram_folder (str, optional): _description_: The mount point of the RAM-backed filesystem,
+                an empty string keeps every workspace on disk. Defaults to "".
+            decoder (Union[MDIDecoder, None], optional): _description_: The decoder used to read the size of the pages.
+                Defaults to None.
+            reserve (int, optional): _description_: The number of bytes that are never used on the RAM-backed filesystem.
+                Defaults to DEFAULT_RAM_RESERVE.
+        """
+        self.const: Constants = constants
+        self.decoder = decoder
+        if self.decoder is None:
+            self.decoder = MDIDecoder(self.const)
+        self.reserve = max(0, reserve)
+        self.ram_folder = ""
+        if ram_folder != "":
+            if os.path.isdir(ram_folder) is True:
+                self.ram_folder = os.path.join(ram_folder, RAM_WORKSPACE_FOLDER)
+            else:
+                self.const.pwarning(
+                    f"The RAM-backed folder '{ram_folder}' does not exist, the temporary files stay on disk."
+                )
+        self._lock = threading.Lock()
+        self._promised = 0
+        self.total_ram_jobs = 0
+        self.total_disk_fallbacks = 0
+
+    def is_ram_enabled(self) -> bool:
+        """_summary_
+        Check if the workspaces may be placed on the RAM-backed filesystem.
+
+        Returns:
+            bool: _description_: True if a RAM-backed folder is in use.
+        """
+        return self.ram_folder != ""
+
+    def get_expected_size(self, input_file: str) -> int:
+        """_summary_
+        Estimate the size of the intermediate tiff of a file.
+        The size of the decoded pages is used when the file can be read, a multiple of the size of the file otherwise.
+
+        Args:
+            input_file (str): _description_: The path to the input file.
+
+        Returns:
+            int: _description_: The expected size (in bytes).
+        """
+        pages = None
+        if input_file != "":
+            pages = self.decoder.read_pages(input_file)
+        if pages:
+            return sum(page.get_raster_size() for page in pages) + TIFF_OVERHEAD
+        try:
+            return os.path.getsize(input_file) * DEFAULT_SIZE_FACTOR + TIFF_OVERHEAD
+        except OSError:
+            return TIFF_OVERHEAD
+
+    def _get_free_space(self) -> int:
+        """_summary_
+        Get the free space of the RAM-backed filesystem.
+
+        Returns:
+            int: _description_: The number of free bytes, 0 if it could not be read.
+        """
+        try:
+            return shutil.disk_usage(os.path.dirname(self.ram_folder)).free
+        except OSError as e:
+            self.const.pdebug(f"Failed to read the free space of '{self.ram_folder}': '{e}'")
+            return 0
+
+    def claim(self, input_file: str) -> Tuple[str, int]:
+        """_summary_
+        Choose the folder of a new workspace.
+
+        Args:
+            input_file (str): _description_: The file converted by the job.
+
+        Returns:
+            Tuple[str, int]: _description_: The folder and the number of bytes promised on the RAM-backed filesystem
+                (to give back with release).
+        """
+        if self.is_ram_enabled() is False:
+            return self.const.temporary_img_folder, 0
+        expected_size = self.get_expected_size(input_file)
+        with self._lock:
+            available = self._get_free_space() - self.reserve - self._promised
+            if expected_size <= available:
+                self._promised += expected_size
+                self.total_ram_jobs += 1
+                return self.ram_folder, expected_size
+            self.total_disk_fallbacks += 1
+        msg = f"'{input_file}': not enough room in '{self.ram_folder}' "
+        msg += f"({expected_size} bytes expected), using the disk."
+        self.const.pdebug(msg)
+        return self.const.temporary_img_folder, 0
+
+    def release(self, size: int) -> None:
+        """_summary_
+        Give back the space promised to a workspace that was removed.
+
+        Args:
+            size (int): _description_: The number of bytes returned by claim.
+        """
+        if size <= 0:
+            return
+        with self._lock:
+            self._promised = max(0, self._promised - size)
+
+    def reset(self) -> None:
+        """_summary_
+        Reset the placement totals.
+        """
+        with self._lock:
+            self.total_ram_jobs = 0
+            self.total_disk_fallbacks = 0
+
+
+class JobWorkspace:
+    """_summary_
+    The class in charge of creating and removing the private temporary folder of a conversion job.
+    The folder is only created the first time a path inside it is requested, so jobs that do not need it cost nothing.
+    """
+
+    def __init__(
+        self,
+        constants: Constants,
+        base_folder: str = "",
+        storage: Union[TemporaryStorage, None] = None,
+        input_file: str = ""
+    ) -> None:
+        """_summary_
+
+        Args:
+            constants (Constants): _description_: The constants of the program.
+            base_folder (str, optional): _description_: The folder in which the workspace is created,
+                an empty string uses the temporary image folder. Defaults to "".
+            storage (Union[TemporaryStorage, None], optional): _description_: When provided, chooses the folder of a workspace
+                holding an intermediate tiff when it is created (base_folder is ignored for it). Defaults to None.
+            input_file (str, optional): _description_: The file converted by the job, used to estimate the space it needs.
+                Defaults to "".
+        """
+        self.const: Constants = constants
+        self.base_folder = base_folder
+        if self.base_folder == "":
+            self.base_folder = self.const.temporary_img_folder
+        self.storage = storage
+        self.input_file = input_file
+        self._promised = 0
+        self._holds_intermediate = False
+        self._path: Union[str, None] = None
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cleanup()
+
+    @property
+    def path(self) -> str:
+        """_summary_
+        Get the folder of the workspace, creating it if needed.
+
+        Returns:
+            str: _description_: The path to the folder.
+        """
+        if self._path is None:
+            # Without an intermediate the workspace only holds the log,
+            # it is not worth reading the pages or reserving RAM for it
+            if self.storage is not None and self._holds_intermediate is True:
+                self.base_folder, self._promised = self.storage.claim(
+                    self.input_file
+                )
+            os.makedirs(self.base_folder, exist_ok=True)
+            self._path = tempfile.mkdtemp(
+                prefix=WORKSPACE_PREFIX,
+                dir=self.base_folder
+            )
+        return self._path
+
+    @property
+    def log_file(self) -> str:
+        """_summary_
+        Get the log file of the binary for this job.
+
+        Returns:
+            str: _description_: The path to the log file.
+        """
+        return self.get_path(JOB_LOG_NAME)
+
+    def get_path(self, name: str) -> str:
+        """_summary_
+        Get the path of a file inside the workspace.
+
+        Args:
+            name (str): _description_: The name of the file.
+
+        Returns:
+            str: _description_: The path to the file.
+        """
+        return os.path.join(self.path, name)
+
+    def get_intermediate_path(self, name: str) -> str:
+        """_summary_
+        Get the path of the intermediate tiff inside the workspace.
+        The temporary storage is only asked for room when the folder is created by this call,
+        so it has to come before the log file.
+
+        Args:
+            name (str): _description_: The name of the intermediate file.
+
+        Returns:
+            str: _description_: The path to the file.
+        """
+        self._holds_intermediate = True
+        return self.get_path(name)
+
+    def read_log(self) -> str:
+        """_summary_
+        Read the end of the log written by the binary.
+
+        Returns:
+            str: _description_: The end of the log, an empty string if there is none.
+        """
+        if self._path is None:
+            return ""
+        try:
+            with open(self.log_file, "rb") as file:
+                file.seek(0, os.SEEK_END)
+                file.seek(max(0, file.tell() - MAX_LOG_DISPLAY_SIZE))
+                return file.read().decode("utf-8", errors="replace")
+        except OSError:
+            return ""
+
+    def cleanup(self) -> None:
+        """_summary_
+        Remove the workspace and everything left in it.
+        """
+        if self._path is None:
+            return
+        shutil.rmtree(self._path, ignore_errors=True)
+        self._path = None
+        if self.storage is not None:
+            self.storage.release(self._promised)
+        self._promised = 0
@@ -0,0 +1,52 @@
+"""
+File in charge of the fixtures shared by the tests
+"""
+
+import sys
+from typing import Callable
+
+import pytest
+
+from mdi2img.constants import Constants
+from mdi2img.mdi2tiff import MDIToTiff
+
+
+@pytest.fixture
+def temp_folder(tmp_path, monkeypatch):
+    """ Point the temporary folder of the program at a private folder """
+    folder = tmp_path / "temp"
+    monkeypatch.setenv("TEMP", str(folder))
+    (folder / "mdi_to_img_temp").mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+@pytest.fixture
+def constants(temp_folder) -> Constants:
+    """ Create constants with a private temporary folder """
+    return Constants("MDI2TIF.EXE")
+
+
+@pytest.fixture
+def fake_binary(tmp_path) -> str:
+    """ Create a stand-in for MDI2TIF.EXE that writes a small tiff to the destination """
+    binary = tmp_path / "fake_mdi2tif.py"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "from PIL import Image\n"
+        "dest = sys.argv[sys.argv.index('-dest') + 1]\n"
+        "Image.new('L', (8, 8)).save(dest, format='tiff')\n",
+        encoding="utf-8"
+    )
+    binary.chmod(0o755)
+    return str(binary)
+
+
+@pytest.fixture
+def create_converter(temp_folder, fake_binary) -> Callable[..., MDIToTiff]:
+    """ Get a function creating converters that use the fake binary and a private temporary folder """
+    def _create_converter(**kwargs) -> MDIToTiff:
+        const = Constants("MDI2TIF.EXE")
+        const.binary_path = fake_binary
+        return MDIToTiff(const, **kwargs)
+    return _create_converter
@@ -0,0 +1,95 @@
+"""
+File in charge of testing the conversion backends
+"""
+
+import os
+import time
+
+import pytest
+
+from PIL import Image
+
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.backends import ConversionBackend, ExeBackend, FakeBackend
+
+
+def test_fake_backend_is_deterministic(tmp_path, constants) -> None:
+    """ Test that the fake backend gives the same pages for the same file after its latency """
+    constants.binary_path = None
+    first = tmp_path / "first.mdi"
+    first.write_bytes(b"EP*\x00first")
+    second = tmp_path / "second.mdi"
+    second.write_bytes(b"EP*\x00second")
+    backend = FakeBackend(constants, latency=0.1, size=(16, 8), pages=2)
+    start = time.perf_counter()
+    pages = backend.decode(str(first))
+    assert time.perf_counter() - start >= 0.1
+    assert len(pages) == 2
+    assert pages[0].size == (16, 8)
+    assert pages[0].tobytes() != pages[1].tobytes()
+    assert pages[0].tobytes() == backend.decode(str(first))[0].tobytes()
+    assert pages[0].tobytes() != backend.decode(str(second))[0].tobytes()
+
+
+def test_convert_all_with_fake_backend_needs_no_binary(tmp_path, constants) -> None:
+    """ Test that a folder is converted by the fake backend when the binary is missing """
+    constants.binary_path = None
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(4):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00" * (index + 1))
+    converter = MDIToTiff(constants, backend="fake")
+    status = converter.convert_all(
+        str(in_dir), str(tmp_path / "out"), "tiff", jobs=2
+    )
+    assert status == converter.success
+    assert converter.total_files_success == 4
+    assert converter.launcher.total_launches == 0
+    with Image.open(tmp_path / "out" / "file_0.tiff") as image:
+        assert image.size == (64, 64)
+
+
+def test_custom_backend_can_be_plugged(tmp_path, constants) -> None:
+    """ Test that a backend instance replaces the built-in engines """
+
+    class BlankBackend(ConversionBackend):
+        """ A backend giving a single white page """
+        name = "blank"
+
+        def decode(self, input_file):
+            return [Image.new("L", (4, 4), 255)]
+
+    constants.binary_path = None
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = MDIToTiff(constants, backend=BlankBackend(constants))
+    assert converter.backend == "blank"
+    output_file = tmp_path / "file.png"
+    status = converter.convert(str(input_file), str(output_file), "png")
+    assert status == converter.success
+    with Image.open(output_file) as image:
+        assert image.getpixel((0, 0)) == 255
+    assert os.listdir(constants.temporary_img_folder) == []
+
+
+def test_backend_must_implement_decode(constants) -> None:
+    """ Test that a backend without decode cannot be created and that the binary backend decodes nothing """
+
+    class EmptyBackend(ConversionBackend):
+        """ A backend forgetting to implement decode """
+        name = "empty"
+
+    with pytest.raises(TypeError):
+        EmptyBackend(constants)
+    assert ExeBackend(constants).decode("file.mdi") is None
+
+
+def test_native_backend_reports_files_it_cannot_decode(tmp_path, constants) -> None:
+    """ Test that the native backend does not fall back to the binary """
+    constants.binary_path = None
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = MDIToTiff(constants, backend="native")
+    status = converter.convert(str(input_file), str(tmp_path / "file.tiff"), "tiff")
+    assert status == converter.error
+    assert converter.launcher.total_launches == 0
@@ -0,0 +1,59 @@
+"""
+File in charge of testing the conversion cache
+"""
+
+import os
+
+from mdi2img.constants import Constants
+from mdi2img.cache import ConversionCache
+
+
+def _create_cache(constants: Constants, max_size: int) -> ConversionCache:
+    """ Create a cache in the private temporary folder of the constants """
+    return ConversionCache(constants, max_size, cache_outputs=True)
+
+
+def test_put_and_get(tmp_path, constants) -> None:
+    """ Test that a stored entry can be read back """
+    cache = _create_cache(constants, 1024)
+    source = tmp_path / "image.tiff"
+    source.write_bytes(b"tiff content")
+    assert cache.get_intermediate("ab" * 32) is None
+    cache.put_intermediate("ab" * 32, str(source))
+    content = cache.get_intermediate("ab" * 32)
+    assert content is not None
+    assert content.getvalue() == b"tiff content"
+    assert cache.get_output("ab" * 32, "png") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_is_evicted(tmp_path, constants) -> None:
+    """ Test that the quota is enforced by removing the least recently used entries """
+    cache = _create_cache(constants, 250)
+    source = tmp_path / "image.tiff"
+    source.write_bytes(b"x" * 100)
+    cache.put_intermediate("aa" * 32, str(source))
+    cache.put_intermediate("bb" * 32, str(source))
+    old_time = 1_000_000_000
+    os.utime(cache._get_entry_path("aa" * 32, "tiff"), (old_time, old_time))
+    os.utime(cache._get_entry_path("bb" * 32, "tiff"), (old_time + 1, old_time + 1))
+    # Reading an entry marks it as recently used
+    assert cache.get_intermediate("aa" * 32) is not None
+    cache.put_intermediate("cc" * 32, str(source))
+    assert cache.get_intermediate("bb" * 32) is None
+    assert cache.get_intermediate("aa" * 32) is not None
+    assert cache.get_intermediate("cc" * 32) is not None
+    assert cache.evictions == 1
+
+
+def test_quota_is_shared_between_processes(tmp_path, constants) -> None:
+    """ Test that caches sharing a folder (as several processes do) stay within a single quota """
+    first = _create_cache(constants, 250)
+    second = _create_cache(constants, 250)
+    source = tmp_path / "image.tiff"
+    source.write_bytes(b"x" * 100)
+    for index in range(6):
+        cache = first if index % 2 == 0 else second
+        cache.put_intermediate(f"{index:02d}" * 32, str(source))
+        assert sum(entry[1] for entry in first._list_entries()) <= 250
+    assert first.evictions + second.evictions == 4
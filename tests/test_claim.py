@@ -0,0 +1,97 @@
+"""
+File in charge of testing the claims that let several processes share an input tree
+"""
+
+import os
+import time
+import threading
+
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.backends import FakeBackend
+from mdi2img.claim import WorkClaims
+
+
+class CountingBackend(FakeBackend):
+    """ A fake backend recording the files it converts """
+
+    converted = []
+    lock = threading.Lock()
+
+    def decode(self, input_file):
+        with self.lock:
+            self.converted.append(input_file)
+        return super().decode(input_file)
+
+
+def test_claims_are_exclusive_and_expire(tmp_path, constants) -> None:
+    """ Test that a file claimed by a live process cannot be claimed, unless its claim is older than the lease, and that only the owner releases it """
+    input_file = str(tmp_path / "file.mdi")
+    first = WorkClaims(constants, lease=60)
+    second = WorkClaims(constants, lease=60)
+    assert first.claim(input_file) is True
+    assert second.claim(input_file) is False
+    old = time.time() - 120
+    os.utime(first.get_claim_path(input_file), (old, old))
+    assert second.claim(input_file) is True
+    assert second.total_taken_over == 1
+    first.release(input_file)
+    assert os.path.exists(second.get_claim_path(input_file)) is True
+    second.release(input_file)
+    assert os.path.exists(second.get_claim_path(input_file)) is False
+    assert os.listdir(tmp_path) == ["temp"]
+
+
+def test_processes_sharing_a_tree_convert_each_file_once(tmp_path, constants) -> None:
+    """ Test that concurrent folder conversions with claims never convert the same file twice """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(12):
+        (in_dir / f"file_{index:02}.mdi").write_bytes(b"EP*\x00")
+    CountingBackend.converted = []
+    statuses = []
+
+    def _worker() -> None:
+        converter = MDIToTiff(
+            constants, backend=CountingBackend(constants, latency=0.05)
+        )
+        statuses.append(converter.convert_all(
+            str(in_dir), str(tmp_path / "out"), "tiff", jobs=2, claim=True
+        ))
+
+    workers = [threading.Thread(target=_worker) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(CountingBackend.converted) == 12
+    assert len(set(CountingBackend.converted)) == 12
+    assert len(os.listdir(tmp_path / "out")) == 12
+    assert [name for name in os.listdir(in_dir) if name.endswith(".mdi") is False] == []
+
+
+def test_file_finished_by_another_process_is_not_converted_again(tmp_path, constants) -> None:
+    """ Test that with a manifest, a file converted and released by another process after the walk started is skipped """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(2):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    CountingBackend.converted = []
+
+    class OtherProcessBackend(CountingBackend):
+        """ A backend running a whole other conversion of the tree while it converts its first file """
+
+        def decode(self, input_file):
+            if len(self.converted) == 0:
+                other = MDIToTiff(constants, backend=CountingBackend(constants))
+                other.convert_all(
+                    str(in_dir), str(tmp_path / "out"), "tiff", jobs=1, use_manifest=True, claim=True
+                )
+            return super().decode(input_file)
+
+    converter = MDIToTiff(constants, backend=OtherProcessBackend(constants))
+    status = converter.convert_all(
+        str(in_dir), str(tmp_path / "out"), "tiff", jobs=1, use_manifest=True, claim=True
+    )
+    assert status == converter.success
+    assert sorted(CountingBackend.converted) == [str(in_dir / "file_0.mdi"), str(in_dir / "file_1.mdi")]
+    assert converter.total_files_skipped == 1
@@ -0,0 +1,42 @@
+"""
+File in charge of testing the adaptive number of workers of the folder conversions
+"""
+
+import os
+
+from mdi2img.constants import AUTO_JOBS
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.concurrency import ConcurrencyController
+
+
+def test_controller_climbs_to_the_throughput_peak(constants) -> None:
+    """ Test that the controller finds the level with the highest throughput in bytes and keeps probing around it while the files shrink """
+    now = [0.0]
+    controller = ConcurrencyController(
+        constants, max_jobs=8, initial_jobs=1, interval=10, clock=lambda: now[0]
+    )
+    # MiB per second at each level, the host saturates at 3 workers
+    throughput = {1: 1.0, 2: 1.9, 3: 2.6, 4: 2.2, 5: 1.8, 6: 1.5, 7: 1.3, 8: 1.1}
+    levels = []
+    for index in range(400):
+        # The largest files come first, a count of files per second would reward the last levels
+        size = (800 - index) * 2048
+        now[0] += size / (throughput[controller.jobs] * 1024 * 1024)
+        controller.record_completion(size)
+        levels.append(controller.jobs)
+    assert controller.get_best_jobs() == 3
+    assert max(levels) <= 4
+    assert set(levels[-50:]) <= {2, 3, 4}
+
+
+def test_convert_all_with_automatic_jobs(tmp_path, constants) -> None:
+    """ Test that a folder is converted with the adaptive number of workers """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(6):
+        (in_dir / f"file_{index}.mdi").write_bytes(bytes([index]))
+    converter = MDIToTiff(constants, backend="fake")
+    status = converter.convert_all(str(in_dir), str(tmp_path / "out"), "tiff", jobs=AUTO_JOBS)
+    assert status == converter.success
+    assert len(os.listdir(tmp_path / "out")) == 6
+    assert converter.concurrency is None
@@ -0,0 +1,61 @@
+"""
+File in charge of testing the default number of workers inside containers
+"""
+
+import pytest
+
+from mdi2img import constants as CONST
+from mdi2img.concurrency import ConcurrencyController
+
+
+def _create_cgroup(tmp_path, monkeypatch, proc_cgroup: str, files: dict) -> None:
+    """ Create a fake cgroup tree and point the constants at it """
+    root = tmp_path / "cgroup"
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (tmp_path / "proc_cgroup").write_text(proc_cgroup)
+    monkeypatch.setattr(CONST, "CGROUP_ROOT", str(root))
+    monkeypatch.setattr(CONST, "PROC_CGROUP", str(tmp_path / "proc_cgroup"))
+    monkeypatch.setattr(CONST.Constants, "_get_available_cpus", lambda self: 64)
+    monkeypatch.setenv("TEMP", str(tmp_path / "temp"))
+
+
+@pytest.mark.parametrize(
+    "proc_cgroup, files, quota, memory_limit, jobs",
+    [
+        ("0::/\n", {}, None, None, 64),
+        ("0::/pod\n", {"pod/cpu.max": "400000 100000\n", "pod/memory.max": "max\n"}, 4.0, None, 4),
+        ("0::/pod\n", {"cpu.max": "max 100000\n", "pod/cpu.max": "250000 100000\n", "memory.max": str(512 * 1024 * 1024)}, 2.5, 512 * 1024 * 1024, 2),
+        (
+            "4:memory:/docker/abc\n2:cpu,cpuacct:/docker/abc\n",
+            {
+                "cpu,cpuacct/docker/abc/cpu.cfs_quota_us": "300000\n",
+                "cpu,cpuacct/docker/abc/cpu.cfs_period_us": "100000\n",
+                "memory/docker/abc/memory.limit_in_bytes": "9223372036854771712\n"
+            },
+            3.0, None, 3
+        ),
+        ("4:memory:/\n2:cpu:/\n", {"cpu/cpu.cfs_quota_us": "-1\n", "cpu/cpu.cfs_period_us": "100000\n"}, None, None, 64)
+    ]
+)
+def test_default_jobs_follow_the_container_limits(tmp_path, monkeypatch, proc_cgroup, files, quota, memory_limit, jobs) -> None:
+    """ Test that the default number of workers honours the cgroup v1 and v2 cpu quotas and memory limits """
+    _create_cgroup(tmp_path, monkeypatch, proc_cgroup, files)
+    const = CONST.Constants("MDI2TIF.EXE")
+    assert const.cpu_quota == quota
+    assert const.memory_limit == memory_limit
+    assert const.jobs == jobs
+
+
+def test_memory_limit_caps_the_adaptive_concurrency(tmp_path, monkeypatch) -> None:
+    """ Test that the adaptive number of workers never goes over the number of conversions the memory limit holds """
+    _create_cgroup(tmp_path, monkeypatch, "0::/\n", {"memory.max": str(3 * CONST.MEMORY_PER_JOB)})
+    const = CONST.Constants("MDI2TIF.EXE")
+    assert const.memory_jobs_limit == 3
+    controller = ConcurrencyController(const)
+    assert controller.cpus == 64
+    assert controller.max_jobs == 3
+    assert controller.jobs == 3
+    assert ConcurrencyController(const, max_jobs=16).max_jobs == 3
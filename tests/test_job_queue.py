@@ -0,0 +1,132 @@
+"""
+File in charge of testing the SQLite job queue and its workers
+"""
+
+import os
+import time
+import errno
+import sqlite3
+
+import pytest
+
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.job_queue import JobQueue, QueueWorker, STATE_DONE, STATE_FAILED, STATE_QUEUED
+
+
+def test_worker_converts_the_queue(tmp_path, constants) -> None:
+    """ Test that enqueued files are converted by a worker and that their states, attempts and timings are recorded """
+    in_dir = tmp_path / "in"
+    (in_dir / "sub").mkdir(parents=True)
+    for name in ("a.mdi", "b.mdi", "sub/c.mdi"):
+        (in_dir / name).write_bytes(name.encode("utf-8"))
+    (in_dir / "notes.txt").write_text("ignored")
+    queue = JobQueue(constants, str(tmp_path / "queue.sqlite3"))
+    job_ids = queue.enqueue_path(
+        str(in_dir), "png", str(tmp_path / "out"), recursive=True
+    )
+    assert len(job_ids) == 3
+    queue.enqueue(str(tmp_path / "missing.mdi"), str(tmp_path / "out" / "missing.png"), "png", max_attempts=1)
+    assert queue.get_counts()[STATE_QUEUED] == 4
+    converter = MDIToTiff(constants, backend="fake")
+    worker = QueueWorker(converter, queue, jobs=2)
+    assert worker.run(until_empty=True) == converter.error
+    assert (tmp_path / "out" / "a.png").is_file()
+    assert (tmp_path / "out" / "sub" / "c.png").is_file()
+    assert queue.get_counts() == {"queued": 0, "running": 0, "done": 3, "failed": 1}
+    for job in queue.list_jobs(STATE_DONE):
+        assert job.attempts == 1
+        assert job.worker == worker.name
+        assert job.duration is not None and job.duration >= 0
+        assert job.finished_at >= job.started_at >= job.enqueued_at
+    assert queue.list_jobs(STATE_FAILED)[0].input_file.endswith("missing.mdi")
+
+
+def test_abandoned_jobs_are_handed_out_again(tmp_path, constants) -> None:
+    """ Test that a job whose worker died is taken again after the lease, and fails once it ran out of attempts """
+    path = str(tmp_path / "queue.sqlite3")
+    queue = JobQueue(constants, path, lease=60)
+    job_id = queue.enqueue(str(tmp_path / "a.mdi"), max_attempts=2)
+    assert queue.take("dead").id == job_id
+    assert queue.take("alive") is None
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE jobs SET started_at = ?", (time.time() - 120,))
+    job = queue.take("alive")
+    assert job.id == job_id and job.attempts == 2 and job.worker == "alive"
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE jobs SET started_at = ?", (time.time() - 120,))
+    assert queue.take("other") is None
+    assert queue.get_job(job_id).state == STATE_FAILED
+    assert os.path.isfile(path)
+
+
+def test_job_raising_is_failed_and_the_worker_goes_on(tmp_path, monkeypatch, constants) -> None:
+    """ Test that a conversion raising marks its job failed without stopping the worker, and that only the worker holding a job finishes it """
+    queue = JobQueue(constants, str(tmp_path / "queue.sqlite3"))
+    for name in ("a.mdi", "b.mdi", "c.mdi"):
+        (tmp_path / name).write_bytes(b"EP*\x00")
+        queue.enqueue(str(tmp_path / name), str(tmp_path / "out" / f"{name}.png"), "png", max_attempts=1)
+    converter = MDIToTiff(constants, backend="fake")
+    convert = converter.convert
+
+    def _convert(input_file, *args, **kwargs):
+        if input_file.endswith("b.mdi") is True:
+            raise RuntimeError("broken")
+        return convert(input_file, *args, **kwargs)
+
+    monkeypatch.setattr(converter, "convert", _convert)
+    worker = QueueWorker(converter, queue, jobs=2)
+    assert worker.run(until_empty=True) == worker.error
+    assert queue.get_counts() == {"queued": 0, "running": 0, "done": 2, "failed": 1}
+    assert queue.list_jobs(STATE_FAILED)[0].input_file.endswith("b.mdi")
+    job_id = queue.enqueue(str(tmp_path / "a.mdi"))
+    assert queue.take("holder").id == job_id
+    assert queue.finish(job_id, "other", 0, True) is False
+    assert queue.finish(job_id, "holder", 0, True) is True
+    assert queue.get_job(job_id).state == STATE_DONE
+
+
+def test_queue_closes_its_connections(tmp_path, monkeypatch, constants) -> None:
+    """ Test that every queue operation closes the connection it opened """
+    connections = []
+    connect = sqlite3.connect
+
+    def _connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr("mdi2img.job_queue.sqlite3.connect", _connect)
+    queue = JobQueue(constants, str(tmp_path / "queue.sqlite3"))
+    job_id = queue.enqueue(str(tmp_path / "a.mdi"))
+    queue.take("worker")
+    queue.finish(job_id, "worker", 0, True)
+    queue.get_counts()
+    assert len(connections) == 5
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_transient_failures_are_queued_again(tmp_path, monkeypatch, constants) -> None:
+    """ Test that a job failing for a transient reason is queued again until it runs out of attempts """
+    queue = JobQueue(constants, str(tmp_path / "queue.sqlite3"))
+    for name in ("flaky.mdi", "busy.mdi"):
+        (tmp_path / name).write_bytes(b"EP*\x00")
+        queue.enqueue(str(tmp_path / name), str(tmp_path / "out" / f"{name}.png"), "png", max_attempts=3)
+    converter = MDIToTiff(constants, backend="fake")
+    convert = converter.convert
+    calls = []
+
+    def _convert(input_file, *args, **kwargs):
+        calls.append(os.path.basename(input_file))
+        if input_file.endswith("busy.mdi") is True or calls.count("flaky.mdi") == 1:
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        return convert(input_file, *args, **kwargs)
+
+    monkeypatch.setattr(converter, "convert", _convert)
+    worker = QueueWorker(converter, queue, jobs=1)
+    assert worker.run(until_empty=True) == worker.error
+    assert calls.count("flaky.mdi") == 2 and calls.count("busy.mdi") == 3
+    assert worker.total_jobs_requeued == 3
+    flaky, busy = queue.list_jobs()
+    assert (flaky.state, flaky.attempts) == (STATE_DONE, 2)
+    assert (busy.state, busy.attempts) == (STATE_FAILED, 3)
@@ -0,0 +1,73 @@
+"""
+File in charge of testing the launcher of the conversion binary
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from mdi2img.launcher import Launcher
+
+
+def test_run_keeps_exit_code_and_outputs(constants) -> None:
+    """ Test that the real return code and outputs of the child are kept """
+    launcher = Launcher(constants)
+    result = launcher.run([
+        sys.executable,
+        "-c",
+        "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"
+    ])
+    assert result.spawned is True
+    assert result.exit_code == 3
+    assert result.stdout.strip() == "out"
+    assert result.stderr.strip() == "err"
+    assert result.spawn_time >= 0
+    assert result.run_time >= 0
+    assert launcher.total_launches == 1
+
+
+def test_run_does_not_split_arguments(tmp_path, constants) -> None:
+    """ Test that arguments containing spaces reach the child untouched """
+    launcher = Launcher(constants)
+    path = str(tmp_path / "a folder" / "my file.mdi")
+    result = launcher.run([
+        sys.executable, "-c", "import sys; print(sys.argv[1])", path
+    ])
+    assert result.exit_code == 0
+    assert result.stdout.strip() == path
+
+
+def test_run_reports_spawn_failure(tmp_path, constants) -> None:
+    """ Test that a missing binary is reported instead of raising """
+    launcher = Launcher(constants)
+    result = launcher.run([str(tmp_path / "missing_binary")])
+    assert result.spawned is False
+    assert result.exit_code == launcher.error
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Process groups are a posix feature")
+def test_run_kills_process_tree_on_timeout(tmp_path, constants) -> None:
+    """ Test that a child running for too long is killed together with its own children """
+    launcher = Launcher(constants)
+    pid_file = tmp_path / "grandchild.pid"
+    script = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(60)\n"
+    )
+    result = launcher.run([sys.executable, "-c", script], timeout=1)
+    assert result.timed_out is True
+    assert result.exit_code == launcher.error
+    assert result.run_time < 30
+    assert launcher.total_timeouts == 1
+    grandchild = int(pid_file.read_text())
+    time.sleep(0.2)
+    try:
+        os.kill(grandchild, 0)
+        alive = open(f"/proc/{grandchild}/stat").read().split()[2] != "Z"
+    except (OSError, FileNotFoundError):
+        alive = False
+    assert alive is False
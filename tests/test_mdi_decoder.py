@@ -0,0 +1,99 @@
+"""
+File in charge of testing the native mdi decoder
+"""
+
+import os
+
+import pytest
+from PIL import Image, ImageChops
+
+from mdi2img.mdi_decoder import MDIDecoder, MDI_MAGIC
+
+SAMPLE_MDI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample_images", "mdi", "C_goro_stand.mdi"
+)
+
+
+def _create_mdi(path, images) -> None:
+    """ Create an mdi container holding uncompressed pages """
+    images[0].save(
+        path, format="tiff", save_all=True, append_images=images[1:]
+    )
+    with open(path, "r+b") as file:
+        file.write(MDI_MAGIC)
+
+
+def test_read_pages_of_sample(constants) -> None:
+    """ Test that the directory of a real mdi file is parsed """
+    decoder = MDIDecoder(constants)
+    pages = decoder.read_pages(SAMPLE_MDI)
+    assert pages is not None
+    assert len(pages) == 1
+    assert (pages[0].width, pages[0].height) == (182, 652)
+    assert pages[0].samples_per_pixel == 3
+    # The sample uses a proprietary MODI codec, the binary is required
+    assert decoder.can_decode(pages) is False
+    assert decoder.decode(SAMPLE_MDI) is None
+
+
+def test_decode_supported_pages(tmp_path, constants) -> None:
+    """ Test that pages using a standard compression are decoded in memory """
+    decoder = MDIDecoder(constants)
+    originals = [
+        Image.new("RGB", (32, 16), (255, 0, 0)),
+        Image.new("RGB", (32, 16), (0, 0, 255))
+    ]
+    path = tmp_path / "pages.mdi"
+    _create_mdi(path, originals)
+    assert decoder.is_mdi_file(str(path)) is True
+    images = decoder.decode(str(path))
+    assert images is not None
+    assert len(images) == 2
+    for decoded, original in zip(images, originals):
+        assert ImageChops.difference(decoded, original).getbbox() is None
+
+
+def test_read_pages_rejects_other_files(tmp_path, constants) -> None:
+    """ Test that files without the mdi magic are rejected """
+    decoder = MDIDecoder(constants)
+    path = tmp_path / "not_an_mdi.mdi"
+    path.write_bytes(b"II*\x00\x08\x00\x00\x00")
+    assert decoder.is_mdi_file(str(path)) is False
+    assert decoder.read_pages(str(path)) is None
+
+
+def _create_reference(mode: str) -> Image.Image:
+    """ Create a raster whose every pixel is known, so that a decoding error cannot go unnoticed """
+    image = Image.new("RGB", (37, 23))
+    image.putdata([
+        (x * 7 % 256, y * 11 % 256, (x * y) % 256)
+        for y in range(23) for x in range(37)
+    ])
+    return image.convert(mode)
+
+
+@pytest.mark.parametrize(
+    "mode, compression",
+    [
+        ("RGB", "raw"),
+        ("RGB", "tiff_lzw"),
+        ("RGB", "tiff_adobe_deflate"),
+        ("L", "packbits"),
+        ("1", "group4")
+    ]
+)
+def test_decode_matches_a_known_raster(tmp_path, constants, mode, compression) -> None:
+    """ Test that an mdi file using a standard compression decodes to the exact raster it was written from """
+    decoder = MDIDecoder(constants)
+    reference = _create_reference(mode)
+    path = tmp_path / "reference.mdi"
+    reference.save(path, format="tiff", compression=compression)
+    with open(path, "r+b") as file:
+        file.write(MDI_MAGIC)
+    pages = decoder.read_pages(str(path))
+    assert pages is not None and decoder.can_decode(pages) is True
+    images = decoder.decode(str(path))
+    assert images is not None and len(images) == 1
+    assert images[0].mode == reference.mode
+    assert images[0].tobytes() == reference.tobytes()
@@ -4,8 +4,18 @@
 File in charge of testing the functions contained in the class
 """
 
+import os
+import asyncio
+import sys
+import shutil
 from sys import stderr
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
 import mdi2img
+from mdi2img.mdi2tiff import MDIToTiff
 
 
 def print_debug(string: str = "") -> None:
@@ -26,3 +36,365 @@ def test_class_content() -> None:
     print("Testing class content")
     print(f"Displaying the content of mdi2img:\n{dir(mdi2img)}")
     assert 0 == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_in_parallel(tmp_path, create_converter) -> None:
+    """ Test that a parallel folder conversion gives the same totals as a sequential one """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(5):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    converter = create_converter()
+    status = converter.convert_all(
+        str(in_dir), str(tmp_path / "out"), "tiff", jobs=3
+    )
+    assert status == converter.success
+    assert converter.total_files_success == 5
+    assert converter.total_files_fails == 0
+    assert len(os.listdir(tmp_path / "out")) == 5
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_async(tmp_path, create_converter) -> None:
+    """ Test the asynchronous folder conversion """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(4):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    converter = create_converter()
+    status = asyncio.run(
+        converter.convert_all_async(
+            str(in_dir), str(tmp_path / "out"), "tiff", jobs=2
+        )
+    )
+    assert status == converter.success
+    assert converter.total_files_success == 4
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_async_survives_a_failing_task(tmp_path, monkeypatch, create_converter) -> None:
+    """ Test that a conversion raising an exception is counted as failed without aborting the batch """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(4):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    converter = create_converter()
+    convert_async = converter.convert_async
+
+    async def _convert_async(input_file, *args, **kwargs):
+        if input_file.endswith("file_1.mdi"):
+            raise RuntimeError("unexpected")
+        return await convert_async(input_file, *args, **kwargs)
+
+    monkeypatch.setattr(converter, "convert_async", _convert_async)
+    status = asyncio.run(
+        converter.convert_all_async(
+            str(in_dir), str(tmp_path / "out"), "tiff", jobs=2
+        )
+    )
+    assert status == converter.error
+    assert converter.total_files_success == 3
+    assert converter.total_files_fails == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_convert_removes_intermediate(tmp_path, monkeypatch, create_converter, in_memory) -> None:
+    """ Test that the intermediate tiff does not outlive the format change, and only goes to the RAM-backed folder in memory """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    (tmp_path / "shm").mkdir()
+    monkeypatch.setattr("mdi2img.mdi2tiff.RAM_TEMP_FOLDER", str(tmp_path / "shm"))
+    converter = create_converter(
+        backend="exe", in_memory=in_memory
+    )
+    output_file = tmp_path / "file.png"
+    status = converter.convert(str(input_file), str(output_file), "png")
+    assert status == converter.success
+    assert output_file.exists()
+    assert os.listdir(converter.const.temporary_img_folder) == []
+    assert converter.temp_storage.is_ram_enabled() is in_memory
+    assert converter.temp_storage.total_ram_jobs == int(in_memory)
+    if in_memory is True:
+        assert os.listdir(converter.temp_storage.ram_folder) == []
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_tiff_output_does_not_claim_ram(tmp_path, monkeypatch, create_converter) -> None:
+    """ Test that a job without an intermediate keeps its log on disk and does not read the pages to reserve RAM """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    (tmp_path / "shm").mkdir()
+    converter = create_converter(
+        backend="exe", ram_temp=str(tmp_path / "shm")
+    )
+    monkeypatch.setattr(
+        converter.temp_storage, "get_expected_size",
+        lambda input_file: pytest.fail("the pages were read")
+    )
+    output_file = tmp_path / "file.tiff"
+    status = converter.convert(str(input_file), str(output_file), "tiff")
+    assert status == converter.success
+    assert output_file.exists()
+    assert converter.temp_storage.total_ram_jobs == 0
+    assert converter.temp_storage.total_disk_fallbacks == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_jobs_sharing_a_name_use_separate_workspaces(tmp_path, create_converter) -> None:
+    """ Test that concurrent jobs on files sharing a name do not share their intermediate tiff or log """
+    folders = ("a", "b", "c")
+    for index, folder in enumerate(folders):
+        (tmp_path / "in" / folder).mkdir(parents=True)
+        (tmp_path / "in" / folder / "scan.mdi").write_bytes(b"EP*\x00" * (index + 1))
+        (tmp_path / "out" / folder).mkdir(parents=True)
+    converter = create_converter(backend="exe")
+    binary = tmp_path / "sized_mdi2tif.py"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys, time\n"
+        "from PIL import Image\n"
+        "source = sys.argv[sys.argv.index('-source') + 1]\n"
+        "dest = sys.argv[sys.argv.index('-dest') + 1]\n"
+        "log = sys.argv[sys.argv.index('-log') + 1]\n"
+        "assert os.path.dirname(dest) == os.path.dirname(log)\n"
+        "time.sleep(0.2)\n"
+        "Image.new('L', (os.path.getsize(source), 8)).save(dest, format='tiff')\n",
+        encoding="utf-8"
+    )
+    binary.chmod(0o755)
+    converter.bin_path = str(binary)
+    with ThreadPoolExecutor(max_workers=len(folders)) as executor:
+        statuses = list(executor.map(
+            lambda folder: converter.convert(
+                str(tmp_path / "in" / folder / "scan.mdi"),
+                str(tmp_path / "out" / folder / "scan.png"),
+                "png"
+            ),
+            folders
+        ))
+    assert statuses == [converter.success] * len(folders)
+    for index, folder in enumerate(folders):
+        with Image.open(tmp_path / "out" / folder / "scan.png") as image:
+            assert image.size == (4 * (index + 1), 8)
+    assert os.listdir(converter.const.temporary_img_folder) == []
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+@pytest.mark.parametrize("ram_has_room", [True, False])
+def test_intermediate_uses_ram_folder_when_it_has_room(tmp_path, create_converter, ram_has_room) -> None:
+    """ Test that the intermediate goes to the RAM-backed folder when it fits, and to the disk otherwise """
+    ram_folder = tmp_path / "shm"
+    ram_folder.mkdir()
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = create_converter(
+        backend="exe", ram_temp=str(ram_folder)
+    )
+    if ram_has_room is False:
+        converter.temp_storage.reserve = shutil.disk_usage(ram_folder).free
+    used_folders = tmp_path / "used_folders.txt"
+    binary = tmp_path / "recording_mdi2tif.py"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys\n"
+        "from PIL import Image\n"
+        "dest = sys.argv[sys.argv.index('-dest') + 1]\n"
+        f"open({str(used_folders)!r}, 'a').write(os.path.dirname(os.path.dirname(dest)))\n"
+        "Image.new('L', (8, 8)).save(dest, format='tiff')\n",
+        encoding="utf-8"
+    )
+    binary.chmod(0o755)
+    converter.bin_path = str(binary)
+    status = converter.convert(str(input_file), str(tmp_path / "file.png"), "png")
+    assert status == converter.success
+    expected_folder = converter.const.temporary_img_folder
+    if ram_has_room is True:
+        expected_folder = converter.temp_storage.ram_folder
+    assert used_folders.read_text() == expected_folder
+    assert converter.temp_storage.total_ram_jobs == int(ram_has_room)
+    assert converter.temp_storage.total_disk_fallbacks == int(not ram_has_room)
+    assert converter.temp_storage._promised == 0
+    assert os.listdir(expected_folder) == []
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_recursive_mirrors_tree(tmp_path, create_converter) -> None:
+    """ Test that a recursive conversion walks the tree and mirrors it """
+    in_dir = tmp_path / "in"
+    (in_dir / "a" / "b").mkdir(parents=True)
+    (in_dir / "top.mdi").write_bytes(b"EP*\x00")
+    (in_dir / "a" / "middle.mdi").write_bytes(b"EP*\x00")
+    (in_dir / "a" / "b" / "bottom.mdi").write_bytes(b"EP*\x00")
+    (in_dir / "a" / "notes.txt").write_text("not an mdi file")
+    converter = create_converter()
+    out_dir = tmp_path / "out"
+    status = converter.convert_all(
+        str(in_dir), str(out_dir), "tiff", jobs=2, recursive=True
+    )
+    assert status == converter.success
+    assert converter.total_files_success == 3
+    assert converter.total_folders == 2
+    assert converter.total_nb_of_files == 4
+    assert (out_dir / "top.tiff").exists()
+    assert (out_dir / "a" / "middle.tiff").exists()
+    assert (out_dir / "a" / "b" / "bottom.tiff").exists()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Symbolic links need a posix system")
+def test_convert_all_recursive_does_not_follow_directory_links(tmp_path, constants) -> None:
+    """ Test that a link to a parent directory does not make the recursive walk loop """
+    in_dir = tmp_path / "in"
+    (in_dir / "a").mkdir(parents=True)
+    (in_dir / "a" / "file.mdi").write_bytes(b"EP*\x00")
+    os.symlink("..", in_dir / "a" / "loop")
+    converter = MDIToTiff(constants, backend="fake")
+    out_dir = tmp_path / "out"
+    status = converter.convert_all(
+        str(in_dir), str(out_dir), "tiff", jobs=2, recursive=True
+    )
+    assert status == converter.success
+    assert converter.total_files_success == 1
+    assert converter.total_folders == 1
+    assert sorted(os.listdir(out_dir / "a")) == ["file.tiff"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_with_manifest_only_converts_changes(tmp_path, create_converter) -> None:
+    """ Test that a rerun with a manifest only converts new or changed files """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(3):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    out_dir = tmp_path / "out"
+    converter = create_converter()
+    converter.convert_all(str(in_dir), str(out_dir), "tiff", jobs=2, use_manifest=True)
+    assert converter.total_files_success == 3
+    converter.convert_all(str(in_dir), str(out_dir), "tiff", jobs=2, use_manifest=True)
+    assert converter.total_files_success == 0
+    assert converter.total_files_skipped == 3
+    (in_dir / "file_1.mdi").write_bytes(b"EP*\x00changed")
+    (out_dir / "file_2.tiff").write_bytes(b"truncated")
+    converter.convert_all(str(in_dir), str(out_dir), "tiff", jobs=2, use_manifest=True)
+    assert converter.total_files_success == 2
+    assert converter.total_files_skipped == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+@pytest.mark.parametrize("cache_outputs", [True, False])
+def test_cache_skips_binary_on_format_change(tmp_path, create_converter, cache_outputs) -> None:
+    """ Test that a document already converted once does not go through the binary again, each lookup counting once """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = create_converter(
+        backend="exe", cache_size=1024 * 1024, cache_outputs=cache_outputs
+    )
+    assert converter.convert(str(input_file), str(tmp_path / "a.png"), "png") == converter.success
+    assert converter.convert(str(input_file), str(tmp_path / "b.bmp"), "bmp") == converter.success
+    assert (tmp_path / "b.bmp").exists()
+    assert converter.launcher.total_launches == 1
+    assert (converter.cache.hits, converter.cache.misses) == (1, 1)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_cache_is_used_by_the_async_path(tmp_path, create_converter) -> None:
+    """ Test that a document converted twice through convert_async only goes through the binary once """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = create_converter(backend="exe", cache_size=1024 * 1024)
+    for name in ("a.png", "b.png"):
+        status = asyncio.run(
+            converter.convert_async(str(input_file), str(tmp_path / name), "png")
+        )
+        assert status == converter.success
+        assert (tmp_path / name).exists()
+    assert converter.launcher.total_launches == 1
+    assert (converter.cache.hits, converter.cache.misses) == (1, 1)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_all_times_out_hung_files(tmp_path, create_converter) -> None:
+    """ Test that a file hanging the binary is killed and counted as timed out while the batch goes on """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    (in_dir / "good.mdi").write_bytes(b"EP*\x00")
+    (in_dir / "hang.mdi").write_bytes(b"EP*\x00")
+    converter = create_converter(backend="exe", timeout=1)
+    hanging_binary = tmp_path / "hanging_mdi2tif.py"
+    hanging_binary.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "from PIL import Image\n"
+        "if sys.argv[sys.argv.index('-source') + 1].endswith('hang.mdi'):\n"
+        "    time.sleep(60)\n"
+        "Image.new('L', (8, 8)).save(sys.argv[sys.argv.index('-dest') + 1], format='tiff')\n",
+        encoding="utf-8"
+    )
+    hanging_binary.chmod(0o755)
+    converter.bin_path = str(hanging_binary)
+    status = converter.convert_all(str(in_dir), str(tmp_path / "out"), "tiff", jobs=2)
+    assert status == converter.error
+    assert converter.total_files_success == 1
+    assert converter.total_files_fails == 1
+    assert converter.total_files_timed_out == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_failed_conversions_leave_no_partial_output(tmp_path, create_converter) -> None:
+    """ Test that neither a failing binary nor a failing format change leaves a file at the destination """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    converter = create_converter(backend="exe")
+    broken_binary = tmp_path / "broken_mdi2tif.py"
+    broken_binary.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "open(sys.argv[sys.argv.index('-dest') + 1], 'wb').write(b'II*\\x00trunc')\n"
+        "sys.exit(1)\n",
+        encoding="utf-8"
+    )
+    broken_binary.chmod(0o755)
+    converter.bin_path = str(broken_binary)
+    assert converter.convert(str(input_file), str(out_dir / "file.tiff"), "tiff") != converter.success
+    rgba_image = tmp_path / "rgba.png"
+    Image.new("RGBA", (8, 8)).save(rgba_image)
+    assert converter.cifi.to_desired_format(str(rgba_image), str(out_dir / "rgba.jpeg"), "jpeg") != converter.success
+    assert os.listdir(out_dir) == []
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_interrupted_conversion_resumes_after_cursor(tmp_path, create_converter) -> None:
+    """ Test that a SIGTERM stops the walk gracefully and that --resume only walks what is left """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(5):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    out_dir = tmp_path / "out"
+    converter = create_converter(backend="exe")
+    fake_binary = converter.bin_path
+    stopping_binary = tmp_path / "stopping_mdi2tif.py"
+    stopping_binary.write_text(
+        f"#!{sys.executable}\n"
+        "import os, signal, sys\n"
+        "from PIL import Image\n"
+        "if sys.argv[sys.argv.index('-source') + 1].endswith('file_2.mdi'):\n"
+        "    os.kill(os.getppid(), signal.SIGTERM)\n"
+        "Image.new('L', (8, 8)).save(sys.argv[sys.argv.index('-dest') + 1], format='tiff')\n",
+        encoding="utf-8"
+    )
+    stopping_binary.chmod(0o755)
+    converter.bin_path = str(stopping_binary)
+    status = converter.convert_all(str(in_dir), str(out_dir), "tiff", jobs=1)
+    assert status == converter.error
+    assert converter.total_files_success == 3
+    assert (out_dir / ".mdi2img_journal.jsonl").exists()
+    converter.bin_path = fake_binary
+    status = converter.convert_all(str(in_dir), str(out_dir), "tiff", jobs=1, resume=True)
+    assert status == converter.success
+    assert converter.total_files_resumed == 3
+    assert converter.launcher.total_launches == 2
+    assert converter.total_files_success == 2
+    assert sorted(os.listdir(out_dir)) == [f"file_{index}.tiff" for index in range(5)]
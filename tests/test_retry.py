@@ -0,0 +1,65 @@
+"""
+File in charge of testing the retry policy of the conversions
+"""
+
+import os
+import sys
+import errno
+
+import pytest
+
+from mdi2img.launcher import LaunchResult
+from mdi2img.retry import RetryPolicy, TRANSIENT, DETERMINISTIC, classify_exception, classify_launch_result
+
+
+def test_failures_are_classified() -> None:
+    """ Test that locked files, full disks and spawn failures are transient, the rest is deterministic """
+    assert classify_exception(OSError(errno.ENOSPC, "No space left on device")) == TRANSIENT
+    assert classify_exception(ValueError("unknown file extension")) == DETERMINISTIC
+    assert classify_launch_result(LaunchResult(1, spawned=False)) == TRANSIENT
+    assert classify_launch_result(LaunchResult(1, stderr="The file is locked")) == TRANSIENT
+    assert classify_launch_result(LaunchResult(1, stderr="Invalid MDI document")) == DETERMINISTIC
+    assert classify_launch_result(LaunchResult(1, stderr="The document is blocked by a policy")) == DETERMINISTIC
+    assert classify_launch_result(LaunchResult(1, stderr="The page is unlocked but corrupted")) == DETERMINISTIC
+
+
+def test_backoff_is_exponential_and_bounded() -> None:
+    """ Test the delays between the attempts """
+    policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=3, jitter=0)
+    assert [policy.get_delay(attempt) for attempt in range(1, 5)] == [1, 2, 3, 3]
+    assert policy.should_retry([TRANSIENT], 4) is True
+    assert policy.should_retry([TRANSIENT], 5) is False
+    assert policy.should_retry([DETERMINISTIC], 1) is False
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+@pytest.mark.parametrize("message, expected_launches", [("disk full", 3), ("invalid mdi", 1)])
+def test_convert_retries_transient_failures_only(tmp_path, create_converter, message, expected_launches) -> None:
+    """ Test that the binary is called again on a transient failure and only once on a deterministic one """
+    input_file = tmp_path / "file.mdi"
+    input_file.write_bytes(b"EP*\x00")
+    converter = create_converter(
+        backend="exe",
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)
+    )
+    counter = tmp_path / "attempts"
+    flaky_binary = tmp_path / "flaky_mdi2tif.py"
+    flaky_binary.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys\n"
+        "from PIL import Image\n"
+        f"counter = {str(counter)!r}\n"
+        "attempt = int(open(counter).read()) + 1 if os.path.exists(counter) else 1\n"
+        "open(counter, 'w').write(str(attempt))\n"
+        "if attempt < 3:\n"
+        f"    print({message!r}, file=sys.stderr)\n"
+        "    sys.exit(1)\n"
+        "Image.new('L', (8, 8)).save(sys.argv[sys.argv.index('-dest') + 1], format='tiff')\n",
+        encoding="utf-8"
+    )
+    flaky_binary.chmod(0o755)
+    converter.bin_path = str(flaky_binary)
+    status = converter.convert(str(input_file), str(tmp_path / "file.tiff"), "tiff")
+    assert converter.launcher.total_launches == expected_launches
+    assert (status == converter.success) is (expected_launches == 3)
+    assert converter.retry_policy.total_retries == expected_launches - 1
@@ -0,0 +1,59 @@
+"""
+File in charge of testing the order in which the files of a folder conversion are converted
+"""
+
+import os
+
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.schedule import TaskScheduler
+
+
+def test_files_are_scheduled_largest_first(tmp_path, constants) -> None:
+    """ Test that the largest files are handed out first, files of the same size keeping the order of the walk """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for name, size in (("a.mdi", 300), ("b.mdi", 10), ("c.mdi", 900), ("d.mdi", 300)):
+        (in_dir / name).write_bytes(b"x" * size)
+    converter = MDIToTiff(constants, backend="fake")
+    out_dir = str(tmp_path / "out")
+
+    def _get_order(scheduler) -> list:
+        tasks = converter._iter_folder_conversion_tasks(str(in_dir), out_dir)
+        if scheduler is not None:
+            tasks = scheduler.order(tasks)
+        return [os.path.basename(task.input_file) for task in tasks]
+
+    assert _get_order(converter._get_scheduler("size", 4)) == ["c.mdi", "a.mdi", "d.mdi", "b.mdi"]
+    assert _get_order(TaskScheduler(constants, "pages")) == ["c.mdi", "a.mdi", "d.mdi", "b.mdi"]
+    assert converter._get_scheduler("directory", 4) is None
+    assert converter._get_scheduler("size", 1) is None
+    assert _get_order(None) == ["a.mdi", "b.mdi", "c.mdi", "d.mdi"]
+    status = converter.convert_all(str(in_dir), out_dir, "tiff", jobs=2, schedule="size")
+    assert status == converter.success
+    assert sorted(os.listdir(out_dir)) == ["a.tiff", "b.tiff", "c.tiff", "d.tiff"]
+
+
+def test_files_are_ordered_within_a_bounded_window(tmp_path, constants) -> None:
+    """ Test that only a window of the walk is read ahead, and that the files stop being handed out once a stop is requested """
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for name, size in (("a.mdi", 300), ("b.mdi", 10), ("c.mdi", 900), ("d.mdi", 300)):
+        (in_dir / name).write_bytes(b"x" * size)
+    converter = MDIToTiff(constants, backend="fake")
+    read = []
+
+    def _walk():
+        for task in converter._iter_folder_conversion_tasks(str(in_dir), str(tmp_path / "out")):
+            read.append(os.path.basename(task.input_file))
+            yield task
+
+    ordered = TaskScheduler(constants, "size", window=2).order(_walk())
+    assert os.path.basename(next(ordered).input_file) == "a.mdi"
+    assert read == ["a.mdi", "b.mdi"]
+    assert [os.path.basename(task.input_file) for task in ordered] == ["c.mdi", "d.mdi", "b.mdi"]
+    stopped = []
+    ordered = TaskScheduler(
+        constants, "size", window=2, should_stop=lambda: len(stopped) > 0
+    ).order(_walk())
+    stopped.append(next(ordered))
+    assert list(ordered) == []
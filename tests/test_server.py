@@ -0,0 +1,97 @@
+"""
+File in charge of testing the local http conversion service
+"""
+
+import os
+import json
+import socket
+import threading
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+import pytest
+
+from mdi2img.server import ConversionServer, get_mime_type
+
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path, create_converter):
+    """ Start a conversion service on a free port """
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "shared" / "file.mdi").write_bytes(b"EP*\x00")
+    converter = create_converter(backend="exe")
+    server = ConversionServer(
+        converter, port=0, max_requests=2, allowed_root=str(tmp_path / "shared")
+    )
+    server.start()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+    thread.join()
+
+
+def _url(server: ConversionServer, route: str) -> str:
+    """ Build the url of a route of the service """
+    return f"http://{server.host}:{server.port}{route}"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_upload(server) -> None:
+    """ Test that an uploaded file is converted and sent back """
+    request = Request(_url(server, "/convert?format=png"), data=b"EP*\x00", method="POST")
+    with urlopen(request) as response:
+        assert response.status == 200
+        assert response.headers["Content-Type"] == "image/png"
+        assert response.read().startswith(b"\x89PNG")
+    with urlopen(_url(server, "/metrics")) as response:
+        metrics = json.loads(response.read())
+    assert metrics["conversions_success"] == 1
+    assert metrics["conversions_in_flight"] == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_server_path(server) -> None:
+    """ Test that server-side paths are limited to the allowed root """
+    request = Request(_url(server, "/convert?format=tiff&path=file.mdi"), data=b"", method="POST")
+    with urlopen(request) as response:
+        assert response.status == 200
+    request = Request(_url(server, "/convert?format=tiff&path=../in.mdi"), data=b"", method="POST")
+    with pytest.raises(HTTPError) as error:
+        urlopen(request)
+    assert error.value.code == 403
+
+
+def test_health_and_invalid_format(server) -> None:
+    """ Test the health endpoint and the rejection of unknown formats """
+    with urlopen(_url(server, "/health")) as response:
+        assert json.loads(response.read())["status"] == "ok"
+    request = Request(_url(server, "/convert?format=nope"), data=b"EP*\x00", method="POST")
+    with pytest.raises(HTTPError) as error:
+        urlopen(request)
+    assert error.value.code == 400
+
+
+def test_truncated_upload_is_rejected(server) -> None:
+    """ Test that an upload whose client stops before Content-Length bytes is not converted """
+    with socket.create_connection((server.host, server.port)) as client:
+        client.sendall(
+            b"POST /convert?format=png HTTP/1.1\r\nHost: localhost\r\n"
+            b"Content-Length: 100\r\n\r\nEP*\x00"
+        )
+        client.shutdown(socket.SHUT_WR)
+        response = client.makefile("rb").readline()
+    assert response.split()[1] == b"400"
+    with urlopen(_url(server, "/metrics")) as response:
+        metrics = json.loads(response.read())
+    assert metrics["conversions_success"] + metrics["conversions_error"] == 0
+    assert metrics["conversions_in_flight"] == 0
+
+
+@pytest.mark.parametrize(
+    "img_format, mime",
+    [("tif", "image/tiff"), ("tiff", "image/tiff"), ("jfif", "image/jpeg"), ("apng", "image/png"), ("png", "image/png"), ("unknown", "application/octet-stream")]
+)
+def test_mime_type_of_the_output_formats(img_format, mime) -> None:
+    """ Test that the aliases of a format get the mime type of the Pillow format they stand for """
+    assert get_mime_type(img_format) == mime
@@ -0,0 +1,29 @@
+"""
+File in charge of testing the reusable conversion session
+"""
+
+import os
+
+import pytest
+
+from mdi2img.session import ConverterSession
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The fake binary is a posix script")
+def test_convert_many_keeps_order_and_releases_workers(tmp_path, create_converter) -> None:
+    """ convert_many yields one ordered result per file and the workers are released on exit """
+    converter = create_converter(backend="exe")
+    pairs = []
+    for index in range(6):
+        source = tmp_path / f"file_{index}.mdi"
+        source.write_bytes(b"EP*\x00")
+        pairs.append((str(source), str(tmp_path / f"file_{index}.png")))
+    with ConverterSession(converter.const, jobs=2, backend="exe") as session:
+        results = list(session.convert_many(pairs, "png"))
+        assert session.convert(pairs[0][0], str(tmp_path / "single.png"), "png") == 0
+        executor = session.executor
+    assert [result[0] for result in results] == [pair[0] for pair in pairs]
+    assert all(result[2] == 0 for result in results)
+    assert all(os.path.isfile(pair[1]) for pair in pairs)
+    assert session.is_open is False
+    assert executor._shutdown is True
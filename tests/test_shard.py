@@ -0,0 +1,71 @@
+"""
+File in charge of testing the sharding of a folder conversion
+"""
+
+import os
+import json
+
+from mdi2img.constants import Constants
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.shard import parse_shard
+
+
+def test_parse_shard() -> None:
+    """ Test that only shards written 'i/N' with 1 <= i <= N are accepted """
+    shard = parse_shard("2/4")
+    assert (shard.index, shard.count) == (2, 4)
+    for invalid in ("0/4", "5/4", "1/0", "1", "a/b", "1/2/3", "-1/2"):
+        assert parse_shard(invalid) is None
+
+
+def test_shards_convert_disjoint_parts_of_the_tree(tmp_path, temp_folder) -> None:
+    """ Test that the shards of a tree share out all its files and each write a report """
+    in_dir = tmp_path / "in"
+    expected = set()
+    for folder in ("", "a", "a/b"):
+        (in_dir / folder).mkdir(parents=True, exist_ok=True)
+        for index in range(5):
+            (in_dir / folder / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+            expected.add(os.path.join(folder, f"file_{index}.tiff"))
+    out_dir = tmp_path / "out"
+    converted = []
+    for index in range(1, 4):
+        converter = MDIToTiff(Constants("MDI2TIF.EXE"), backend="fake")
+        before = {
+            os.path.relpath(os.path.join(root, name), out_dir)
+            for root, _, names in os.walk(out_dir) for name in names
+            if name.endswith(".tiff")
+        }
+        status = converter.convert_all(
+            str(in_dir), str(out_dir), "tiff", jobs=2,
+            recursive=True, shard=f"{index}/3"
+        )
+        assert status == converter.success
+        after = {
+            os.path.relpath(os.path.join(root, name), out_dir)
+            for root, _, names in os.walk(out_dir) for name in names
+            if name.endswith(".tiff")
+        }
+        converted.append(after - before)
+        report = json.loads(
+            (out_dir / f".mdi2img_shard_{index}_of_3.json").read_text()
+        )
+        assert report["shard"] == f"{index}/3"
+        assert report["completed"] is True
+        assert report["success"] == len(converted[-1])
+        assert report["files_in_other_shards"] == 15 - len(converted[-1])
+        assert report["failed_files"] == []
+    assert set().union(*converted) == expected
+    assert sum(len(part) for part in converted) == len(expected)
+
+
+def test_invalid_shard_is_rejected(tmp_path, constants) -> None:
+    """ Test that an invalid shard stops the conversion before anything is converted """
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "file.mdi").write_bytes(b"EP*\x00")
+    converter = MDIToTiff(constants, backend="fake")
+    status = converter.convert_all(
+        str(tmp_path / "in"), str(tmp_path / "out"), "tiff", shard="4/3"
+    )
+    assert status == converter.error
+    assert os.path.exists(tmp_path / "out" / "file.tiff") is False
@@ -0,0 +1,92 @@
+"""
+File in charge of testing the Wine launcher of the conversion binary
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+from mdi2img.mdi2tiff import MDIToTiff
+from mdi2img.wine import WineBridge, WINESERVER_PERSISTENCE
+
+
+def _create_script(path, body: str) -> str:
+    """ Write an executable python script """
+    path.write_text(f"#!{sys.executable}\n{body}", encoding="utf-8")
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_paths_are_translated_only_for_wine(constants) -> None:
+    """ Test that the paths reach the binary in their windows form only when it runs through Wine """
+    direct = WineBridge(constants, launcher="taskset -c 0")
+    assert direct.wrap(["a.exe"]) == ["taskset", "-c", "0", "a.exe"]
+    assert direct.to_binary_path("/data/in/file.mdi") == "/data/in/file.mdi"
+    wine = WineBridge(constants, launcher="wine", wineserver="true")
+    assert wine.translate_paths is True
+    assert wine.to_binary_path("/data/in/my file.mdi") == "Z:\\data\\in\\my file.mdi"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The stand-in launcher is a posix script")
+def test_convert_all_through_stand_in_wine(tmp_path, constants) -> None:
+    """ Test that a batch runs the binary through the launcher with windows paths and a single persistent wineserver """
+    calls = tmp_path / "calls.jsonl"
+    binary = _create_script(
+        tmp_path / "fake_mdi2tif.py",
+        "import sys\n"
+        "from PIL import Image\n"
+        "dest = sys.argv[sys.argv.index('-dest') + 1]\n"
+        "Image.new('L', (8, 8)).save(dest, format='tiff')\n"
+    )
+    wine = _create_script(
+        tmp_path / "wine",
+        "import json, subprocess, sys\n"
+        f"open({str(calls)!r}, 'a').write(json.dumps(sys.argv[1:]) + '\\n')\n"
+        "args = [arg[2:].replace('\\\\', '/') if arg.startswith('Z:') else arg for arg in sys.argv[1:]]\n"
+        "sys.exit(subprocess.call(args))\n"
+    )
+    wineserver = _create_script(
+        tmp_path / "wineserver",
+        f"import json, sys\nopen({str(calls)!r}, 'a').write(json.dumps(['wineserver'] + sys.argv[1:]) + '\\n')\n"
+    )
+    in_dir = tmp_path / "in"
+    in_dir.mkdir()
+    for index in range(3):
+        (in_dir / f"file_{index}.mdi").write_bytes(b"EP*\x00")
+    constants.binary_path = binary
+    converter = MDIToTiff(
+        constants, backend="exe", launcher=wine, wineserver=wineserver
+    )
+    status = converter.convert_all(
+        str(in_dir), str(tmp_path / "out"), "tiff", jobs=2
+    )
+    assert status == converter.success
+    assert len(os.listdir(tmp_path / "out")) == 3
+    records = [json.loads(line) for line in calls.read_text().splitlines()]
+    assert records[0] == ["wineserver", f"-p{WINESERVER_PERSISTENCE}"]
+    assert records[-1] == ["wineserver", "-k"]
+    launches = records[1:-1]
+    assert len(launches) == 3
+    for launch in launches:
+        assert launch[0] == binary
+        source = launch[launch.index("-source") + 1]
+        assert source.startswith("Z:\\") and "/" not in source
+
+
+@pytest.mark.skipif(os.name != "posix", reason="The stand-in wineserver is a posix script")
+def test_running_wineserver_is_not_killed(tmp_path, constants) -> None:
+    """ Test that a wineserver the bridge did not start is left running at the end of the batch """
+    calls = tmp_path / "calls.jsonl"
+    wineserver = _create_script(
+        tmp_path / "wineserver",
+        "import json, sys\n"
+        f"open({str(calls)!r}, 'a').write(json.dumps(sys.argv[1:]) + '\\n')\n"
+        "sys.exit(1)\n"
+    )
+    bridge = WineBridge(constants, launcher="wine", wineserver=wineserver)
+    bridge.start()
+    bridge.stop()
+    records = [json.loads(line) for line in calls.read_text().splitlines()]
+    assert records == [[f"-p{WINESERVER_PERSISTENCE}"]]